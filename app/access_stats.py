@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncHour
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AccessHourly, AccessLog, AccessUidSummary
+
+# Denied bursts with fewer swipes than this are not listed as bursts
+BURST_MIN = 2
+
+
+def _burst_gap():
+    return timedelta(seconds=getattr(settings, 'ACCESS_BURST_GAP_SECONDS', 300))
+
+
+def _hour(ts):
+    return ts.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _fold_denied(summary, ts, gap):
+    if summary.ultimo_negado is not None and ts - summary.ultimo_negado <= gap:
+        summary.rajada_negados += 1
+    else:
+        summary.rajada_inicio = ts
+        summary.rajada_negados = 1
+    summary.ultimo_negado = ts
+    summary.maior_rajada = max(summary.maior_rajada, summary.rajada_negados)
+
+
+def record(log):
+    """Fold a freshly stored ``AccessLog`` into the summaries; call in the same transaction."""
+    denied = 0 if log.autorizado else 1
+    hour = _hour(log.timestamp)
+    if not AccessHourly.objects.filter(hora=hour).update(total=F('total') + 1, negados=F('negados') + denied):
+        try:
+            with transaction.atomic():
+                AccessHourly.objects.create(hora=hour, total=1, negados=denied)
+        except IntegrityError:
+            # another worker opened the hour first
+            AccessHourly.objects.filter(hora=hour).update(total=F('total') + 1, negados=F('negados') + denied)
+
+    for attempt in range(2):
+        summary = _locked_summary(log.uid)
+        created = summary is None
+        if created:
+            summary = AccessUidSummary(uid=log.uid)
+        summary.cartao_id = log.cartao_id
+        summary.total += 1
+        summary.ultimo_acesso = log.timestamp
+        summary.ultimo_autorizado = log.autorizado
+        if denied:
+            summary.negados += 1
+            _fold_denied(summary, log.timestamp, _burst_gap())
+        if not created:
+            summary.save()
+            return
+        try:
+            with transaction.atomic():
+                summary.save()
+            return
+        except IntegrityError:
+            # first swipe of this UID raced another worker's: fold ours into the row they created
+            if attempt:
+                raise
+
+
+@receiver(post_delete, sender=AccessLog)
+def _log_deleted(sender, instance, **kwargs):
+    # keeps total_logged() (the /acessos/ page count) right after deletes through the ORM (admin, shell);
+    # per-UID state is left alone, rebuild_access_summary recomputes it
+    denied = 0 if instance.autorizado else 1
+    AccessHourly.objects.filter(hora=_hour(instance.timestamp), total__gt=0).update(
+        total=F('total') - 1, negados=F('negados') - denied)
+
+
+def _locked_summary(uid):
+    return AccessUidSummary.objects.select_for_update().filter(uid=uid).first()
+
+
+def rebuild_hourly(since=None, until=None, log_model=AccessLog, hourly_model=AccessHourly):
+    """Recompute the hourly counts from ``AccessLog`` (all of it, or from ``since``'s hour on),
+    up to but not including ``until``'s hour.
+
+    Pass ``until=timezone.now()`` on a live system: ``record()`` keeps updating the current hour's
+    bucket, and deleting it under a concurrent swipe would lose that increment. The models can be
+    swapped for historical ones (migration 0012).
+    """
+    logs = log_model.objects.all()
+    buckets = hourly_model.objects.all()
+    if since is not None:
+        since = _hour(since)
+        logs = logs.filter(timestamp__gte=since)
+        buckets = buckets.filter(hora__gte=since)
+    if until is not None:
+        until = _hour(until)
+        logs = logs.filter(timestamp__lt=until)
+        buckets = buckets.filter(hora__lt=until)
+    rows = (logs.annotate(hora=TruncHour('timestamp', tzinfo=dt_timezone.utc)).values('hora')
+            .annotate(total=Count('id'), negados=Count('id', filter=Q(autorizado=False))).order_by())
+    with transaction.atomic():
+        buckets.delete()
+        created = hourly_model.objects.bulk_create(
+            (hourly_model(hora=row['hora'], total=row['total'], negados=row['negados']) for row in rows.iterator()),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def rebuild_uid_summaries(log_model=AccessLog, summary_model=AccessUidSummary):
+    """Recompute every UID summary from ``AccessLog``: SQL aggregates, plus one ordered pass
+    over the denied swipes (``accesslog_uid_ts_idx``) for the bursts."""
+    last = log_model.objects.filter(uid=OuterRef('uid')).order_by('-timestamp')
+    rows = (log_model.objects.values('uid')
+            .annotate(total=Count('id'), negados=Count('id', filter=Q(autorizado=False)),
+                      ultimo_acesso=Max('timestamp'),
+                      ultimo_autorizado=Subquery(last.values('autorizado')[:1]),
+                      cartao_id=Subquery(last.values('cartao_id')[:1]))
+            .order_by())
+    summaries = {row['uid']: summary_model(**row) for row in rows.iterator()}
+    gap = _burst_gap()
+    denied = log_model.objects.filter(autorizado=False).order_by('uid', 'timestamp').values_list('uid', 'timestamp')
+    for uid, ts in denied.iterator(chunk_size=5000):
+        _fold_denied(summaries[uid], ts, gap)
+    with transaction.atomic():
+        summary_model.objects.all().delete()
+        summary_model.objects.bulk_create(summaries.values(), batch_size=1000)
+    return len(summaries)
+
+
+def summary(hours=24, days=14, limit=20, now=None):
+    """Access analytics for the access log page and ``/api/acessos/resumo/``.
+
+    Everything is read from the summary tables: at most ``days * 24`` hourly rows and
+    ``limit`` UID rows, whatever the size of the log.
+    """
+    now = now or timezone.now()
+    current = _hour(now)
+    first_day = timezone.localtime(now).date() - timedelta(days=days - 1)
+    start = min(current - timedelta(hours=hours - 1),
+                _hour(timezone.make_aware(datetime.combine(first_day, datetime.min.time()))))
+    buckets = {row.hora: row for row in AccessHourly.objects.filter(hora__gte=start)}
+
+    per_hour = []
+    for i in range(hours - 1, -1, -1):
+        hour = current - timedelta(hours=i)
+        row = buckets.get(hour)
+        per_hour.append({'hora': hour, 'total': row.total if row else 0, 'negados': row.negados if row else 0})
+
+    per_day = {first_day + timedelta(days=i): {'total': 0, 'negados': 0} for i in range(days)}
+    for hour, row in buckets.items():
+        day = per_day.get(timezone.localtime(hour).date())
+        if day is not None:
+            day['total'] += row.total
+            day['negados'] += row.negados
+
+    gap = _burst_gap()
+    bursts = (AccessUidSummary.objects.select_related('cartao')
+              .filter(ultimo_negado__gte=now - timedelta(hours=hours), rajada_negados__gte=BURST_MIN)
+              .order_by('-rajada_negados', '-ultimo_negado')[:limit])
+    latest = (AccessUidSummary.objects.select_related('cartao').filter(cartao__isnull=False)
+              .order_by('-ultimo_acesso')[:limit])
+    return {
+        'por_hora': per_hour,
+        'por_dia': [{'dia': day, **counts} for day, counts in per_day.items()],
+        'rajadas_negadas': [{
+            'uid': s.uid, 'nome': s.cartao.nome_pessoa if s.cartao else None, 'negados': s.rajada_negados,
+            'inicio': s.rajada_inicio, 'ultimo': s.ultimo_negado, 'ativa': now - s.ultimo_negado <= gap,
+        } for s in bursts],
+        'ultimos_acessos': [{
+            'uid': s.uid, 'nome': s.cartao.nome_pessoa, 'ultimo_acesso': s.ultimo_acesso,
+            'autorizado': s.ultimo_autorizado, 'total': s.total, 'negados': s.negados,
+        } for s in latest],
+    }
+
+
+def total_logged():
+    """Number of logged swipes, from the hourly counts (a COUNT(*) of the log is a full scan).
+
+    None when the counts don't reach back to the oldest log entry (logs restored or imported
+    without ``rebuild_access_summary``) or there are none: the caller has to count the log.
+    """
+    oldest = AccessLog.objects.order_by('timestamp').values('timestamp')[:1]
+    counts = AccessHourly.objects.aggregate(total=Sum('total'), first=Min('hora'), oldest=Min(Subquery(oldest)))
+    if counts['first'] is None or (counts['oldest'] is not None and counts['first'] > _hour(counts['oldest'])):
+        return None
+    return counts['total']
@@ -0,0 +1,305 @@
+import hmac
+import json
+import logging
+import math
+import os
+from concurrent.futures import TimeoutError as WriterTimeout
+
+from django.conf import settings as django_settings
+from django.db import IntegrityError, connections, transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from .models import AccessLog, BrisePackedReading, BriseSensorReading, PavimentosSensorReading, SensorReading
+from . import (access_stats, cards, dedup, devices, forwarding, latest, logs, metrics, payloads, ratelimit, storage,
+               timestamps, versions)
+from .ratelimit import rate_limited
+
+logger = logging.getLogger(__name__)
+
+# seq is stored in a signed 64-bit column
+SEQ_MAX = 2 ** 63 - 1
+# Device.device_id and the readings' device_id columns
+DEVICE_ID_MAX_LENGTH = 50
+# Retry-After of the 503 sent when the ingest writer didn't confirm a reading in time
+WRITER_RETRY_AFTER = 5
+
+READING_MONITORING = {SensorReading: 'default', BriseSensorReading: 'brise', BrisePackedReading: 'brise',
+                      PavimentosSensorReading: 'pavimentos'}
+
+
+def _resolve_device(reading):
+    # registers the device on its first reading (a write to 'default')
+    reading.device_ref = devices.registry.resolve(READING_MONITORING[type(reading)], reading.device_id)
+
+
+def _forward(readings):
+    # Outbox rows for the external sinks (app.forwarding), called inside the readings' transaction:
+    # if they can't be queued the readings roll back too and the device resends them. The outbox
+    # is in 'default'; for readings stored in another database it commits just before them, so a
+    # crash in between forwards a reading the device will resend rather than dropping one.
+    forwarding.enqueue([forwarding.point(r, READING_MONITORING[type(r)]) for r in readings])
+
+
+def _number(value):
+    """``float(value)``, rejecting NaN and infinities (ValueError) like unparseable values."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{value!r} is not a finite number')
+    return number
+
+
+def _is_stored(reading, alias):
+    return (reading.seq is not None and reading.device_ref is not None and
+            type(reading).objects.using(alias).filter(device_ref=reading.device_ref, seq=reading.seq).exists())
+
+
+def _save_reading(reading, alias):
+    """Persist a sensor reading on ``alias`` (or 'default' when that alias isn't configured).
+
+    With ``INGEST_SINGLE_WRITER`` enabled the save is handed to the per-process writer thread,
+    which batches concurrent readings into one transaction.
+
+    Returns False when the reading carries a ``seq`` that is already stored for its device.
+    Raises ``WriterTimeout`` when the writer hasn't committed it within INGEST_WRITER_TIMEOUT_SECONDS;
+    the reading is still queued and may be stored afterwards.
+    """
+    if alias not in connections.databases:
+        alias = 'default'
+    try:
+        if getattr(django_settings, 'INGEST_SINGLE_WRITER', False):
+            from .ingest_writer import get_writer
+            get_writer().submit(reading, alias, prepare=_resolve_device, after=_forward).result(
+                timeout=getattr(django_settings, 'INGEST_WRITER_TIMEOUT_SECONDS', 30))
+        else:
+            _resolve_device(reading)
+            with transaction.atomic(using=alias):
+                reading.save(using=alias)
+                _forward([reading])
+    except IntegrityError:
+        # A duplicate only if another worker stored the same (device_ref, seq) first; any other
+        # integrity error (e.g. in the outbox write) rolled the reading back and is a failure
+        if not _is_stored(reading, alias):
+            raise
+        dedup.mark(type(reading), reading.device_id, reading.seq)
+        return False
+    if reading.seq is not None:
+        dedup.mark(type(reading), reading.device_id, reading.seq)
+    latest.update(reading)
+    versions.data_changed(READING_MONITORING[type(reading)], reading.device_id)
+    return True
+
+
+def _duplicate_response(seq):
+    return JsonResponse({'status': 'success', 'message': 'Duplicate reading ignored', 'duplicate': True, 'seq': seq})
+
+
+@csrf_exempt
+@rate_limited(ratelimit.ingest_identity)
+def receive_sensor_data(request):
+    """
+    API endpoint to receive sensor data from ESP32 devices.
+    Payload must include a 'monitoring' field indicating target (e.g. 'brise' or 'pavimentos').
+
+    For 'brise' monitoring it accepts named keys (ds18b20_1..6, dht11_1_temp/hum, uv_1..2, wind_1..2)
+    or the generic sensor1..sensor14 mapping. The function will store readings in the appropriate DB via router.
+
+    Devices may instead POST the compact binary frame described in ``app.payloads``
+    (Content-Type: application/x-ecoview-struct); it is decoded into the same fields.
+
+    An optional integer 'seq' (monotonic per device, also across reboots) makes the POST
+    idempotent: a retry of a stored reading gets a 'duplicate' success response and no new row.
+
+    Buffered readings keep their own time through 'sample_ts'; see ``app.timestamps``.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed'}, status=405)
+
+    try:
+        if request.content_type in payloads.BINARY_CONTENT_TYPES:
+            try:
+                data = payloads.decode(request.body)
+            except payloads.PayloadError as e:
+                return JsonResponse({'status': 'error', 'message': f'Invalid binary payload: {e}'}, status=400)
+        else:
+            try:
+                data = json.loads(request.body.decode('utf-8'))
+            except json.JSONDecodeError:
+                return JsonResponse({'status': 'error', 'message': 'Invalid JSON format'}, status=400)
+
+        monitoring = data.get('monitoring', 'default').lower()
+        device_id = data.get('device_id')
+        logs.bind(device_id=device_id, monitoring=monitoring)
+        if not device_id:
+            return JsonResponse({'status': 'error', 'message': 'Missing required field: device_id'}, status=400)
+        if not isinstance(device_id, str) or len(device_id) > DEVICE_ID_MAX_LENGTH:
+            return JsonResponse({'status': 'error',
+                                 'message': f'device_id must be a string of up to {DEVICE_ID_MAX_LENGTH} characters'},
+                                status=400)
+
+        # Optional device sequence number: retries of a stored reading are answered without a DB write
+        seq = data.get('seq')
+        if seq is not None:
+            if isinstance(seq, bool) or not isinstance(seq, int) or not 0 <= seq <= SEQ_MAX:
+                return JsonResponse({'status': 'error', 'message': f'seq must be an integer from 0 to {SEQ_MAX}'},
+                                    status=400)
+            model = {'brise': storage.brise_model(), 'pavimentos': PavimentosSensorReading}.get(monitoring, SensorReading)
+            if dedup.is_duplicate(model, device_id, seq):
+                return _duplicate_response(seq)
+
+        # Optional device timestamps (epoch s/ms or ISO 8601): 'sample_ts' is when the reading was
+        # taken, 'device_now' the device clock at send time (used to correct that device's skew)
+        try:
+            timestamp = timestamps.resolve_timestamp(device_id, data.get('sample_ts'), data.get('device_now'))
+        except timestamps.TimestampError as e:
+            return JsonResponse({'status': 'error', 'message': f'Invalid timestamp: {e}'}, status=400)
+
+        battery_level = data.get('battery')
+        if battery_level is not None:
+            try:
+                battery_level = _number(battery_level)
+            except (ValueError, TypeError):
+                return JsonResponse({'status': 'error', 'message': 'Battery must be a number between 0 and 100'}, status=400)
+            if not 0 <= battery_level <= 100:
+                return JsonResponse({'status': 'error', 'message': 'Battery level must be between 0 and 100'}, status=400)
+
+        # Route to specific model based on monitoring
+        if monitoring == 'brise':
+            # expected named keys mapping for brise
+            expected = ['ds18b20_1','ds18b20_2','ds18b20_3','ds18b20_4','ds18b20_5','ds18b20_6',
+                        'dht11_1_temp','dht11_1_hum','dht11_2_temp','dht11_2_hum',
+                        'uv_1','uv_2','wind_1','wind_2']
+            # accept either named or generic sensor1..sensor14
+            if all(k in data for k in [f'sensor{i}' for i in range(1,15)]):
+                # generic -> map sensor1..sensor14 to brise fields
+                try:
+                    vals = [_number(data[f'sensor{i}']) for i in range(1,15)]
+                except (ValueError, TypeError):
+                    return JsonResponse({'status':'error','message':'All sensor values must be numbers'}, status=400)
+                brise_kwargs = {
+                    'ds18b20_1': vals[0], 'ds18b20_2': vals[1], 'ds18b20_3': vals[2], 'ds18b20_4': vals[3], 'ds18b20_5': vals[4], 'ds18b20_6': vals[5],
+                    'dht11_1_temp': vals[6], 'dht11_1_hum': vals[8], 'dht11_2_temp': vals[7], 'dht11_2_hum': vals[9],
+                    'uv_1': vals[10], 'uv_2': vals[11], 'wind_1': vals[12], 'wind_2': vals[13]
+                }
+            else:
+                # named
+                missing = [k for k in expected if k not in data]
+                if missing:
+                    return JsonResponse({'status':'error','message':f'Missing fields for brise: {", ".join(missing)}'}, status=400)
+                try:
+                    # null = channel not connected/reported
+                    brise_kwargs = {k: None if data[k] is None else _number(data[k]) for k in expected}
+                except (ValueError, TypeError) as e:
+                    return JsonResponse({'status':'error','message':'Invalid numeric value in payload'}, status=400)
+
+            meta = {'timestamp': timestamp, 'device_id': device_id, 'battery_level': battery_level, 'seq': seq}
+            if storage.brise_model() is BrisePackedReading:
+                reading = BrisePackedReading.from_channels(1, brise_kwargs, **meta)
+            else:
+                reading = BriseSensorReading(**brise_kwargs, **meta)
+            if not _save_reading(reading, 'brise'):
+                return _duplicate_response(seq)
+            return JsonResponse({'status':'success','message':'Brise data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
+
+        elif monitoring == 'pavimentos':
+            # simple example for pavimentos: expect sensor_a and sensor_b or sensor1/2
+            if 'sensor_a' in data and 'sensor_b' in data:
+                try:
+                    a = _number(data['sensor_a'])
+                    b = _number(data['sensor_b'])
+                except (ValueError, TypeError):
+                    return JsonResponse({'status':'error','message':'Invalid numeric value for pavimentos'}, status=400)
+                reading = PavimentosSensorReading(timestamp=timestamp, sensor_a=a, sensor_b=b, device_id=device_id, battery_level=battery_level, seq=seq)
+                if not _save_reading(reading, 'pavimentos'):
+                    return _duplicate_response(seq)
+                return JsonResponse({'status':'success','message':'Pavimentos data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
+            elif all(k in data for k in ['sensor1','sensor2']):
+                try:
+                    a = _number(data['sensor1'])
+                    b = _number(data['sensor2'])
+                except (ValueError, TypeError):
+                    return JsonResponse({'status':'error','message':'Invalid numeric value for pavimentos'}, status=400)
+                reading = PavimentosSensorReading(timestamp=timestamp, sensor_a=a, sensor_b=b, device_id=device_id, battery_level=battery_level, seq=seq)
+                if not _save_reading(reading, 'pavimentos'):
+                    return _duplicate_response(seq)
+                return JsonResponse({'status':'success','message':'Pavimentos data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
+            else:
+                return JsonResponse({'status':'error','message':'Missing fields for pavimentos'}, status=400)
+
+        else:
+            # fallback: store in legacy SensorReading if sensor1..sensor14 are provided
+            generic_keys = [f'sensor{i}' for i in range(1, 15)]
+            if not all(k in data for k in generic_keys):
+                return JsonResponse({'status':'error','message':'Missing generic sensor fields for default storage'}, status=400)
+            try:
+                sensor_vals = {f'sensor{i}': _number(data[f'sensor{i}']) for i in range(1,15)}
+            except (ValueError, TypeError):
+                return JsonResponse({'status':'error','message':'All sensor values must be numbers'}, status=400)
+            reading = SensorReading(timestamp=timestamp, device_id=device_id, battery_level=battery_level, seq=seq, **sensor_vals)
+            if not _save_reading(reading, 'default'):
+                return _duplicate_response(seq)
+            return JsonResponse({'status':'success','message':'Data saved to default sensorreading','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
+
+    except WriterTimeout:
+        # The writer may still commit the reading: the device resends it with the same seq,
+        # and the retry is answered as a duplicate if it was stored after all.
+        metrics.incr('ingest.writer_timeouts')
+        logger.warning('Ingest writer did not confirm a reading in time')
+        response = JsonResponse({'status': 'error', 'message': 'Reading not confirmed yet, resend it with the same seq'},
+                                status=503)
+        response['Retry-After'] = str(WRITER_RETRY_AFTER)
+        return response
+    except Exception as e:
+        # sampled per call site and exception type (app.logs): a failing device can't flood the log
+        logger.error('Error processing sensor data: %s', e, exc_info=True)
+        return JsonResponse({'status': 'error', 'message': 'Internal server error'}, status=500)
+
+
+@require_GET
+def latest_sensor_data(request):
+    data = latest.get(SensorReading)
+    if not data:
+        return JsonResponse({'error': 'No data available'}, status=404)
+    return JsonResponse({'sensor1': data['sensor1'], 'sensor2': data['sensor2'], 'timestamp': data['timestamp'].strftime('%H:%M'), 'battery': data['battery_level']})
+
+
+@csrf_exempt  # Para facilitar testes com ESP, ideal usar autenticação depois
+@rate_limited(ratelimit.rfid_identity)
+def verifica_cartao(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            uid = data.get("uid")
+            cartao_id = cards.index.lookup(uid)
+            autorizado = cartao_id is not None
+            # Registra o acesso (e atualiza os resumos na mesma transação)
+            with transaction.atomic():
+                log = AccessLog.objects.create(uid=uid, cartao_id=cartao_id, autorizado=autorizado)
+                access_stats.record(log)
+            return JsonResponse({"autorizado": autorizado})
+        except Exception as e:
+            return JsonResponse({"erro": str(e)}, status=400)
+    return JsonResponse({"erro": "Método não permitido"}, status=405)
+
+
+@require_GET
+def ingest_metrics(request):
+    """Counters of the worker that served the request, for the ingest workers (no sessions there):
+    needs ``Authorization: Bearer <METRICS_TOKEN>``; 404 while no token is configured."""
+    token = getattr(django_settings, 'METRICS_TOKEN', '')
+    if not token:
+        return JsonResponse({'status': 'error', 'message': 'Not found'}, status=404)
+    given = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        return JsonResponse({'status': 'error', 'message': 'Forbidden'}, status=403)
+    return JsonResponse({'pid': os.getpid(), 'counters': metrics.snapshot()})
+
+
+# Error handlers for the ingest URLconf, which has no template engine
+def json_not_found(request, exception=None):
+    return JsonResponse({'status': 'error', 'message': 'Not found'}, status=404)
+
+
+def json_server_error(request):
+    return JsonResponse({'status': 'error', 'message': 'Internal server error'}, status=500)
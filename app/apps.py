@@ -3,4 +3,9 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app'  # Deve ser exatamente 'app'
\ No newline at end of file
+    name = 'app'  # Deve ser exatamente 'app'
+    def ready(self):
+        from . import cards  # noqa: F401  (registers the UID index signal handlers)
+        from . import access_stats  # noqa: F401  (hourly counts follow AccessLog deletes)
+        from . import dbrouters  # noqa: F401  (read-your-writes tracking for replicas)
+        from . import checks  # noqa: F401  (app.W001: shared cache for multi-worker deploys)
@@ -0,0 +1,233 @@
+import csv
+import io
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import versions
+from .models import CartaoRFID
+
+# CSV columns (header row required); 'nome' may be missing or empty
+IMPORT_FIELDS = ['uid', 'nome', 'nome_pessoa', 'email', 'funcao', 'matricula']
+REQUIRED_FIELDS = ['uid', 'nome_pessoa', 'email', 'funcao', 'matricula']
+CHUNK_SIZE = 1000
+# Delta queries re-read this much before the newest row seen, so rows committed late with an
+# earlier ``atualizado_em`` are not missed (re-reading a row is harmless)
+SYNC_OVERLAP = timedelta(seconds=1)
+
+# version scopes (app.versions): any change / deletions (which force a full rebuild)
+_VERSION = ('cards',)
+_GENERATION = ('cards', 'generation')
+
+
+def normalize_uid(uid):
+    return (uid or '').strip()
+
+
+def cards_changed():
+    """Tell every worker's index that cards were added or updated."""
+    versions.bump(*_VERSION)
+
+
+def cards_removed():
+    """Tell every worker's index that cards were deleted (forces a full rebuild)."""
+    versions.bump(*_GENERATION)
+    versions.bump(*_VERSION)
+
+
+class UidIndex:
+    """UID -> card id for ``verifica_cartao``, kept in this worker's memory.
+
+    Writes bump a version counter in the Django cache; a lookup costs one cache read and a
+    dict lookup, and only after a bump does the index fetch the cards changed since its last
+    sync (by ``atualizado_em``). Deletions bump a generation counter instead, which makes
+    the next lookup reload everything.
+
+    The cache may not reach every worker (a per-process cache, an evicted counter), so the
+    index also syncs at least every CARD_INDEX_MAX_AGE_SECONDS: the changed cards plus a
+    count, which reveals deletions. A UID missing from the index is looked up in the DB.
+    """
+
+    def __init__(self):
+        self._by_uid = {}
+        self._uid_by_id = {}
+        self._version = None
+        self._generation = None
+        self._synced = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, uid):
+        """Card id registered for ``uid``, or None."""
+        self.refresh()
+        key = normalize_uid(uid)
+        card_id = self._by_uid.get(key)
+        if card_id is None and key:
+            # added in another worker since the last sync: the DB decides, the index learns it
+            card_id = CartaoRFID.objects.filter(uid=key).values_list('id', flat=True).first()
+            if card_id is not None:
+                with self._lock:
+                    self._by_uid[key] = card_id
+                    self._uid_by_id[card_id] = key
+        return card_id
+
+    def _fresh(self, version):
+        max_age = getattr(settings, 'CARD_INDEX_MAX_AGE_SECONDS', 5)
+        return version == self._version and time.monotonic() - self._checked < max_age
+
+    def refresh(self):
+        version = versions.current(*_VERSION)
+        if self._fresh(version):
+            return
+        with self._lock:
+            if self._fresh(version):
+                return
+            generation = versions.current(*_GENERATION)
+            if generation != self._generation or self._synced is None:
+                self._rebuild()
+                self._generation = generation
+            else:
+                self._apply(CartaoRFID.objects.filter(atualizado_em__gte=self._synced - SYNC_OVERLAP))
+                if CartaoRFID.objects.count() != len(self._uid_by_id):
+                    self._rebuild()  # a card was deleted (or missed) without a generation bump
+            self._version = version
+            self._checked = time.monotonic()
+
+    def _rebuild(self):
+        self._by_uid = {}
+        self._uid_by_id = {}
+        self._synced = None
+        self._apply(CartaoRFID.objects.all())
+
+    def _apply(self, queryset):
+        for card_id, uid, updated in queryset.values_list('id', 'uid', 'atualizado_em').iterator(chunk_size=5000):
+            key = normalize_uid(uid)
+            previous = self._uid_by_id.get(card_id)
+            if previous is not None and previous != key:
+                self._by_uid.pop(previous, None)  # UID edited in the admin
+            self._by_uid[key] = card_id
+            self._uid_by_id[card_id] = key
+            if self._synced is None or updated > self._synced:
+                self._synced = updated
+
+    def __len__(self):
+        return len(self._by_uid)
+
+    def reset(self):
+        with self._lock:
+            self._by_uid = {}
+            self._uid_by_id = {}
+            self._version = self._generation = self._synced = None
+            self._checked = 0.0
+
+
+index = UidIndex()
+
+
+@receiver(post_save, sender=CartaoRFID)
+def _card_saved(sender, **kwargs):
+    transaction.on_commit(cards_changed)
+
+
+@receiver(post_delete, sender=CartaoRFID)
+def _card_deleted(sender, **kwargs):
+    transaction.on_commit(cards_removed)
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    errors: list = field(default_factory=list)  # (line number, message)
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def _validate(row, max_lengths):
+    values = {name: (row.get(name) or '').strip() for name in IMPORT_FIELDS}
+    values['uid'] = normalize_uid(values['uid'])
+    missing = [name for name in REQUIRED_FIELDS if not values[name]]
+    if missing:
+        raise ValidationError(f"missing {', '.join(missing)}")
+    for name, value in values.items():
+        if len(value) > max_lengths[name]:
+            raise ValidationError(f'{name} longer than {max_lengths[name]} characters')
+    validate_email(values['email'])
+    return values
+
+
+def read_csv(fileobj):
+    """Yield ``(line number, row dict)`` from a CSV of cards; ',' or ';' separated, UTF-8."""
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    header = fileobj.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    columns = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter))]
+    missing = [name for name in REQUIRED_FIELDS if name not in columns]
+    if missing:
+        raise ValidationError(f"CSV header is missing: {', '.join(missing)}")
+    reader = csv.DictReader(fileobj, fieldnames=columns, delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num + 1, row
+
+
+def import_cards(fileobj, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Validate and upsert the cards of a CSV (see ``read_csv``), ``chunk_size`` rows per statement.
+
+    Existing UIDs are updated in place. Invalid rows are skipped and reported in
+    ``ImportResult.errors``; when a UID appears more than once the last row wins.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    max_lengths = {name: CartaoRFID._meta.get_field(name).max_length for name in IMPORT_FIELDS}
+    pending = {}
+
+    def flush():
+        if not pending:
+            return
+        if not dry_run:
+            with transaction.atomic():
+                CartaoRFID.objects.bulk_create(
+                    [CartaoRFID(**values) for values in pending.values()],
+                    update_conflicts=True, unique_fields=['uid'],
+                    update_fields=[name for name in IMPORT_FIELDS if name != 'uid'] + ['atualizado_em'],
+                )
+        result.imported += len(pending)
+        pending.clear()
+
+    seen = set()
+    for line, row in read_csv(fileobj):
+        result.rows += 1
+        try:
+            values = _validate(row, max_lengths)
+        except ValidationError as exc:
+            result.errors.append((line, '; '.join(exc.messages)))
+            continue
+        if values['uid'] in seen:
+            result.duplicates += 1
+            if values['uid'] not in pending:
+                # the earlier row was already written; this one overwrites it in the next chunk
+                result.imported -= 1
+        seen.add(values['uid'])
+        pending[values['uid']] = values
+        if len(pending) >= chunk_size:
+            flush()
+    flush()
+    if result.imported and not dry_run:
+        cards_changed()  # bulk_create sends no post_save
+    result.seconds = time.perf_counter() - started
+    return result
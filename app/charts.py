@@ -0,0 +1,161 @@
+"""Columnar chart data: one response with epoch timestamps and several value series.
+
+``encode`` returns either plain JSON arrays (``null`` for missing values) or, for large
+windows, base64 little-endian typed arrays the browser wraps without parsing numbers:
+timestamps as ``Uint32Array`` (epoch seconds) and values as ``Float32Array`` with NaN
+for missing values (Chart.js leaves a gap either way).
+"""
+import base64
+import math
+import struct
+
+from django.conf import settings
+from django.db import NotSupportedError, connections
+from django.db.models import Avg, FloatField, Func, IntegerField
+from django.utils import timezone
+
+from . import storage
+from .models import PavimentosSensorReading, SensorReading
+from .packed import PackedChannelsMixin, channel_names
+
+ENCODINGS = ('json', 'f32')
+
+# Fields the dashboards chart by default (temperature, humidity)
+DEFAULT_FIELDS = {
+    'default': ('sensor1', 'sensor2'),
+    'brise': ('ds18b20_1', 'dht11_1_hum'),
+    'pavimentos': ('sensor_a', 'sensor_b'),
+}
+
+
+def model_for(monitoring):
+    """Reading model charted for ``monitoring`` (None if unknown)."""
+    if monitoring == 'brise':
+        return storage.brise_model()
+    return {'default': SensorReading, 'pavimentos': PavimentosSensorReading}.get(monitoring)
+
+
+def chartable_fields(model):
+    """Numeric fields (packed channels included) that can be requested."""
+    fields = [f.name for f in model._meta.concrete_fields if isinstance(f, FloatField)]
+    if issubclass(model, PackedChannelsMixin):
+        fields = list(channel_names(model._meta.get_field('schema').default)) + fields
+    return fields
+
+
+def _window(model, since, until, device_ref):
+    queryset = model.objects.filter(timestamp__gte=since).order_by()
+    if until is not None:
+        queryset = queryset.filter(timestamp__lt=until)
+    if device_ref is not None:
+        queryset = queryset.filter(device_ref=device_ref)
+    return queryset
+
+
+def series(model, fields, since, until=None, device_ref=None):
+    """``(epoch_seconds, {field: [values]})`` of ``model`` readings in ``[since, until)``, oldest first
+    (of one device only when ``device_ref``, a ``Device`` pk, is given)."""
+    timestamps, columns = storage.series(_window(model, since, until, device_ref).order_by('timestamp'), fields)
+    if issubclass(model, PackedChannelsMixin):
+        # float32 channels: drop the binary noise (23.299999237060547) from the JSON
+        columns = {name: [None if v is None else float(f'{v:.7g}') for v in values] for name, values in columns.items()}
+    return [int(ts.timestamp()) for ts in timestamps], columns
+
+
+class EpochBucket(Func):
+    """Start (epoch seconds) of the ``seconds``-wide bucket holding a datetime column, in SQL."""
+    output_field = IntegerField()
+    templates = {
+        'sqlite': "(CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / %(seconds)d * %(seconds)d)",
+        'postgresql': 'CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / %(seconds)d) * %(seconds)d AS BIGINT)',
+        'mysql': 'FLOOR(UNIX_TIMESTAMP(%(expressions)s) / %(seconds)d) * %(seconds)d',
+    }
+
+    def __init__(self, expression, seconds):
+        super().__init__(expression)
+        self.seconds = int(seconds)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        template = self.templates.get(connection.vendor)
+        if template is None:
+            raise NotSupportedError(f'EpochBucket is not implemented for {connection.vendor}')
+        return super().as_sql(compiler, connection, template=template, seconds=self.seconds, **extra_context)
+
+
+def bounded_series(model, fields, since, until=None, device_ref=None, max_points=None):
+    """``series()`` capped at ``max_points`` (CHART_MAX_POINTS): ``(epoch_seconds, columns, bucket_seconds)``.
+
+    A window holding more readings than that is averaged by the database into equal time
+    buckets stamped with their start, so the rows read into Python stay bounded whatever
+    the window. Packed rows can't be averaged in SQL (nor can backends without
+    ``EpochBucket``); they are averaged after reading (``downsample``). ``bucket_seconds``
+    is 0 for raw readings.
+    """
+    if max_points is None:
+        max_points = getattr(settings, 'CHART_MAX_POINTS', 3000)
+    queryset = _window(model, since, until, device_ref)
+    if (issubclass(model, PackedChannelsMixin) or connections[queryset.db].vendor not in EpochBucket.templates
+            or queryset.count() <= max_points):
+        return downsample(*series(model, fields, since, until, device_ref), max_points)
+    span = int(((until or timezone.now()) - since).total_seconds())
+    seconds = max(-(-span // max_points), 1)  # ceil
+    rows = (queryset.annotate(bucket=EpochBucket('timestamp', seconds)).values('bucket')
+            .annotate(**{f'avg_{name}': Avg(name) for name in fields}).order_by('bucket'))
+    timestamps = []
+    columns = {name: [] for name in fields}
+    for row in rows:
+        timestamps.append(row['bucket'])
+        for name in fields:
+            value = row[f'avg_{name}']
+            columns[name].append(None if value is None else round(value, 4))
+    return timestamps, columns, seconds
+
+
+def downsample(timestamps, columns, max_points):
+    """Average ``series()`` output into at most ``max_points`` equal time buckets.
+
+    Returns ``(timestamps, columns, bucket_seconds)``; the input unchanged (bucket 0) when it
+    already fits. Each bucket is stamped with its first reading; missing values are skipped
+    and a bucket without any value stays ``None``.
+    """
+    if len(timestamps) <= max_points:
+        return timestamps, columns, 0
+    first = timestamps[0]
+    bucket = -(-(timestamps[-1] - first + 1) // max_points)  # ceil
+    out_ts = []
+    sums = {name: [] for name in columns}
+    counts = {name: [] for name in columns}
+    current = None
+    for i, ts in enumerate(timestamps):
+        index = (ts - first) // bucket
+        if index != current:
+            current = index
+            out_ts.append(ts)
+            for name in columns:
+                sums[name].append(0.0)
+                counts[name].append(0)
+        for name, values in columns.items():
+            value = values[i]
+            if value is not None:
+                sums[name][-1] += value
+                counts[name][-1] += 1
+    out = {name: [round(total / n, 4) if n else None for total, n in zip(sums[name], counts[name])] for name in columns}
+    return out_ts, out, bucket
+
+
+def _b64(fmt, values):
+    return base64.b64encode(struct.pack(f'<{len(values)}{fmt}', *values)).decode('ascii')
+
+
+def encode(timestamps, columns, encoding='json', bucket=0):
+    """Response body for ``series()`` (or ``downsample()``) output in one of ``ENCODINGS``."""
+    if encoding == 'f32':
+        nan = math.nan
+        return {
+            'encoding': 'f32',
+            'count': len(timestamps),
+            'bucket': bucket,
+            't': _b64('I', timestamps),
+            'series': {name: _b64('f', [nan if v is None else v for v in values]) for name, values in columns.items()},
+        }
+    return {'encoding': 'json', 'count': len(timestamps), 'bucket': bucket, 't': timestamps, 'series': columns}
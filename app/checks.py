@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# per-process backends: every worker would keep its own latest values, data versions and buckets
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'The default cache is per process.',
+        hint='With several gunicorn workers (web and ingest), readings stored by one worker do not refresh '
+             'the pages and latest values cached by the others. Set DJANGO_CACHE_URL to memcached or Redis.',
+        id='app.W001',
+    )]
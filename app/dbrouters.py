@@ -1,38 +1,190 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+
+def _configured(alias):
+    """Return ``alias`` if it is a configured connection, otherwise 'default'.
+
+    Local/SQLite deployments usually only define 'default'; in that case the
+    monitoring tables live (and are migrated) there as well.
+    """
+    return alias if alias in connections.databases else 'default'
+
+
+# model name -> database alias; other models use 'default'
+MODEL_DATABASES = {
+    'BriseSensorReading': 'brise',
+    'BrisePackedReading': 'brise',
+    'PavimentosSensorReading': 'pavimentos',
+}
+
+# Always read from the primary: their readers keep state derived from what they read (the
+# UID index syncs from "changed since", the scheduler claims due jobs, forwarding deletes
+# what it sent)
+PRIMARY_ONLY_MODELS = {'CartaoRFID', 'OutboxEntry', 'ScheduledJob'}
+
+
+def replicas(alias):
+    """Replica aliases configured for the primary ``alias`` (settings.DATABASE_REPLICAS)."""
+    return getattr(settings, 'DATABASE_REPLICAS', {}).get(alias, ())
+
+
+def primary_of(alias):
+    for primary, aliases in getattr(settings, 'DATABASE_REPLICAS', {}).items():
+        if alias in aliases:
+            return primary
+    return alias
+
+
+# --- read-your-writes: primaries written during the current request are read from directly ---
+_local = threading.local()
+
+
+def _aliases(name):
+    aliases = getattr(_local, name, None)
+    if aliases is None:
+        aliases = set()
+        setattr(_local, name, aliases)
+    return aliases
+
+
+def mark_written(alias):
+    _aliases('written').add(primary_of(alias))
+
+
+def written_aliases():
+    return set(_aliases('written'))
+
+
+def stick(alias):
+    """Read ``alias`` from the primary for the rest of this request (see ReplicaStickinessMiddleware)."""
+    _aliases('sticky').add(alias)
+
+
+def reading_primary(alias):
+    return alias in _aliases('written') or alias in _aliases('sticky')
+
+
+def reset_stickiness(**kwargs):
+    _local.written = set()
+    _local.sticky = set()
+
+
+def _mark_saved(sender, using, **kwargs):
+    # saves with an explicit using= (ingest) never reach db_for_write
+    mark_written(using)
+
+
+request_started.connect(reset_stickiness, dispatch_uid='dbrouters.reset_stickiness')
+post_save.connect(_mark_saved, dispatch_uid='dbrouters.mark_saved')
+post_delete.connect(_mark_saved, dispatch_uid='dbrouters.mark_deleted')
+
+
+# --- replica lag ---
+_LAG_QUERIES = {
+    # 0 on a primary or a caught-up standby, else the age of the last replayed transaction
+    'postgresql': ("SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                   "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"),
+}
+
+
+class LagMonitor:
+    """Replication lag per replica, measured at most every REPLICA_LAG_CHECK_SECONDS per process.
+
+    Backends without a lag query (SQLite copies refreshed out of band) count as 0 s behind; an
+    unreachable replica counts as infinitely behind until its next check.
+    """
+
+    def __init__(self):
+        self.lags = {}  # alias -> (checked at (monotonic), lag seconds)
+        self._lock = threading.Lock()
+
+    def lag(self, alias):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_SECONDS', 5)
+        checked = self.lags.get(alias)
+        if checked is None or time.monotonic() - checked[0] > interval:
+            with self._lock:
+                checked = self.lags.get(alias)
+                if checked is None or time.monotonic() - checked[0] > interval:
+                    checked = self.lags[alias] = (time.monotonic(), self.measure(alias))
+        return checked[1]
+
+    def measure(self, alias):
+        connection = connections[alias]
+        query = _LAG_QUERIES.get(connection.vendor)
+        if query is None:
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                value = cursor.fetchone()[0]
+        except Exception:
+            connection.close()
+            return float('inf')
+        return float(value or 0)
+
+    def healthy(self, alias):
+        """Replicas of ``alias`` that are within REPLICA_MAX_LAG_SECONDS."""
+        limit = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+        return [replica for replica in replicas(alias) if self.lag(replica) <= limit]
+
+
+lag_monitor = LagMonitor()
+
+
 class MonitoringRouter:
     """DB router to send monitoring app models to specific databases.
 
-    - Models named 'BriseSensorReading' -> database 'brise'
+    - Models named 'BriseSensorReading' / 'BrisePackedReading' -> database 'brise'
     - Models named 'PavimentosSensorReading' -> database 'pavimentos'
     - Other models -> 'default'
+
+    When 'brise' / 'pavimentos' are not configured the models fall back to 'default'.
+
+    Reads go to a random replica of that database (settings.DATABASE_REPLICAS) that is within
+    REPLICA_MAX_LAG_SECONDS, except inside a transaction on it, after the current request wrote
+    to it (read-your-writes), and for PRIMARY_ONLY_MODELS.
     """
 
+    def _primary(self, model):
+        alias = MODEL_DATABASES.get(model.__name__)
+        return _configured(alias) if alias else 'default'
+
     def db_for_read(self, model, **hints):
-        name = model.__name__
-        if name == 'BriseSensorReading':
-            return 'brise'
-        if name == 'PavimentosSensorReading':
-            return 'pavimentos'
-        return 'default'
+        primary = self._primary(model)
+        if (not replicas(primary) or model.__name__ in PRIMARY_ONLY_MODELS or reading_primary(primary)
+                or connections[primary].in_atomic_block):
+            return primary
+        healthy = lag_monitor.healthy(primary)
+        return random.choice(healthy) if healthy else primary
 
     def db_for_write(self, model, **hints):
-        return self.db_for_read(model, **hints)
+        primary = self._primary(model)
+        mark_written(primary)
+        return primary
 
     def allow_relation(self, obj1, obj2, **hints):
-        db1 = self.db_for_read(obj1.__class__)
-        db2 = self.db_for_read(obj2.__class__)
+        db1 = primary_of(obj1._state.db or self._primary(obj1.__class__))
+        db2 = primary_of(obj2._state.db or self._primary(obj2.__class__))
         if db1 and db2:
             return db1 == db2
         return None
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if primary_of(db) != db:
+            return False  # replicas get the schema through replication
         # Ensure sensor models are migrated to their databases
         if app_label == 'app':
-            if model_name == 'brisesensorreading':
-                return db == 'brise'
-            if model_name == 'pavimentossensorreading':
-                return db == 'pavimentos'
+            for name, alias in MODEL_DATABASES.items():
+                if model_name == name.lower():
+                    return db == _configured(alias)
             # everything else in app -> default
             return db == 'default'
         # other apps follow default
         return None
-
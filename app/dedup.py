@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+# Readings this far behind a device's newest seq are not tracked in memory; the
+# (device_ref, seq) unique constraint decides for those.
+WINDOW_SIZE = 64
+MAX_DEVICES = 10000
+
+
+class SeqWindow:
+    """High-water mark plus a bitmap of the last ``WINDOW_SIZE`` sequence numbers of one device.
+
+    Bit ``n`` of ``bitmap`` is set when ``high - n`` has been stored (the anti-replay
+    window used by IPsec), so retries and slightly out-of-order readings are answered
+    from memory.
+    """
+
+    __slots__ = ('high', 'bitmap')
+
+    def __init__(self):
+        self.high = None
+        self.bitmap = 0
+
+    def seen(self, seq):
+        """True if ``seq`` was stored, False if not, None if it is older than the window."""
+        if self.high is None or seq > self.high:
+            return False
+        offset = self.high - seq
+        if offset >= WINDOW_SIZE:
+            return None
+        return bool(self.bitmap >> offset & 1)
+
+    def mark(self, seq):
+        if self.high is None:
+            self.high, self.bitmap = seq, 1
+        elif seq > self.high:
+            shift = seq - self.high
+            self.bitmap = (self.bitmap << shift | 1) & ((1 << WINDOW_SIZE) - 1) if shift < WINDOW_SIZE else 1
+            self.high = seq
+        elif self.high - seq < WINDOW_SIZE:
+            self.bitmap |= 1 << (self.high - seq)
+
+
+_windows = OrderedDict()
+_lock = threading.Lock()
+
+
+def _window(model, device_id, create=False):
+    key = (model._meta.label_lower, device_id)
+    window = _windows.get(key)
+    if window is None and create:
+        window = _windows[key] = SeqWindow()
+        if len(_windows) > MAX_DEVICES:
+            _windows.popitem(last=False)
+    return window
+
+
+def is_duplicate(model, device_id, seq):
+    """True when this worker already stored ``seq`` for the device (no DB access)."""
+    with _lock:
+        window = _window(model, device_id)
+        return bool(window and window.seen(seq))
+
+
+def mark(model, device_id, seq):
+    with _lock:
+        _window(model, device_id, create=True).mark(seq)
+
+
+def reset():
+    with _lock:
+        _windows.clear()
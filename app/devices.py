@@ -0,0 +1,73 @@
+"""Device registry: ``device_id`` strings -> ``Device`` primary keys, cached per worker.
+
+Readings store the integer ``device_ref`` next to ``device_id``; per-device queries use it
+with the ``(device_ref, timestamp)`` indexes. Unknown devices are registered on first
+contact, so ingest costs a DB round-trip only for a device's first reading in each worker
+(and again for one that fell out of its ``MAX_DEVICES`` cache).
+Device rows are not meant to be deleted (readings keep their ``device_ref``); edit them instead.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Device
+
+# Device ids this worker remembers (least recently used dropped first), as in app.timestamps
+MAX_DEVICES = 10000
+
+
+class DeviceRegistry:
+    def __init__(self, max_devices=MAX_DEVICES):
+        self.max_devices = max_devices
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            pk = self._ids.get(key)
+            if pk is not None:
+                self._ids.move_to_end(key)
+            return pk
+
+    def _remember(self, key, pk):
+        with self._lock:
+            self._ids[key] = pk
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.max_devices:
+                self._ids.popitem(last=False)
+
+    def resolve(self, monitoring, device_id):
+        """Device pk for ``device_id`` of ``monitoring``, registering the device if new."""
+        if not device_id:
+            return None
+        key = (monitoring, device_id)
+        pk = self._get(key)
+        if pk is None:
+            # outside the lock: a new device's round-trip doesn't hold up the known ones
+            pk = self._register(monitoring, device_id)
+            self._remember(key, pk)
+        return pk
+
+    def lookup(self, monitoring, device_id):
+        """Device pk, or None for a device that never reported (no registration)."""
+        key = (monitoring, device_id)
+        pk = self._get(key)
+        if pk is None:
+            pk = Device.objects.filter(monitoring=monitoring, device_id=device_id).values_list('pk', flat=True).first()
+            if pk is not None:
+                self._remember(key, pk)
+        return pk
+
+    def _register(self, monitoring, device_id):
+        defaults = {'intervalo_esperado': getattr(settings, 'DEVICE_DEFAULT_INTERVAL_SECONDS', 30)}
+        # get_or_create retries the get when another worker registered it first
+        device, _ = Device.objects.get_or_create(monitoring=monitoring, device_id=device_id, defaults=defaults)
+        return device.pk
+
+    def reset(self):
+        with self._lock:
+            self._ids.clear()
+
+
+registry = DeviceRegistry()
@@ -0,0 +1,35 @@
+from django import forms
+from django.contrib.auth.models import Group
+
+from .models import CartaoRFID
+
+
+class CartaoRFIDForm(forms.ModelForm):
+    class Meta:
+        model = CartaoRFID
+        fields = ['uid', 'nome', 'nome_pessoa', 'email', 'funcao', 'matricula']
+        labels = {'uid': 'UID do Cartão', 'nome': 'Nome do Cartão (opcional)', 'nome_pessoa': 'Nome da Pessoa', 'email': 'E-mail', 'funcao': 'Função', 'matricula': 'Matrícula'}
+
+
+class CartaoImportForm(forms.Form):
+    arquivo = forms.FileField(label='Arquivo CSV', help_text='Colunas: uid, nome, nome_pessoa, email, funcao, matricula')
+
+
+#====== LOGIN FORM ======#
+class LoginForm(forms.Form):
+    username = forms.CharField()
+    password = forms.CharField(widget=forms.PasswordInput)
+
+
+class RegisterForm(forms.Form):
+    username = forms.CharField(label='Usuário', max_length=150)
+    password = forms.CharField(label='Senha', widget=forms.PasswordInput)
+    first_name = forms.CharField(label='Primeiro Nome', max_length=30)
+    last_name = forms.CharField(label='Sobrenome', max_length=30)
+    email = forms.EmailField(label='E-mail')
+    group = forms.ChoiceField(label='Grupo', choices=[])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Preenche os grupos disponíveis para seleção
+        self.fields['group'].choices = [(g.id, g.name) for g in Group.objects.all()]
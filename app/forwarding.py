@@ -0,0 +1,342 @@
+"""Forwarding of stored readings to external time-series sinks (ThingSpeak, InfluxDB, a file).
+
+Devices talk to our server only. ``receive_sensor_data`` enqueues every stored reading for
+each configured sink (settings.FORWARDING_SINKS) as an ``OutboxEntry`` row in 'default', in
+the same transaction as the reading, so a stored reading is never missing from the outbox; the
+``forward_outbox`` job (app.jobs) delivers them in batches, one request per sink for up to
+``batch_size`` readings, over keep-alive connections. A failed batch stays in the outbox
+and is retried with exponential backoff (FORWARDING_RETRY_SECONDS doubling up to
+FORWARDING_MAX_BACKOFF_SECONDS); after FORWARDING_MAX_ATTEMPTS its entries are parked.
+Delivery is at least once: a sink sees a batch again if the process dies between sending
+it and deleting its entries.
+
+A sink is a class built from its settings entry (``'class'`` plus keyword arguments) with
+``accepts(point)`` and ``send(points)``, which raises on failure. Points are plain dicts:
+``{'monitoring', 'device_id', 'timestamp' (ISO 8601), 'fields': {name: value}}``.
+"""
+import functools
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import charts, latest, metrics
+from .models import OutboxEntry
+
+logger = logging.getLogger(__name__)
+
+
+class SinkError(Exception):
+    pass
+
+
+class HttpPool:
+    """Keep-alive HTTP(S) connections per origin, reused across batches (stdlib ``http.client``).
+
+    Not thread-safe: each sink owns one and the forward job sends one batch at a time.
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.opened = 0
+        self._connections = {}
+
+    def _connection(self, scheme, host, port):
+        key = (scheme, host, port)
+        connection = self._connections.get(key)
+        if connection is None:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            connection = self._connections[key] = cls(host, port, timeout=self.timeout)
+            self.opened += 1
+        return key, connection
+
+    def request(self, method, url, body=None, headers=None):
+        """``(status, body)`` of the response; raises SinkError when no response came back."""
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        for attempt in range(2):
+            key, connection = self._connection(parts.scheme, parts.hostname, parts.port)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                del self._connections[key]
+                if attempt:
+                    raise SinkError(f'{method} {url}: {e}') from e
+                continue  # the server may have closed an idle keep-alive connection: once more on a new one
+            if response.will_close:
+                connection.close()
+                del self._connections[key]
+            return response.status, data
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+
+class Sink:
+    """Base sink: ``monitorings`` limits what is enqueued for it (default: everything)."""
+    batch_size = 500
+
+    def __init__(self, name, monitorings=None, batch_size=None, timeout=10):
+        self.name = name
+        self.monitorings = set(monitorings) if monitorings else None
+        if batch_size:
+            self.batch_size = batch_size
+        self.timeout = timeout
+
+    def accepts(self, point):
+        return self.monitorings is None or point['monitoring'] in self.monitorings
+
+    def send(self, points):
+        raise NotImplementedError
+
+
+class HttpSink(Sink):
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.http = HttpPool(self.timeout)
+
+    def post(self, url, body, headers):
+        status, data = self.http.request('POST', url, body, headers)
+        if status >= 300:
+            raise SinkError(f'HTTP {status} from {url}: {data[:200]!r}')
+        return data
+
+
+def _epoch(iso):
+    return int(datetime.fromisoformat(iso).timestamp())
+
+
+def _escape(text):
+    # line protocol: commas, spaces and equals signs in tag values and keys are backslash-escaped
+    return str(text).replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ').replace('=', '\\=')
+
+
+class InfluxLineSink(HttpSink):
+    """InfluxDB line protocol, one POST per batch. ``url`` is the full write URL with second
+    precision, e.g. ``http://influx:8086/api/v2/write?org=eco&bucket=ecoview&precision=s``
+    (v2, with ``token``) or ``http://influx:8086/write?db=ecoview&precision=s`` (v1)."""
+    batch_size = 5000
+
+    def __init__(self, name, url, token=None, measurement='ecoview', **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.measurement = measurement
+        self.headers = {'Content-Type': 'text/plain; charset=utf-8'}
+        if token:
+            self.headers['Authorization'] = f'Token {token}'
+
+    def line(self, point):
+        tags = f'monitoring={_escape(point["monitoring"])}'
+        if point.get('device_id'):
+            tags += f',device_id={_escape(point["device_id"])}'
+        fields = ','.join(f'{_escape(name)}={float(value)!r}' for name, value in point['fields'].items())
+        return f'{_escape(self.measurement)},{tags} {fields} {_epoch(point["timestamp"])}' if fields else None
+
+    def send(self, points):
+        lines = [line for line in map(self.line, points) if line]
+        if lines:
+            self.post(self.url, '\n'.join(lines).encode('utf-8'), self.headers)
+
+
+class ThingSpeakSink(HttpSink):
+    """One ThingSpeak-style channel, fed through its bulk update API (one POST per batch).
+
+    ``fields`` maps channel fields to reading fields, e.g. ``{'field1': 'dht11_1_hum'}``;
+    ``monitoring`` selects the readings. Configure one sink per channel.
+    """
+    batch_size = 900  # ThingSpeak accepts up to 960 updates per bulk request
+
+    def __init__(self, name, channel_id, api_key, fields, monitoring='brise', url='https://api.thingspeak.com',
+                 **kwargs):
+        super().__init__(name, monitorings=[monitoring], **kwargs)
+        self.url = f'{url.rstrip("/")}/channels/{channel_id}/bulk_update.json'
+        self.api_key = api_key
+        self.fields = fields
+
+    def send(self, points):
+        updates = []
+        for point in points:
+            values = {field: point['fields'][name] for field, name in self.fields.items() if name in point['fields']}
+            if values:
+                updates.append({'created_at': point['timestamp'], **values})
+        if updates:
+            body = json.dumps({'write_api_key': self.api_key, 'updates': updates}).encode('utf-8')
+            self.post(self.url, body, {'Content-Type': 'application/json'})
+
+
+class FileSink(Sink):
+    """Appends points as JSON lines to ``path`` (synced to disk before the batch counts as sent)."""
+    batch_size = 5000
+
+    def __init__(self, name, path, **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+
+    def send(self, points):
+        with open(self.path, 'a', encoding='utf-8') as out:
+            out.writelines(json.dumps(point, ensure_ascii=False) + '\n' for point in points)
+            out.flush()
+            os.fsync(out.fileno())
+
+
+_sinks = (None, {})
+
+
+def sinks():
+    """Configured sinks by name, rebuilt when settings.FORWARDING_SINKS changes."""
+    global _sinks
+    config = getattr(settings, 'FORWARDING_SINKS', {})
+    if _sinks[0] is not config:
+        built = {}
+        for name, options in config.items():
+            options = dict(options)
+            built[name] = import_string(options.pop('class'))(name, **options)
+        _sinks = (config, built)
+    return _sinks[1]
+
+
+@functools.lru_cache(maxsize=None)
+def _numeric_fields(model):
+    return tuple(charts.chartable_fields(model))
+
+
+def point(reading, monitoring):
+    values = latest.snapshot(reading)
+    return {
+        'monitoring': monitoring,
+        'device_id': reading.device_id,
+        'timestamp': reading.timestamp.isoformat(),
+        # NaN/inf are not valid JSON, line protocol or ThingSpeak values: such a channel is left out
+        'fields': {name: values[name] for name in _numeric_fields(type(reading))
+                   if values.get(name) is not None and math.isfinite(values[name])},
+    }
+
+
+def enqueue(points):
+    """Add ``points`` to the outbox of every sink that accepts them (no query without sinks)."""
+    configured = sinks()
+    if not configured:
+        return 0
+    entries = [OutboxEntry(sink=name, payload=p) for p in points for name, sink in configured.items() if sink.accepts(p)]
+    OutboxEntry.objects.bulk_create(entries)
+    return len(entries)
+
+
+def _retry_later(entries, error, now):
+    base = getattr(settings, 'FORWARDING_RETRY_SECONDS', 30)
+    cap = getattr(settings, 'FORWARDING_MAX_BACKOFF_SECONDS', 3600)
+    limit = getattr(settings, 'FORWARDING_MAX_ATTEMPTS', 50)
+    by_attempts = {}
+    for entry in entries:
+        by_attempts.setdefault(entry.attempts + 1, []).append(entry.pk)
+    for attempts, pks in by_attempts.items():
+        if attempts >= limit:
+            next_attempt = None
+            logger.error('forwarding: parked %d readings for %s after %d attempts: %s',
+                         len(pks), entries[0].sink, attempts, error)
+        else:
+            # jitter: sinks recovering from an outage don't get every worker's backlog at once
+            delay = min(base * 2 ** (attempts - 1), cap) * random.uniform(0.8, 1.2)
+            next_attempt = now + timedelta(seconds=delay)
+        OutboxEntry.objects.filter(pk__in=pks).update(attempts=attempts, next_attempt=next_attempt,
+                                                      last_error=str(error)[-2000:])
+
+
+def _send(sink, entries):
+    try:
+        sink.send([entry.payload for entry in entries])
+    except Exception as e:
+        return e
+    return None
+
+
+def _deliver(sink, entries, error=None):
+    """Send ``entries`` (already failed with ``error``, if given); a failed batch is split in halves
+    until the entries that fail on their own are found. Returns ``(delivered, [(entries, error)])``.
+
+    When both halves of a failed batch fail too, the sink itself is taken to be failing and the
+    batch is not split further, so an unreachable sink costs two extra requests, not one per entry.
+    """
+    if error is None:
+        error = _send(sink, entries)
+        if error is None:
+            return entries, []
+    if len(entries) == 1:
+        return [], [(entries, error)]
+    middle = len(entries) // 2
+    halves = [(half, _send(sink, half)) for half in (entries[:middle], entries[middle:])]
+    if all(half_error is not None for _, half_error in halves):
+        return [], [(entries, error)]
+    delivered, failed = [], []
+    for half, half_error in halves:
+        if half_error is None:
+            delivered += half
+        else:
+            sent, bad = _deliver(sink, half, half_error)
+            delivered += sent
+            failed += bad
+    return delivered, failed
+
+
+def flush_sink(name, sink, now=None, max_seconds=None):
+    """Deliver due entries of one sink, a batch at a time, until none are due, the sink fails a
+    whole batch or ``max_seconds`` passed. Entries that fail on their own are backed off (and in
+    the end parked) alone; the rest of their batch is delivered. Returns the number delivered."""
+    started = time.monotonic()
+    delivered = 0
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        due = now or timezone.now()
+        entries = list(OutboxEntry.objects.filter(sink=name, next_attempt__lte=due).order_by('pk')[:sink.batch_size])
+        if not entries:
+            break
+        sent, failed = _deliver(sink, entries)
+        for group, error in failed:
+            metrics.incr(f'forwarding.{name}.failures')
+            logger.warning('forwarding: %d readings for %s failed, retrying later: %s', len(group), name, error)
+            _retry_later(group, error, due)
+        if sent:
+            OutboxEntry.objects.filter(pk__in=[entry.pk for entry in sent]).delete()
+            delivered += len(sent)
+            metrics.incr(f'forwarding.{name}.delivered', len(sent))
+        elif failed:
+            break  # nothing of the batch went through: try the sink again on the next run
+        if len(entries) < sink.batch_size:
+            break
+    return delivered
+
+
+def flush(now=None, max_seconds=None):
+    """``flush_sink`` for every configured sink; returns ``{sink: delivered}``."""
+    return {name: flush_sink(name, sink, now, max_seconds) for name, sink in sinks().items()}
+
+
+def status():
+    """Per sink in the outbox: pending, due, parked and the oldest entry's creation time."""
+    now = timezone.now()
+    rows = (OutboxEntry.objects.values('sink').order_by('sink')
+            .annotate(pending=Count('pk'), due=Count('pk', filter=Q(next_attempt__lte=now)),
+                      parked=Count('pk', filter=Q(next_attempt__isnull=True)), oldest=Min('criado_em')))
+    return {row.pop('sink'): row for row in rows}
+
+
+def retry_parked(sink=None):
+    """Make parked entries (of ``sink``, or all) due again with a fresh attempt count."""
+    parked = OutboxEntry.objects.filter(next_attempt__isnull=True)
+    if sink:
+        parked = parked.filter(sink=sink)
+    return parked.update(next_attempt=timezone.now(), attempts=0)
@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWriter:
+    """Single-writer funnel for sensor readings.
+
+    Request threads call ``submit()`` and wait on the returned future; one background
+    thread drains the queue and commits everything it collected (up to ``batch_size``
+    items) in one transaction per database alias. On SQLite this turns N concurrent
+    commits into one lock acquisition and one WAL sync.
+    """
+
+    def __init__(self, batch_size=200, max_wait=0):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, instance, using='default', prepare=None, after=None):
+        """Queue ``instance`` for saving on ``using``; returns a Future resolved with the instance.
+
+        ``prepare(instance)`` runs on the writer thread just before the save, so any writes it
+        needs (e.g. registering the device) don't come from request threads either.
+        ``after(instances)`` runs inside the batch transaction, after the saves, called once with
+        every instance of the batch that passed the same ``after``. If it raises, the batch rolls
+        back like a failed save.
+        """
+        future = Future()
+        self._queue.put((instance, using, future, prepare, after))
+        self.start()
+        return future
+
+    def _collect(self):
+        # Whatever queued up while the previous batch was committing goes into the next one;
+        # ``max_wait`` optionally lingers for more readings before committing.
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                if self.max_wait:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            by_alias = defaultdict(list)
+            for instance, using, future, prepare, after in batch:
+                if prepare is not None:
+                    try:
+                        prepare(instance)
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+                by_alias[using].append((instance, after, future))
+            saved = []
+            for alias, items in by_alias.items():
+                self._commit(alias, items, saved)
+            for instance, _, future in saved:
+                future.set_result(instance)
+
+    def _commit(self, alias, items, saved):
+        try:
+            with transaction.atomic(using=alias):
+                for instance, _, _ in items:
+                    instance.save(using=alias)
+                hooks = defaultdict(list)
+                for instance, after, _ in items:
+                    if after is not None:
+                        hooks[after].append(instance)
+                for after, instances in hooks.items():
+                    after(instances)
+        except Exception as e:
+            if len(items) == 1:
+                # IntegrityError is a duplicate (device_ref, seq); the caller answers it
+                if not isinstance(e, IntegrityError):
+                    logger.error(f"Ingest writer failed to save reading on '{alias}': {e}")
+                    connections[alias].close_if_unusable_or_obsolete()
+                items[0][2].set_exception(e)
+                return
+            # One bad reading (e.g. a duplicate seq) or a failed hook rolled back the whole batch: the rolled back
+            # instances still carry their pks, so clear them and retry one by one.
+            for instance, _, _ in items:
+                instance.pk = None
+                instance._state.adding = True
+            for item in items:
+                self._commit(alias, [item], saved)
+            return
+        saved.extend(items)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the per-process writer, creating it from settings on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = IngestWriter(
+                    batch_size=getattr(settings, 'INGEST_WRITER_BATCH_SIZE', 200),
+                    max_wait=getattr(settings, 'INGEST_WRITER_MAX_WAIT_MS', 0) / 1000,
+                )
+    return _writer
@@ -0,0 +1,63 @@
+"""Maintenance jobs run by ``manage.py run_scheduler`` (see app.scheduler)."""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from . import access_stats, forwarding, storage
+from .models import Device, PavimentosSensorReading, SensorReading
+from .scheduler import job
+
+logger = logging.getLogger(__name__)
+
+STALE_DEVICES_KEY = 'devices:stale'
+# devices silent for longer than this are considered retired, not stale
+STALE_HORIZON = timedelta(days=7)
+
+
+def stale_devices():
+    """``{monitoring: {device_id: last reading}}`` as of the last ``detect_stale_devices`` run."""
+    return cache.get(STALE_DEVICES_KEY, {})
+
+
+@job(every=timedelta(minutes=5))
+def detect_stale_devices():
+    """Find devices that reported in the last week but not recently: within ``STALE_DEVICE_MINUTES``
+    or three of their expected intervals, whichever is longer."""
+    now = timezone.now()
+    minimum = timedelta(minutes=getattr(settings, 'STALE_DEVICE_MINUTES', 30))
+    previous = stale_devices()
+    found = {}
+    for monitoring, model in (('default', SensorReading), ('brise', storage.brise_model()),
+                              ('pavimentos', PavimentosSensorReading)):
+        last_seen = dict(model.objects.filter(timestamp__gte=now - STALE_HORIZON, device_ref__isnull=False)
+                         .values('device_ref').annotate(last=Max('timestamp')).filter(last__lt=now - minimum)
+                         .order_by().values_list('device_ref', 'last'))
+        found[monitoring] = {}
+        for device in Device.objects.filter(pk__in=last_seen):
+            last = last_seen[device.pk]
+            if last < now - max(minimum, timedelta(seconds=3 * device.intervalo_esperado)):
+                found[monitoring][device.device_id] = last
+                if device.device_id not in previous.get(monitoring, {}):
+                    logger.warning('device %s (%s) silent since %s', device.device_id, monitoring, last.isoformat())
+    cache.set(STALE_DEVICES_KEY, found, None)
+    return {monitoring: len(devices) for monitoring, devices in found.items()}
+
+
+@job(every=timedelta(minutes=15))
+def access_summary_catchup():
+    """Recompute the last two closed hours of swipe counts, repairing them after AccessLog rows
+    were written or deleted outside ``verifica_cartao`` (raw SQL, restores). The current hour is
+    left to ``record()``; it is repaired once it has closed."""
+    now = timezone.now()
+    return access_stats.rebuild_hourly(now - timedelta(hours=2), until=now)
+
+
+@job(every=timedelta(seconds=getattr(settings, 'FORWARDING_INTERVAL_SECONDS', 15)))
+def forward_outbox():
+    """Deliver queued readings to the external sinks (app.forwarding); a no-op without sinks.
+    Stops after two minutes so a slow sink can't outlive the lease."""
+    return forwarding.flush(max_seconds=120)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .versions import key_part
+
+# Latest-value state per reading model (and per device), kept in the Django cache so
+# ``/api/latest/``-style lookups don't query the readings table. Updates are a
+# monotonic merge on timestamp: backfilled (older) readings never replace it. Entries
+# expire after LATEST_CACHE_TIMEOUT, so devices that stopped reporting don't hold cache
+# space forever; a miss reads the newest row again.
+
+
+def _key(model, device_ref=None):
+    key = f'latest:{model._meta.label_lower}'
+    return f'{key}:{key_part(device_ref)}' if device_ref is not None else key
+
+
+def snapshot(reading):
+    data = {f.attname: getattr(reading, f.attname) for f in reading._meta.concrete_fields}
+    if hasattr(reading, 'channels'):
+        # packed layout: expose the channels like the wide models' columns
+        for name in ('schema', 'mask', 'values'):
+            data.pop(name)
+        data.update(reading.channels())
+    return data
+
+
+def _merge(key, data):
+    current = cache.get(key)
+    if current is None or data['timestamp'] >= current['timestamp']:
+        cache.set(key, data, getattr(settings, 'LATEST_CACHE_TIMEOUT', 86400))
+        return True
+    return False
+
+
+def update(reading):
+    """Merge a freshly stored reading; returns True if it is now the model's latest."""
+    data = snapshot(reading)
+    model = type(reading)
+    if reading.device_ref is not None:
+        _merge(_key(model, reading.device_ref), data)
+    return _merge(_key(model), data)
+
+
+def get(model, device_ref=None):
+    """Latest reading values (of one device when ``device_ref``, a ``Device`` pk, is given) as a
+    dict (None if nothing stored); falls back to the DB once."""
+    key = _key(model, device_ref)
+    data = cache.get(key)
+    if data is None:
+        qs = model.objects.all()
+        if device_ref is not None:
+            qs = qs.filter(device_ref=device_ref)
+        reading = qs.order_by('-timestamp').first()
+        if reading is None:
+            return None
+        data = snapshot(reading)
+        _merge(key, data)
+    return data
@@ -0,0 +1,195 @@
+"""Non-blocking structured logging (wired up in settings.LOGGING).
+
+Request threads never touch the log files: ``QueuedHandler`` formats each record (one JSON
+object per line, ``JsonFormatter``) and puts it on a bounded in-memory queue; a listener
+thread per process writes the queue to the console and the rotating file. A slow or
+stalled log disk fills the queue instead of stalling requests. When the queue is full,
+records are dropped and counted (``logging.dropped`` in app.metrics), and a warning with
+the count is logged once there is room again.
+
+Records carry the fields bound for the current request with ``bind``: request id, path,
+device id (ingest), and ``elapsed_ms`` since the request started (see
+``RequestContextMiddleware``). ``RepeatedErrorSampler`` keeps a device stuck on the same
+failure from flooding the log with identical tracebacks.
+
+Imported while settings are configured: nothing here may import models.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.core.signals import request_finished, request_started
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+_context = contextvars.ContextVar('log_context', default={})
+
+# attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def begin(**fields):
+    """Start a request's log context (``started`` is set for ``elapsed_ms``); ``clear`` ends it."""
+    _context.set({'started': time.perf_counter(), **fields})
+
+
+def bind(**fields):
+    """Add fields to every record logged later in the current request (or thread)."""
+    _context.set({**_context.get(), **fields})
+
+
+def context():
+    return _context.get()
+
+
+def clear(**kwargs):
+    _context.set({})
+
+
+# A request's context lives until its response is finished, so Django's own response records
+# ('Not Found: ...', logged after the middleware returned) still carry the request id
+request_started.connect(clear, dispatch_uid='logs.reset_context')
+request_finished.connect(clear, dispatch_uid='logs.clear_context')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, the bound context, ``extra=``
+    fields and the traceback (``exc``)."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = dict(context())
+        started = fields.pop('started', None)
+        if started is not None:
+            entry['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        entry.update(fields)
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RepeatedErrorSampler(logging.Filter):
+    """Pass the first ``burst`` warnings/errors per ``window`` seconds from the same call site with
+    the same exception type; drop the rest. The first record let through after a drop carries
+    ``suppressed`` (how many were dropped since the previous one)."""
+
+    def __init__(self, burst=5, window=60.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._seen = {}  # key -> [window start, count in window, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ''
+        key = (record.name, record.pathname, record.lineno, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if len(self._seen) > 10000:  # forget call sites that went quiet
+                    self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+                suppressed = entry[2] if entry else 0
+                entry = self._seen[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+            entry[1] += 1
+            if entry[1] > self.burst:
+                entry[2] += 1
+                metrics.incr('logging.suppressed')
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def _build(config):
+    """Handler from a settings-style dict: 'class' plus its keyword arguments (and 'level')."""
+    config = dict(config)
+    level = config.pop('level', None)
+    handler = import_string(config.pop('class'))(**config)
+    handler.setFormatter(logging.Formatter('%(message)s'))  # records arrive formatted
+    if level:
+        handler.setLevel(level)
+    return handler
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    """Format on the caller's thread, write on a listener thread to ``targets`` (handler
+    configs: ``{'class': ..., **kwargs}``). At most ``maxsize`` records wait; beyond that
+    they are dropped rather than blocking the caller."""
+
+    def __init__(self, targets, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.targets = [_build(target) for target in targets]
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = None
+        self._start()
+        atexit.register(self.close)
+        # the listener thread doesn't survive fork (gunicorn --preload): start a new one in the child
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart(self):
+        self.queue = queue.Queue(self.maxsize)
+        self._start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            metrics.incr('logging.dropped')
+            return
+        if self.dropped:
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                notice = logging.LogRecord('app.logs', logging.WARNING, __file__, 0,
+                                           '%d log records dropped: log queue full (slow log disk?)', (dropped,), None)
+                try:
+                    self.queue.put_nowait(self.prepare(notice))
+                except queue.Full:
+                    with self._dropped_lock:
+                        self.dropped += dropped
+
+    def flush(self):
+        """Block until the listener has written everything queued so far."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.queue.join()
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None and listener._thread is not None:
+            self.queue.put(listener._sentinel)  # blocking: stop() would raise on a full queue
+            listener._thread.join()
+            listener._thread = None
+        for target in self.targets:
+            target.close()
+        super().close()
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import devices
+from app.models import BrisePackedReading, BriseSensorReading, PavimentosSensorReading, SensorReading
+
+READING_MODELS = [('default', SensorReading), ('brise', BriseSensorReading), ('brise', BrisePackedReading),
+                  ('pavimentos', PavimentosSensorReading)]
+
+
+class Command(BaseCommand):
+    help = 'Register the devices of existing readings and fill in their device_ref (safe to re-run).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Readings per pk range; each device of a range is one short UPDATE.')
+
+    def handle(self, *args, **options):
+        for monitoring, model in READING_MODELS:
+            started = time.perf_counter()
+            updated = self.backfill(monitoring, model, options['batch_size'])
+            self.stdout.write(f'{model.__name__:<26} {updated:>9} readings updated in {time.perf_counter() - started:.1f}s')
+        self.stdout.write(self.style.SUCCESS('device_ref backfilled'))
+
+    def backfill(self, monitoring, model, batch_size):
+        pending = model.objects.filter(device_ref__isnull=True)
+        updated = last = 0
+        while True:
+            ids = list(pending.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return updated
+            chunk = pending.filter(pk__gte=ids[0], pk__lte=ids[-1])
+            for device_id in chunk.exclude(device_id=None).values_list('device_id', flat=True).distinct().order_by():
+                if device_id:
+                    ref = devices.registry.resolve(monitoring, device_id)
+                    updated += chunk.filter(device_id=device_id).update(device_ref=ref)
+            last = ids[-1]
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from app import forwarding
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued readings to the external sinks (FORWARDING_SINKS) once, or show the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true', help='Show pending, due and parked entries per sink.')
+        parser.add_argument('--retry-parked', nargs='?', const='', metavar='SINK',
+                            help='Make parked entries (of SINK, or all) due again before delivering.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            rows = forwarding.status()
+            if not rows:
+                self.stdout.write('Outbox empty.')
+            configured = forwarding.sinks()
+            for sink, row in rows.items():
+                note = '' if sink in configured else self.style.WARNING('  (not configured)')
+                self.stdout.write(f'{sink:<20} pending {row["pending"]:>8}  due {row["due"]:>8}  '
+                                  f'parked {row["parked"]:>6}  oldest {row["oldest"]:%Y-%m-%d %H:%M:%S}{note}')
+            return
+        if options['retry_parked'] is not None:
+            count = forwarding.retry_parked(options['retry_parked'] or None)
+            self.stdout.write(f'{count} parked entries due again.')
+        if not forwarding.sinks():
+            self.stdout.write('No sinks configured (FORWARDING_SINKS).')
+            return
+        for sink, delivered in forwarding.flush().items():
+            self.stdout.write(f'{sink:<20} delivered {delivered}')
@@ -0,0 +1,28 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from app import cards
+
+
+class Command(BaseCommand):
+    help = 'Upsert RFID cards from a CSV (uid, nome, nome_pessoa, email, funcao, matricula).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file; "," or ";" separated, UTF-8, with a header row.')
+        parser.add_argument('--chunk-size', type=int, default=cards.CHUNK_SIZE, help='Cards per INSERT ... ON CONFLICT.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = cards.import_cards(fileobj, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(e)
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        verb = 'validated' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.imported} cards {verb} from {result.rows} rows in {result.seconds:.2f}s '
+            f'({result.rate:.0f} cards/s); {result.duplicates} repeated UIDs, {len(result.errors)} invalid rows'))
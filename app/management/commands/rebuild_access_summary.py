@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app import access_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the access analytics summaries (hourly counts, per-UID state) from AccessLog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int,
+                            help='Only recompute the hourly counts of the last N closed hours (per-UID state and the '
+                                 'current hour, still being counted, are left alone).')
+
+    def handle(self, *args, **options):
+        if options['hours']:
+            now = timezone.now()
+            since = now - timedelta(hours=options['hours'])
+            buckets = access_stats.rebuild_hourly(since, until=now)
+            self.stdout.write(self.style.SUCCESS(f'{buckets} hourly buckets recomputed since {since:%Y-%m-%d %H:00}'))
+            return
+        buckets = access_stats.rebuild_hourly()
+        uids = access_stats.rebuild_uid_summaries()
+        self.stdout.write(self.style.SUCCESS(f'{buckets} hourly buckets and {uids} UID summaries rebuilt'))
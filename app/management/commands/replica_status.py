@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import dbrouters
+
+
+class Command(BaseCommand):
+    help = 'Show the configured read replicas, their replication lag and whether reads are sent to them.'
+
+    def handle(self, *args, **options):
+        replicated = getattr(settings, 'DATABASE_REPLICAS', {})
+        if not replicated:
+            self.stdout.write('No read replicas configured (DATABASE_REPLICA_URLS*); all reads use the primaries.')
+            return
+        limit = settings.REPLICA_MAX_LAG_SECONDS
+        for primary, aliases in replicated.items():
+            for alias in aliases:
+                lag = dbrouters.lag_monitor.measure(alias)
+                state = self.style.SUCCESS('in use') if lag <= limit else self.style.WARNING(f'skipped (> {limit:g} s)')
+                self.stdout.write(f'{primary:<12} {alias:<22} lag {lag:>8.1f} s  {state}')
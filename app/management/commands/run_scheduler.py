@@ -0,0 +1,54 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import jobs  # noqa: F401  (registers the jobs)
+from app import scheduler
+from app.models import ScheduledJob
+
+
+class Command(BaseCommand):
+    help = 'Run the maintenance jobs registered in app.jobs (sidecar of the web service, see deploy/).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs running at the same time (threads).')
+        parser.add_argument('--poll', type=float, default=5.0, help='Seconds between checks for due jobs.')
+        parser.add_argument('--list', action='store_true', help='Show the jobs, their schedule and timings, and exit.')
+        parser.add_argument('--run', metavar='JOB', help='Run one job now (if no other process holds it) and exit.')
+
+    def handle(self, *args, **options):
+        scheduler.sync_rows()
+        if options['list']:
+            return self._list()
+        if options['run']:
+            return self._run_once(options['run'])
+
+        runner = scheduler.Scheduler(workers=options['workers'], poll=options['poll'])
+        signal.signal(signal.SIGTERM, runner.stop)
+        signal.signal(signal.SIGINT, runner.stop)
+        self.stdout.write(f'scheduler {runner.owner}: {", ".join(sorted(scheduler.registry))}')
+        runner.run_forever()
+
+    def _run_once(self, name):
+        job = scheduler.registry.get(name)
+        if job is None:
+            raise CommandError(f'Unknown job {name!r}; registered: {", ".join(sorted(scheduler.registry))}')
+        owner = scheduler.default_owner()
+        if not scheduler.claim(job, owner, force=True):
+            raise CommandError(f'{name} is leased by another scheduler right now')
+        if not scheduler.run(job, owner):
+            raise CommandError(f'{name} failed, see the log')
+        self.stdout.write(self.style.SUCCESS(f'{name} done'))
+
+    def _list(self):
+        self.stdout.write(f'{"job":<28} {"every":>9} {"next run":<20} {"runs":>6} {"fail":>5} {"last ms":>9} '
+                          f'{"avg ms":>9} {"max ms":>9}  status')
+        rows = {row.name: row for row in ScheduledJob.objects.all()}
+        for name, job in sorted(scheduler.registry.items()):
+            row = rows[name]
+            avg = row.total_duration_ms / row.runs if row.runs else 0
+            status = 'leased by ' + row.lease_owner if row.lease_owner else {True: 'ok', False: 'FAILED', None: '-'}[row.last_ok]
+            self.stdout.write(
+                f'{name:<28} {str(job.every):>9} {timezone.localtime(row.next_run):%Y-%m-%d %H:%M:%S} {row.runs:>6} {row.failures:>5} '
+                f'{row.last_duration_ms or 0:>9.1f} {avg:>9.1f} {row.max_duration_ms:>9.1f}  {status}')
@@ -0,0 +1,134 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app import access_stats, devices, storage
+from app.models import AccessLog, BrisePackedReading, CartaoRFID, PavimentosSensorReading, SensorReading
+
+BRISE_CHANNELS = ['ds18b20_1', 'ds18b20_2', 'ds18b20_3', 'ds18b20_4', 'ds18b20_5', 'ds18b20_6', 'dht11_1_temp',
+                  'dht11_1_hum', 'dht11_2_temp', 'dht11_2_hum', 'uv_1', 'uv_2', 'wind_1', 'wind_2']
+
+
+class Command(BaseCommand):
+    help = ('Generate realistic readings (all three monitorings), RFID cards and access logs for benchmarks '
+            'and the read-path regression suite. Device ids start with "seed-"; never run it on production data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readings', type=int, default=100000, help='Readings per monitoring.')
+        parser.add_argument('--devices', type=int, default=10, help='Devices per monitoring.')
+        parser.add_argument('--days', type=float, default=30, help='Readings and swipes span the last N days.')
+        parser.add_argument('--cards', type=int, default=1000)
+        parser.add_argument('--access-logs', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (same seed, same values).')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.batch_size = options['batch_size']
+        span = timedelta(days=options['days'])
+        # seq base from the clock: seeding twice never collides on (device_id, seq)
+        self.seq_base = int(time.time() * 10)
+
+        self._readings('default', SensorReading, options, span, self._generic)
+        self._readings('brise', storage.brise_model(), options, span, self._brise)
+        self._readings('pavimentos', PavimentosSensorReading, options, span, self._pavimentos)
+        uids = self._cards(options['cards'])
+        self._access_logs(uids, options['access_logs'], span)
+        self.stdout.write(self.style.SUCCESS('seed data generated'))
+
+    def _timed(self, label, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:<28} {count:>9} rows in {elapsed:6.1f}s ({count / max(elapsed, 1e-9):,.0f}/s)')
+
+    def _temperature(self, i):
+        # daily cycle plus noise
+        return round(24 + 6 * ((i % 2880) / 1440 - 1) ** 2 + self.rng.gauss(0, 0.4), 2)
+
+    def _generic(self, i):
+        values = {f'sensor{n}': self._temperature(i + n) for n in range(1, 7)}
+        values.update({f'sensor{n}': round(self.rng.uniform(30, 90), 1) for n in range(7, 10)})
+        values.update({f'sensor{n}': round(self.rng.uniform(0, 1), 3) for n in range(10, 12)})
+        values.update({f'sensor{n}': round(self.rng.uniform(0, 8), 2) for n in range(12, 15)})
+        return values
+
+    def _brise(self, i):
+        values = dict(zip(BRISE_CHANNELS, self._generic(i).values()))
+        if i % 7 == 0:  # an unplugged DHT11 now and then
+            values.update(dht11_2_temp=None, dht11_2_hum=None)
+        return values
+
+    def _pavimentos(self, i):
+        return {'sensor_a': self._temperature(i), 'sensor_b': round(self.rng.uniform(0, 50), 2)}
+
+    def _readings(self, monitoring, model, options, span, values):
+        total, device_count = options['readings'], max(options['devices'], 1)
+        if not total:
+            return
+        started = time.perf_counter()
+        names = [f'seed-{monitoring}-{n:03d}' for n in range(device_count)]
+        refs = [devices.registry.resolve(monitoring, name) for name in names]
+        step = span / max(total // device_count, 1)
+        first = self.now - span
+        batch = []
+        for i in range(total):
+            device = i % device_count
+            meta = {'timestamp': first + step * (i // device_count), 'device_id': names[device],
+                    'device_ref': refs[device], 'seq': self.seq_base + i // device_count,
+                    'battery_level': round(100 - 40 * (i // device_count) * step / span, 1)}
+            if model is BrisePackedReading:
+                batch.append(model.from_channels(1, values(i), **meta))
+            else:
+                batch.append(model(**values(i), **meta))
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+        self._timed(model.__name__, total, started)
+
+    def _cards(self, count):
+        started = time.perf_counter()
+        functions = ['aluno', 'professor', 'técnico', 'visitante']
+        cards = [CartaoRFID(uid=f'{self.rng.getrandbits(32):08X}', nome_pessoa=f'Pessoa {n}',
+                            email=f'pessoa{n}@example.com', funcao=self.rng.choice(functions), matricula=str(100000 + n))
+                 for n in range(count)]
+        CartaoRFID.objects.bulk_create(cards, batch_size=self.batch_size, ignore_conflicts=True)
+        self._timed('CartaoRFID', count, started)
+        return list(CartaoRFID.objects.values_list('uid', 'id'))
+
+    def _access_logs(self, cards, count, span):
+        if not count:
+            return
+        started = time.perf_counter()
+        # AccessLog.timestamp is auto_now_add, which bulk_create would overwrite: insert directly
+        adapt = connection.ops.adapt_datetimefield_value
+        table = AccessLog._meta.db_table
+        sql = f'INSERT INTO {table} (uid, cartao_id, autorizado, timestamp) VALUES (%s, %s, %s, %s)'
+        step = span / count
+        first = self.now - span
+        rows = []
+        for i in range(count):
+            if cards and self.rng.random() > 0.05:
+                uid, card_id = self.rng.choice(cards)
+            else:  # unknown card
+                uid, card_id = f'{self.rng.getrandbits(32):08X}', None
+            rows.append((uid, card_id, card_id is not None, adapt(first + step * i)))
+            if len(rows) >= self.batch_size:
+                self._insert(sql, rows)
+                rows = []
+        self._insert(sql, rows)
+        self._timed('AccessLog', count, started)
+
+        started = time.perf_counter()
+        access_stats.rebuild_hourly()
+        access_stats.rebuild_uid_summaries()
+        self._timed('access summaries rebuilt', count, started)
+
+    def _insert(self, sql, rows):
+        if rows:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
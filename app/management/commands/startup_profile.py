@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+MODES = {
+    'full': 'config.settings',
+    'ingest': 'config.settings_ingest',
+}
+
+# Run in a fresh interpreter: boot Django like a gunicorn worker does, resolve a device URL
+# and report what got imported.
+_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import resolve
+resolve('/api/receive/')
+elapsed = time.perf_counter() - start
+mods = sys.modules
+print(json.dumps({
+    'boot_ms': elapsed * 1000,
+    'modules': len(mods),
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': {name: name in mods for name in (
+        'django.contrib.admin', 'django.contrib.auth', 'django.contrib.sessions',
+        'django.template.backends.django', 'app.views', 'app.forms')},
+}))
+'''
+
+
+def _run(settings_module, importtime=False):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', _PROBE]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - started) * 1000
+    return wall, json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def _top_imports(stderr, limit):
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <indent><module>"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not name[1:].startswith(' '):  # top level: not imported by another module
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time, memory and imported modules of the full and ingest-only configurations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts per mode (median is reported).')
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list per mode.')
+        parser.add_argument('--mode', choices=sorted(MODES), action='append', help='Profile only these modes.')
+
+    def handle(self, *args, **options):
+        for mode in options['mode'] or sorted(MODES):
+            settings_module = MODES[mode]
+            _run(settings_module)  # warm the bytecode cache so runs measure imports, not compiles
+            runs = [_run(settings_module) for _ in range(options['runs'])]
+            walls = sorted(wall for wall, _, _ in runs)
+            boots = sorted(report['boot_ms'] for _, report, _ in runs)
+            report = runs[-1][1]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{mode} ({settings_module})'))
+            self.stdout.write(f'  process start to ready: {walls[len(walls) // 2]:.0f} ms (median of {len(walls)})')
+            self.stdout.write(f'  django boot + urlconf:  {boots[len(boots) // 2]:.0f} ms')
+            self.stdout.write(f'  max RSS:                {report["rss_kb"] / 1024:.1f} MiB')
+            self.stdout.write(f'  modules imported:       {report["modules"]}')
+            for name, loaded in report['loaded'].items():
+                self.stdout.write(f'    {name:<34} {"loaded" if loaded else "-"}')
+            if options['top']:
+                _, _, stderr = _run(settings_module, importtime=True)
+                self.stdout.write('  slowest top-level imports (cumulative):')
+                for cumulative, name in _top_imports(stderr, options['top']):
+                    self.stdout.write(f'    {cumulative / 1000:8.1f} ms  {name}')
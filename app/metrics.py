@@ -0,0 +1,21 @@
+import threading
+from collections import Counter
+
+# In-process counters (one set per gunicorn worker), exposed by the ``metrics`` view.
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot():
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,67 @@
+import logging
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+from . import dbrouters, logs
+
+STICKY_COOKIE = 'db_primary'
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+request_logger = logging.getLogger('app.requests')
+
+
+class RequestContextMiddleware:
+    """Log context of each request (app.logs): a request id (nginx's X-Request-ID, else a new
+    one, echoed in the response) and the path, so every record logged while serving it can be
+    correlated; ingest adds the device id. Requests slower than LOG_SLOW_REQUEST_MS are logged
+    with their duration and status.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        # cleared when the response is finished (app.logs), not here: Django logs error responses later
+        logs.begin(request_id=request_id, method=request.method, path=request.path)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= getattr(settings, 'LOG_SLOW_REQUEST_MS', 1000):
+            request_logger.warning('slow request %s %s: %.0f ms', request.method, request.path, duration_ms,
+                                   extra={'duration_ms': round(duration_ms, 1), 'status': response.status_code})
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Read-your-writes across requests when read replicas are configured.
+
+    A response to a request that wrote to a replicated database carries a short-lived cookie
+    naming it; requests presenting the cookie read that database from the primary, so the
+    page after a POST/redirect never shows replica data older than the write. The cookie
+    lasts REPLICA_MAX_LAG_SECONDS, beyond which the router would skip a lagging replica anyway.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicated = getattr(settings, 'DATABASE_REPLICAS', {})
+        if not replicated:
+            return self.get_response(request)
+        for alias in request.COOKIES.get(STICKY_COOKIE, '').split(','):
+            if alias in replicated:
+                dbrouters.stick(alias)
+        response = self.get_response(request)
+        written = sorted(dbrouters.written_aliases() & set(replicated))
+        if written:
+            response.set_cookie(STICKY_COOKIE, ','.join(written), max_age=int(settings.REPLICA_MAX_LAG_SECONDS) + 1,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_brisesensorreading_pavimentossensorreading_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brisesensorreading',
+            name='seq',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pavimentossensorreading',
+            name='seq',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sensorreading',
+            name='seq',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='brisesensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_id', 'seq'), name='brise_device_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pavimentossensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_id', 'seq'), name='pavimentos_device_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_id', 'seq'), name='sensorreading_device_seq_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_reading_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartaorfid',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_cartaorfid_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(unique=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('negados', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AccessUidSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(max_length=32, unique=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('negados', models.PositiveIntegerField(default=0)),
+                ('ultimo_acesso', models.DateTimeField()),
+                ('ultimo_autorizado', models.BooleanField()),
+                ('rajada_inicio', models.DateTimeField(blank=True, null=True)),
+                ('rajada_negados', models.PositiveIntegerField(default=0)),
+                ('ultimo_negado', models.DateTimeField(blank=True, null=True)),
+                ('maior_rajada', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['timestamp'], name='accesslog_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['uid', 'timestamp'], name='accesslog_uid_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(condition=models.Q(('autorizado', False)), fields=['timestamp'], name='accesslog_denied_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='accessuidsummary',
+            name='cartao',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.cartaorfid'),
+        ),
+        migrations.AddIndex(
+            model_name='accessuidsummary',
+            index=models.Index(fields=['-ultimo_acesso'], name='accessuid_last_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessuidsummary',
+            index=models.Index(fields=['-ultimo_negado'], name='accessuid_denied_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:37
+
+import app.packed
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_access_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrisePackedReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('device_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('battery_level', models.FloatField(blank=True, null=True)),
+                ('seq', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('schema', models.PositiveSmallIntegerField(default=1)),
+                ('mask', models.PositiveIntegerField()),
+                ('values', models.BinaryField()),
+            ],
+            bases=(app.packed.PackedChannelsMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='brisesensorreading',
+            index=models.Index(fields=['timestamp'], name='brise_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brisepackedreading',
+            index=models.Index(fields=['timestamp'], name='brisepacked_ts_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='brisepackedreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_id', 'seq'), name='brisepacked_device_seq_uniq'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_brise_packed_reading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('next_run', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lease_owner', models.CharField(blank=True, max_length=100)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+                ('last_started', models.DateTimeField(blank=True, null=True)),
+                ('last_finished', models.DateTimeField(blank=True, null=True)),
+                ('last_ok', models.BooleanField(null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('last_duration_ms', models.FloatField(blank=True, null=True)),
+                ('max_duration_ms', models.FloatField(default=0)),
+                ('total_duration_ms', models.FloatField(default=0)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_scheduled_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Device',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monitoring', models.CharField(choices=[('default', 'Genérico'), ('brise', 'Brise'), ('pavimentos', 'Pavimentos')], max_length=20)),
+                ('device_id', models.CharField(max_length=50)),
+                ('nome', models.CharField(blank=True, max_length=100)),
+                ('intervalo_esperado', models.PositiveIntegerField(default=30)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('registrado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['monitoring', 'device_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='brisepackedreading',
+            name='device_ref',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='brisesensorreading',
+            name='device_ref',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pavimentossensorreading',
+            name='device_ref',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sensorreading',
+            name='device_ref',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='brisepackedreading',
+            index=models.Index(fields=['device_ref', 'timestamp'], name='brisepacked_dev_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brisesensorreading',
+            index=models.Index(fields=['device_ref', 'timestamp'], name='brise_dev_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pavimentossensorreading',
+            index=models.Index(fields=['device_ref', 'timestamp'], name='pavimentos_dev_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['device_ref', 'timestamp'], name='sensorreading_dev_ts_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='device',
+            constraint=models.UniqueConstraint(fields=('monitoring', 'device_id'), name='device_monitoring_id_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_device_registry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pavimentossensorreading',
+            index=models.Index(fields=['timestamp'], name='pavimentos_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['timestamp'], name='sensorreading_ts_idx'),
+        ),
+    ]
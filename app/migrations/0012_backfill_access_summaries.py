@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def rebuild(apps, schema_editor):
+    # 0006 created the summary tables empty: fill them from the access log already stored
+    from app import access_stats
+    AccessLog = apps.get_model('app', 'AccessLog')
+    if not AccessLog.objects.exists():
+        return
+    access_stats.rebuild_hourly(log_model=AccessLog, hourly_model=apps.get_model('app', 'AccessHourly'))
+    access_stats.rebuild_uid_summaries(log_model=AccessLog, summary_model=apps.get_model('app', 'AccessUidSummary'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_forwarding_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop, hints={'model_name': 'accesslog'}),
+    ]
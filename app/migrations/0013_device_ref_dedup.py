@@ -0,0 +1,90 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+def backfill_refs(model_name, monitoring):
+    """Fill in ``device_ref`` for readings stored before it was written on ingest, registering their devices.
+
+    Runs before the constraint swap, so no reading loses its (device, seq) protection. Readings
+    already filled in (e.g. by ``manage.py backfill_device_refs`` ahead of the upgrade) are skipped.
+    """
+    def backfill(apps, schema_editor):
+        Reading = apps.get_model('app', model_name)
+        Device = apps.get_model('app', 'Device')  # routed to 'default', migrated before the reading databases
+        pending = Reading.objects.using(schema_editor.connection.alias).filter(device_ref__isnull=True)
+        for device_id in pending.exclude(device_id=None).exclude(device_id='').values_list('device_id', flat=True).distinct().order_by():
+            device, _ = Device.objects.get_or_create(monitoring=monitoring, device_id=device_id,
+                                                     defaults={'intervalo_esperado': 30})
+            pending.filter(device_id=device_id).update(device_ref=device.pk)
+    return backfill
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_backfill_access_summaries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='brisepackedreading',
+            name='device_ref',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='brisesensorreading',
+            name='device_ref',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pavimentossensorreading',
+            name='device_ref',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sensorreading',
+            name='device_ref',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_refs('SensorReading', 'default'), migrations.RunPython.noop,
+                             hints={'model_name': 'sensorreading'}),
+        migrations.RunPython(backfill_refs('BriseSensorReading', 'brise'), migrations.RunPython.noop,
+                             hints={'model_name': 'brisesensorreading'}),
+        migrations.RunPython(backfill_refs('BrisePackedReading', 'brise'), migrations.RunPython.noop,
+                             hints={'model_name': 'brisepackedreading'}),
+        migrations.RunPython(backfill_refs('PavimentosSensorReading', 'pavimentos'), migrations.RunPython.noop,
+                             hints={'model_name': 'pavimentossensorreading'}),
+        migrations.RemoveConstraint(
+            model_name='brisepackedreading',
+            name='brisepacked_device_seq_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='brisesensorreading',
+            name='brise_device_seq_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='pavimentossensorreading',
+            name='pavimentos_device_seq_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='sensorreading',
+            name='sensorreading_device_seq_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='brisepackedreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_ref', 'seq'), name='brisepacked_ref_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='brisesensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_ref', 'seq'), name='brise_ref_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pavimentossensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_ref', 'seq'), name='pavimentos_ref_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorreading',
+            constraint=models.UniqueConstraint(condition=models.Q(('seq__isnull', False)), fields=('device_ref', 'seq'), name='sensorreading_ref_seq_uniq'),
+        ),
+    ]
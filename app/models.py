@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .packed import PackedChannelsMixin
+
 class SensorReading(models.Model):
 	timestamp = models.DateTimeField(default = timezone.now)
 	
@@ -21,14 +23,26 @@ class SensorReading(models.Model):
 	sensor14 = models.FloatField(null=True, blank=True)
 	
 	# Campos adicionais se necessário
+	# Deprecated: kept for display and exports until a later migration drops it; queries use device_ref
 	device_id = models.CharField(max_length = 50, blank = True, null = True)
 	battery_level = models.FloatField(blank = True, null = True)
+	# Sequence number sent by the device; (device_ref, seq) identifies a reading across retries
+	seq = models.PositiveBigIntegerField(blank = True, null = True)
+	# Device.pk for device_id (app.devices); a plain integer, readings may live in another database
+	device_ref = models.BigIntegerField(blank = True, null = True)
 	
 	def __str__(self):
 		return f"{self.device_id} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 	
 	class Meta:
 		ordering = ['-timestamp']
+		indexes = [
+			models.Index(fields = ['timestamp'], name = 'sensorreading_ts_idx'),
+			models.Index(fields = ['device_ref', 'timestamp'], name = 'sensorreading_dev_ts_idx'),
+		]
+		constraints = [
+			models.UniqueConstraint(fields = ['device_ref', 'seq'], condition = models.Q(seq__isnull = False), name = 'sensorreading_ref_seq_uniq'),
+		]
 
 # --- RFID Card Model ---
 class CartaoRFID(models.Model):
@@ -38,6 +52,8 @@ class CartaoRFID(models.Model):
 	email = models.EmailField()
 	funcao = models.CharField(max_length=100)
 	matricula = models.CharField(max_length=50)
+	# lets each worker's UID index (app.cards) fetch only the cards changed since its last sync
+	atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
 	def __str__(self):
 		return f"{self.nome_pessoa} - {self.uid}" if self.nome_pessoa else self.uid
@@ -48,10 +64,50 @@ class AccessLog(models.Model):
 	autorizado = models.BooleanField()
 	timestamp = models.DateTimeField(auto_now_add=True)
 
+	class Meta:
+		indexes = [
+			models.Index(fields=['timestamp'], name='accesslog_ts_idx'),
+			models.Index(fields=['uid', 'timestamp'], name='accesslog_uid_ts_idx'),
+			models.Index(fields=['timestamp'], condition=models.Q(autorizado=False), name='accesslog_denied_ts_idx'),
+		]
+
 	def __str__(self):
 		status = "Autorizado" if self.autorizado else "Negado"
 		return f"{self.uid} - {status} em {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
+# --- Access summaries (kept by app.access_stats as verifica_cartao logs) ---
+class AccessHourly(models.Model):
+	"""Swipe counts per hour (UTC, truncated)."""
+	hora = models.DateTimeField(unique=True)
+	total = models.PositiveIntegerField(default=0)
+	negados = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		ordering = ['-hora']
+
+class AccessUidSummary(models.Model):
+	"""Last access and denied-attempt bursts per UID (registered or not)."""
+	uid = models.CharField(max_length=32, unique=True)
+	cartao = models.ForeignKey(CartaoRFID, null=True, blank=True, on_delete=models.SET_NULL)
+	total = models.PositiveIntegerField(default=0)
+	negados = models.PositiveIntegerField(default=0)
+	ultimo_acesso = models.DateTimeField()
+	ultimo_autorizado = models.BooleanField()
+	# current burst: denied swipes less than ACCESS_BURST_GAP apart
+	rajada_inicio = models.DateTimeField(null=True, blank=True)
+	rajada_negados = models.PositiveIntegerField(default=0)
+	ultimo_negado = models.DateTimeField(null=True, blank=True)
+	maior_rajada = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['-ultimo_acesso'], name='accessuid_last_idx'),
+			models.Index(fields=['-ultimo_negado'], name='accessuid_denied_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.uid} - {self.total} acessos, {self.negados} negados"
+
 class BriseSensorReading(models.Model):
 	"""Sensor readings for Brise Vegetal monitoring (6 DS18B20, 2 DHT11 (temp+hum), 2 UV, 2 anemometers)"""
 	timestamp = models.DateTimeField(default=timezone.now)
@@ -80,10 +136,48 @@ class BriseSensorReading(models.Model):
 
 	device_id = models.CharField(max_length=50, blank=True, null=True)
 	battery_level = models.FloatField(blank=True, null=True)
+	seq = models.PositiveBigIntegerField(blank=True, null=True)
+	device_ref = models.BigIntegerField(blank=True, null=True)  # Device.pk, see SensorReading
+
+	def __str__(self):
+		return f"BRISE {self.device_id} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['timestamp'], name='brise_ts_idx'),
+			models.Index(fields=['device_ref', 'timestamp'], name='brise_dev_ts_idx'),
+		]
+		constraints = [
+			models.UniqueConstraint(fields=['device_ref', 'seq'], condition=models.Q(seq__isnull=False), name='brise_ref_seq_uniq'),
+		]
+
+class BrisePackedReading(PackedChannelsMixin, models.Model):
+	"""Compact alternative to BriseSensorReading (READING_STORAGE['brise'] = 'packed').
+
+	The 14 channels are stored as a float32 blob of the reported ones plus a presence bitmask
+	(see app.packed); ``reading.ds18b20_1`` etc. still work through the accessor.
+	"""
+	timestamp = models.DateTimeField(default=timezone.now)
+	device_id = models.CharField(max_length=50, blank=True, null=True)
+	battery_level = models.FloatField(blank=True, null=True)
+	seq = models.PositiveBigIntegerField(blank=True, null=True)
+	device_ref = models.BigIntegerField(blank=True, null=True)  # Device.pk, see SensorReading
+	schema = models.PositiveSmallIntegerField(default=1)
+	mask = models.PositiveIntegerField()
+	values = models.BinaryField()
 
 	def __str__(self):
 		return f"BRISE {self.device_id} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
+	class Meta:
+		indexes = [
+			models.Index(fields=['timestamp'], name='brisepacked_ts_idx'),
+			models.Index(fields=['device_ref', 'timestamp'], name='brisepacked_dev_ts_idx'),
+		]
+		constraints = [
+			models.UniqueConstraint(fields=['device_ref', 'seq'], condition=models.Q(seq__isnull=False), name='brisepacked_ref_seq_uniq'),
+		]
+
 class PavimentosSensorReading(models.Model):
 	"""Placeholder model for pavimentos monitoring sensors. Add fields as needed."""
 	timestamp = models.DateTimeField(default=timezone.now)
@@ -92,6 +186,86 @@ class PavimentosSensorReading(models.Model):
 	sensor_b = models.FloatField(null=True, blank=True)
 	device_id = models.CharField(max_length=50, blank=True, null=True)
 	battery_level = models.FloatField(blank=True, null=True)
+	seq = models.PositiveBigIntegerField(blank=True, null=True)
+	device_ref = models.BigIntegerField(blank=True, null=True)  # Device.pk, see SensorReading
 
 	def __str__(self):
 		return f"PAV {self.device_id} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['timestamp'], name='pavimentos_ts_idx'),
+			models.Index(fields=['device_ref', 'timestamp'], name='pavimentos_dev_ts_idx'),
+		]
+		constraints = [
+			models.UniqueConstraint(fields=['device_ref', 'seq'], condition=models.Q(seq__isnull=False), name='pavimentos_ref_seq_uniq'),
+		]
+
+# --- Background jobs (app.scheduler) ---
+class ScheduledJob(models.Model):
+	"""Schedule, lease and run statistics of one registered job (always in 'default')."""
+	name = models.CharField(max_length=100, unique=True)
+	next_run = models.DateTimeField(default=timezone.now)
+	# a scheduler process owns the job until lease_until; others skip it meanwhile
+	lease_owner = models.CharField(max_length=100, blank=True)
+	lease_until = models.DateTimeField(null=True, blank=True)
+	last_started = models.DateTimeField(null=True, blank=True)
+	last_finished = models.DateTimeField(null=True, blank=True)
+	last_ok = models.BooleanField(null=True)
+	last_error = models.TextField(blank=True)
+	last_duration_ms = models.FloatField(null=True, blank=True)
+	max_duration_ms = models.FloatField(default=0)
+	total_duration_ms = models.FloatField(default=0)
+	runs = models.PositiveIntegerField(default=0)
+	failures = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		ordering = ['name']
+
+	def __str__(self):
+		return self.name
+
+# --- Device registry (app.devices) ---
+class Device(models.Model):
+	"""A sensor node, identified by (monitoring, device_id); readings refer to it by ``device_ref``."""
+	MONITORING_CHOICES = [('default', 'Genérico'), ('brise', 'Brise'), ('pavimentos', 'Pavimentos')]
+
+	monitoring = models.CharField(max_length=20, choices=MONITORING_CHOICES)
+	device_id = models.CharField(max_length=50)
+	nome = models.CharField(max_length=100, blank=True)
+	# seconds between readings the node is configured for (firmware default: 30)
+	intervalo_esperado = models.PositiveIntegerField(default=30)
+	metadata = models.JSONField(default=dict, blank=True)
+	registrado_em = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['monitoring', 'device_id']
+		constraints = [
+			models.UniqueConstraint(fields=['monitoring', 'device_id'], name='device_monitoring_id_uniq'),
+		]
+
+	def __str__(self):
+		return f"{self.monitoring}/{self.device_id}"
+
+# --- Outbound forwarding (app.forwarding) ---
+class OutboxEntry(models.Model):
+	"""One stored reading waiting to be delivered to one sink (always in 'default').
+
+	Delivered entries are deleted; failed ones wait until ``next_attempt`` (backoff). After
+	FORWARDING_MAX_ATTEMPTS the entry is parked: ``next_attempt`` NULL, kept for inspection.
+	"""
+	sink = models.CharField(max_length=50)
+	# {'monitoring', 'device_id', 'timestamp' (ISO 8601), 'fields': {name: value}}
+	payload = models.JSONField()
+	criado_em = models.DateTimeField(default=timezone.now)
+	attempts = models.PositiveIntegerField(default=0)
+	next_attempt = models.DateTimeField(null=True, blank=True, default=timezone.now)
+	last_error = models.TextField(blank=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['sink', 'next_attempt'], name='outbox_sink_due_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.sink} #{self.pk} ({self.attempts} attempts)"
@@ -0,0 +1,84 @@
+"""Packed storage of reading channels: one float32 blob plus a presence bitmask per row.
+
+The channel list of a row is given by its ``schema`` (the same schema versions as the binary
+ingest frame, see ``app.payloads.SCHEMAS``). Bit ``i`` of ``mask`` is set when channel ``i`` was
+reported; only those channels are stored, in schema order, so a node with half its sensors
+unplugged stores half the bytes. Values lose precision beyond float32 (~7 digits), which is
+more than the sensors have.
+"""
+import math
+import struct
+from functools import lru_cache
+
+from .payloads import SCHEMAS
+
+
+@lru_cache(maxsize=None)
+def _struct(count):
+    return struct.Struct(f'<{count}f')
+
+
+def channel_names(schema):
+    return SCHEMAS[schema][1]
+
+
+def pack(schema, values):
+    """``values`` maps channel name -> float (None/NaN/missing = not reported); returns (mask, blob)."""
+    mask = 0
+    present = []
+    for i, name in enumerate(channel_names(schema)):
+        value = values.get(name)
+        if value is not None and not math.isnan(value):
+            mask |= 1 << i
+            present.append(value)
+    return mask, _struct(len(present)).pack(*present)
+
+
+@lru_cache(maxsize=4096)
+def _positions(schema, mask):
+    return tuple(i for i in range(len(channel_names(schema))) if mask >> i & 1)
+
+
+def unpack(schema, mask, blob):
+    """Channel name -> value (None where not reported), for every channel of the schema."""
+    names = channel_names(schema)
+    result = dict.fromkeys(names)
+    positions = _positions(schema, mask)
+    for i, value in zip(positions, _struct(len(positions)).unpack(bytes(blob))):
+        result[names[i]] = value
+    return result
+
+
+def unpack_fields(schema, mask, blob, fields):
+    """Values of ``fields`` only (None where not reported), in the order given."""
+    positions = _positions(schema, mask)
+    values = _struct(len(positions)).unpack(bytes(blob))
+    names = channel_names(schema)
+    by_name = {names[i]: value for i, value in zip(positions, values)}
+    return [by_name.get(name) for name in fields]
+
+
+class PackedChannelsMixin:
+    """Model mixin (needs ``schema``, ``mask`` and ``values`` fields) giving packed rows the
+    attribute interface of the wide models: ``reading.ds18b20_1`` etc. work in views,
+    templates and exports. Filtering/aggregating on a channel in SQL does not."""
+
+    @classmethod
+    def from_channels(cls, schema, channels, **fields):
+        mask, blob = pack(schema, channels)
+        return cls(schema=schema, mask=mask, values=blob, **fields)
+
+    def channels(self):
+        decoded = self.__dict__.get('_channels')
+        if decoded is None:
+            decoded = self.__dict__['_channels'] = unpack(self.schema, self.mask, self.values)
+        return decoded
+
+    def __getattr__(self, name):
+        # only called for names the model doesn't define
+        if name.startswith('_') or 'schema' not in self.__dict__:
+            raise AttributeError(name)
+        channels = self.channels()
+        if name in channels:
+            return channels[name]
+        raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
@@ -0,0 +1,87 @@
+import functools
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import versions
+
+try:
+    import brotli
+except ImportError:  # optional: pages are still served gzip-compressed
+    brotli = None
+
+# dashboard project slug -> monitoring whose readings it shows
+PROJECT_MONITORING = {'breeze': 'brise', 'brise': 'brise', 'pavimentos': 'pavimentos'}
+
+
+def _encode(body):
+    entry = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        entry['br'] = brotli.compress(body, quality=5)
+    return entry
+
+
+def _pick_encoding(request, bodies):
+    accepted = request.headers.get('Accept-Encoding', '')
+    for encoding in ('br', 'gzip'):
+        if encoding in bodies and encoding in accepted:
+            return encoding
+    return 'identity'
+
+
+def cached_page(monitoring=None, device_param=None):
+    """Cache a GET view's rendered page, precompressed, until new data lands.
+
+    The key is (view, user, full path, data version of ``monitoring``), so a page
+    showing readings is re-rendered only after ``receive_sensor_data`` stores one. ``monitoring``
+    may be a callable receiving the view kwargs (e.g. to map a project slug). When the query
+    parameter ``device_param`` is present, only that device's data version is used, so other
+    devices reporting don't invalidate the page. Responses carry ETag/Last-Modified, and
+    repeat visits get a 304.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+                return view(request, *args, **kwargs)
+            target = monitoring(**kwargs) if callable(monitoring) else monitoring
+            device_id = request.GET.get(device_param) if device_param else None
+            version = versions.data_version(target, device_id or None) if target else 0
+            user_key = request.user.pk if hasattr(request, 'user') else None
+            path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'page:{view.__module__}.{view.__name__}:{user_key}:{path_hash}:{version}'
+
+            entry = cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming or response.cookies:
+                    return response
+                body = response.content
+                entry = {
+                    'bodies': _encode(body),
+                    'content_type': response['Content-Type'],
+                    # weak: the bytes differ per Content-Encoding, the page doesn't
+                    'etag': f'W/"{hashlib.md5(body).hexdigest()}"',
+                    'last_modified': time.time(),
+                }
+                cache.set(key, entry, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+
+            encoding = _pick_encoding(request, entry['bodies'])
+            response = HttpResponse(entry['bodies'][encoding], content_type=entry['content_type'])
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+            response['ETag'] = entry['etag']
+            response['Last-Modified'] = http_date(entry['last_modified'])
+            # private: pages are per user; no-cache: browsers revalidate (cheap 304) on every visit
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+            return get_conditional_response(request, etag=entry['etag'], last_modified=int(entry['last_modified']),
+                                            response=response)
+        return wrapper
+    return decorator
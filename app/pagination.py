@@ -0,0 +1,25 @@
+from django.core.paginator import Page, Paginator
+
+
+class TailPaginator(Paginator):
+    """Paginator that reads pages past the middle from the other end of the ordering.
+
+    ``OFFSET n`` walks n index entries, so with plain pagination the last page of a
+    million-row table costs a million steps. Pages in the second half are fetched with
+    the ordering reversed and a small offset instead, then flipped back: no page walks
+    more than half the table. ``object_list`` must be a queryset with a total ordering
+    (ties broken, e.g. by ``-id``), so both directions agree on the page boundaries.
+    """
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        if self.count - top < bottom:
+            objects = list(self.object_list.reverse()[self.count - top:self.count - bottom])
+            objects.reverse()
+        else:
+            objects = self.object_list[bottom:top]
+        return Page(objects, number, self)
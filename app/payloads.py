@@ -0,0 +1,116 @@
+"""Compact positional ingest format for constrained devices.
+
+A frame is little-endian::
+
+    u8   schema version (low 5 bits) | optional field flags (high 3 bits)
+    u8   device_id length (L)
+    L    device_id (utf-8)
+    u32  seq, only when FLAG_SEQ is set
+    u32  sample_ts (epoch seconds), only when FLAG_SAMPLE_TS is set
+    u32  device_now (epoch seconds), only when FLAG_DEVICE_NOW is set
+    f32  battery level (NaN = not reported)
+    f32 x N channels, order and N given by the schema version
+
+``decode()`` turns a frame into the same dict the JSON path receives, so both formats go
+through the same validation and produce the same models. A NaN channel becomes None, like
+``null`` in a JSON payload (channel not connected or not reported).
+"""
+import math
+import struct
+
+BINARY_CONTENT_TYPES = ('application/x-ecoview-struct', 'application/octet-stream')
+
+BRISE_FIELDS = ('ds18b20_1', 'ds18b20_2', 'ds18b20_3', 'ds18b20_4', 'ds18b20_5', 'ds18b20_6',
+                'dht11_1_temp', 'dht11_1_hum', 'dht11_2_temp', 'dht11_2_hum',
+                'uv_1', 'uv_2', 'wind_1', 'wind_2')
+
+# schema version -> (monitoring, channel names)
+SCHEMAS = {
+    1: ('brise', BRISE_FIELDS),
+    2: ('pavimentos', ('sensor_a', 'sensor_b')),
+    3: ('default', tuple(f'sensor{i}' for i in range(1, 15))),
+}
+
+FLAG_SEQ = 0x80
+FLAG_SAMPLE_TS = 0x40
+FLAG_DEVICE_NOW = 0x20
+# (flag, payload key, struct code), in frame order
+OPTIONAL_FIELDS = ((FLAG_SEQ, 'seq', 'I'), (FLAG_SAMPLE_TS, 'sample_ts', 'I'), (FLAG_DEVICE_NOW, 'device_now', 'I'))
+_FLAGS_MASK = 0xE0
+
+_HEADER = struct.Struct('<BB')
+
+
+def _body_format(version, flags):
+    optional = ''.join(code for flag, _, code in OPTIONAL_FIELDS if flags & flag)
+    return f'<{optional}{1 + len(SCHEMAS[version][1])}f'
+
+
+# optional fields + battery + channels, compiled once per (schema, flags) so a frame is unpacked in one call
+_BODIES = {(version, flags): struct.Struct(_body_format(version, flags))
+           for version in SCHEMAS for flags in range(0, 0x100, 0x20)}
+
+
+class PayloadError(ValueError):
+    pass
+
+
+def decode(body):
+    """Decode a binary frame into an ingest dict."""
+    if len(body) < _HEADER.size:
+        raise PayloadError('Frame too short')
+    first, id_len = _HEADER.unpack_from(body)
+    version, flags = first & ~_FLAGS_MASK, first & _FLAGS_MASK
+    body_struct = _BODIES.get((version, flags))
+    if body_struct is None:
+        raise PayloadError(f'Unknown schema version {version} (flags {flags:#x})')
+    monitoring, fields = SCHEMAS[version]
+    offset = _HEADER.size + id_len
+    if len(body) != offset + body_struct.size:
+        raise PayloadError(f'Frame length {len(body)} does not match schema version {version}')
+    try:
+        device_id = body[_HEADER.size:offset].decode('utf-8')
+    except UnicodeDecodeError:
+        raise PayloadError('device_id is not valid utf-8')
+
+    values = body_struct.unpack_from(body, offset)
+    data = {'monitoring': monitoring, 'device_id': device_id}
+    n = 0
+    for flag, name, _ in OPTIONAL_FIELDS:
+        if flags & flag:
+            data[name] = values[n]
+            n += 1
+    if not math.isnan(values[n]):
+        data['battery'] = values[n]
+    for name, value in zip(fields, values[n + 1:]):
+        data[name] = None if math.isnan(value) else value
+    return data
+
+
+def peek(body):
+    """(monitoring, device_id) from a frame header without unpacking it; (None, None) if unknown."""
+    if len(body) < _HEADER.size:
+        return None, None
+    schema = SCHEMAS.get(body[0] & ~_FLAGS_MASK)
+    if schema is None:
+        return None, None
+    return schema[0], body[_HEADER.size:_HEADER.size + body[1]].decode('utf-8', 'replace')
+
+
+def encode(version, device_id, values, battery=None, **optional):
+    """Build a frame; ``values`` maps channel name -> float (missing/None are sent as NaN).
+
+    Optional fields (``seq=``, ``sample_ts=``, ``device_now=``) are included, and their flag set, when not None.
+    """
+    fields = SCHEMAS[version][1]
+    raw_id = device_id.encode('utf-8')
+    flags = 0
+    extra = []
+    for flag, name, _ in OPTIONAL_FIELDS:
+        if optional.get(name) is not None:
+            flags |= flag
+            extra.append(optional[name])
+    channels = [values.get(name) for name in fields]
+    channels = [math.nan if v is None else v for v in channels]
+    return (_HEADER.pack(version | flags, len(raw_id)) + raw_id
+            + _BODIES[(version, flags)].pack(*extra, math.nan if battery is None else battery, *channels))
@@ -0,0 +1,155 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from . import metrics, payloads
+from .versions import key_part
+
+DEFAULT_LIMITS = {
+    # scope -> (tokens per minute, burst)
+    'brise': (12, 6),
+    'pavimentos': (12, 6),
+    'default': (12, 6),
+    # every ingest request, per client IP, on top of its device's bucket: a whole site may share one
+    # NAT address, but rotating device ids can't get past it
+    'ip': (600, 200),
+    'rfid': (60, 20),
+}
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst, now):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, rate, burst, now):
+        """Refill for the elapsed time and take one token; returns seconds to wait (0 = allowed)."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate
+
+
+class LocalBackend:
+    """Buckets in this worker's memory: no I/O, but each gunicorn worker counts separately.
+
+    At most ``max_keys`` buckets are kept; the least recently used one makes room for a new key,
+    so a flood of new keys only forgets idle clients, never the active ones' state.
+    """
+
+    def __init__(self, max_keys=20000):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(rate, burst, now)
+
+
+class CacheBackend:
+    """Buckets in the Django cache, shared by all workers.
+
+    The read-modify-write is not atomic, so concurrent requests of the same key may both
+    pass; good enough for admission control.
+    """
+
+    def take(self, key, rate, burst):
+        now = time.time()  # shared between processes, so wall clock
+        cache_key = f'ratelimit:{key}'
+        state = cache.get(cache_key)
+        bucket = TokenBucket(burst, now)
+        if state is not None:
+            bucket.tokens, bucket.updated = state
+        wait = bucket.take(rate, burst, now)
+        cache.set(cache_key, (bucket.tokens, bucket.updated), int(burst / rate) + 60)
+        return wait
+
+
+_local = LocalBackend()
+
+
+def _backend():
+    if getattr(settings, 'RATELIMIT_BACKEND', 'local') == 'cache':
+        return CacheBackend()
+    return _local
+
+
+def client_ip(request):
+    header = getattr(settings, 'RATELIMIT_CLIENT_IP_HEADER', 'HTTP_X_REAL_IP')
+    return request.META.get(header) or request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def ingest_identity(request):
+    """``[(scope, key), ...]`` checks for an ingest request, all of which must pass.
+
+    Every request takes a token from its client IP's 'ip' bucket. A request naming its device
+    (X-Device-Id / X-Monitoring headers, ``device_id`` / ``monitoring`` query parameters, or the
+    header bytes of a binary frame) also takes one from that device's bucket for its monitoring.
+    The body is never decoded here: that is left to the view, for admitted requests only.
+    """
+    checks = [('ip', f'ip:{client_ip(request)}')]
+    device_id = request.headers.get('X-Device-Id') or request.GET.get('device_id')
+    monitoring = request.headers.get('X-Monitoring') or request.GET.get('monitoring')
+    if not device_id and request.content_type in payloads.BINARY_CONTENT_TYPES:
+        monitoring, device_id = payloads.peek(request.body)
+    if device_id:
+        scope = (monitoring or 'default').lower()
+        if scope not in _limits():
+            scope = 'default'
+        checks.append((scope, f'dev:{key_part(device_id)}'))
+    return checks
+
+
+def rfid_identity(request):
+    return [('rfid', f'ip:{client_ip(request)}')]
+
+
+def _limits():
+    return getattr(settings, 'RATELIMITS', DEFAULT_LIMITS)
+
+
+def rate_limited(identify):
+    """Reject requests over the scope's token-bucket limit with a cheap 429.
+
+    ``identify(request)`` returns a list of ``(scope, key)`` checks; limits come from
+    ``settings.RATELIMITS`` (``DEFAULT_LIMITS`` for a scope it doesn't list).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'RATELIMIT_ENABLED', True):
+                return view(request, *args, **kwargs)
+            limits = _limits()
+            backend = _backend()
+            for scope, key in identify(request):
+                per_minute, burst = limits.get(scope) or DEFAULT_LIMITS.get(scope) or limits['default']
+                wait = backend.take(f'{scope}:{key}', per_minute / 60, burst)
+                if wait:
+                    metrics.incr(f'ratelimit.throttled.{scope}')
+                    response = JsonResponse({'status': 'error', 'message': 'Too many requests'}, status=429)
+                    response['Retry-After'] = str(int(wait) + 1)
+                    # counted above; skip django.request's per-response warning so a flood doesn't hit the log disk
+                    response._has_been_logged = True
+                    return response
+                metrics.incr(f'ratelimit.allowed.{scope}')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
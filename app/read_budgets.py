@@ -0,0 +1,31 @@
+"""Read-path budgets: database queries and p95 latency per page on seeded data (``seed_data``).
+
+Query counts don't depend on the amount of data, so ``TestReadPathBudgets`` checks them on a
+small seed in every test run; ``scripts/bench_read_paths.py`` checks both on millions of rows
+and writes a JSON report to compare runs. Counts include the session and user lookups (2);
+pages are measured with the page cache off.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ReadPath:
+    name: str
+    path: str
+    max_queries: int
+    max_ms: float  # p95 on the default bench seed (1M readings per monitoring, 1M access logs)
+
+
+READ_PATHS = [
+    ReadPath('dashboard', '/dashboard/', 4, 100),
+    ReadPath('data_table', '/table/', 4, 100),
+    ReadPath('data_table_last_page', '/table/?page=last', 4, 100),
+    ReadPath('latest_sensor_data', '/api/latest/', 3, 20),
+    ReadPath('access_log_list', '/acessos/', 7, 100),
+    ReadPath('dashboard_brise', '/dashboard/brise/', 2, 20),
+    ReadPath('data_table_brise', '/table/brise/', 2, 20),
+    # the window's row count decides between raw readings and SQL buckets (app.charts.bounded_series)
+    ReadPath('chart_series', '/api/series/default/', 4, 200),
+    ReadPath('chart_series_device', '/api/series/brise/?dispositivo=seed-brise-000', 5, 100),
+    ReadPath('chart_series_week', '/api/series/pavimentos/?horas=168', 4, 600),
+]
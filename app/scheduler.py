@@ -0,0 +1,145 @@
+"""In-project job scheduler (``python manage.py run_scheduler``), no broker or extra service.
+
+Jobs are plain functions registered in code with ``@job(every=...)`` (see app.jobs). Their
+schedule lives in ``ScheduledJob`` rows in the 'default' database: a scheduler claims a due
+job by moving its lease forward in one conditional UPDATE, so several scheduler processes
+(or a restarted one) never run the same job twice at the same time. Claimed jobs run on a
+thread pool; each run's duration and outcome are recorded on the row.
+
+A job that outlives its lease can be claimed again, so ``lease`` must exceed its worst run.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    func: object
+    every: timedelta
+    lease: timedelta
+
+
+registry = {}
+
+
+def job(every, name=None, lease=None):
+    """Register the decorated function to run every ``every`` (a timedelta)."""
+    def decorator(func):
+        job_name = name or func.__name__
+        registry[job_name] = Job(job_name, func, every, lease or max(every, timedelta(minutes=5)))
+        return func
+    return decorator
+
+
+def default_owner():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def sync_rows():
+    """Create the rows of newly registered jobs (due immediately)."""
+    existing = set(ScheduledJob.objects.filter(name__in=registry).values_list('name', flat=True))
+    ScheduledJob.objects.bulk_create([ScheduledJob(name=name) for name in registry if name not in existing],
+                                     ignore_conflicts=True)
+
+
+def claim(job_, owner, now=None, force=False):
+    """Take the lease of ``job_`` if it is due (any time with ``force``) and not leased; True on success."""
+    now = now or timezone.now()
+    free = Q(lease_until__isnull=True) | Q(lease_until__lt=now)
+    due = Q() if force else Q(next_run__lte=now)
+    return ScheduledJob.objects.filter(free, due, name=job_.name).update(
+        lease_owner=owner, lease_until=now + job_.lease, last_started=now) == 1
+
+
+def run(job_, owner):
+    """Run a claimed job and record the outcome; returns True if it succeeded."""
+    started = timezone.now()
+    clock = time.perf_counter()
+    error = ''
+    try:
+        result = job_.func()
+        logger.info('job %s done in %.0f ms: %s', job_.name, (time.perf_counter() - clock) * 1000, result)
+    except Exception:
+        error = traceback.format_exc()
+        logger.error('job %s failed:\n%s', job_.name, error)
+    elapsed_ms = (time.perf_counter() - clock) * 1000
+    metrics.incr(f'job.{job_.name}.runs')
+    if error:
+        metrics.incr(f'job.{job_.name}.failures')
+    ScheduledJob.objects.filter(name=job_.name, lease_owner=owner).update(
+        lease_owner='', lease_until=None, next_run=started + job_.every,
+        last_finished=timezone.now(), last_ok=not error, last_error=error[-4000:], last_duration_ms=elapsed_ms,
+        total_duration_ms=F('total_duration_ms') + elapsed_ms, runs=F('runs') + 1,
+        failures=F('failures') + (1 if error else 0),
+    )
+    # max() of the old value and this run's, portable across backends
+    ScheduledJob.objects.filter(name=job_.name, max_duration_ms__lt=elapsed_ms).update(max_duration_ms=elapsed_ms)
+    return not error
+
+
+class Scheduler:
+    """Polls the job table and runs due jobs on a thread pool until ``stop()``."""
+
+    def __init__(self, workers=4, poll=5.0, owner=None):
+        self.owner = owner or default_owner()
+        self.poll = poll
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def tick(self, now=None):
+        """Start every due job this process isn't already running; returns their names."""
+        started = []
+        for name, job_ in registry.items():
+            with self._lock:
+                if name in self._running:
+                    continue
+            if claim(job_, self.owner, now):
+                with self._lock:
+                    self._running.add(name)
+                self.pool.submit(self._run, job_)
+                started.append(name)
+        return started
+
+    def _run(self, job_):
+        try:
+            run(job_, self.owner)
+        finally:
+            with self._lock:
+                self._running.discard(job_.name)
+            connections.close_all()
+
+    def run_forever(self):
+        sync_rows()
+        logger.info('scheduler %s started with jobs: %s', self.owner, ', '.join(sorted(registry)))
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception('scheduler tick failed')
+                close_old_connections()
+            self._stop.wait(self.poll)
+        self.pool.shutdown(wait=True)
+        # give back the leases of jobs that never started (none normally: shutdown waited)
+        ScheduledJob.objects.filter(lease_owner=self.owner).update(lease_owner='', lease_until=None)
+
+    def stop(self, *args):
+        self._stop.set()
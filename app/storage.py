@@ -0,0 +1,49 @@
+"""Storage-layout-independent access to readings (see ``READING_STORAGE`` and app.packed)."""
+from django.conf import settings
+
+from .models import BrisePackedReading, BriseSensorReading
+from .packed import PackedChannelsMixin, channel_names, unpack_fields
+
+
+def storage_mode(monitoring):
+    return getattr(settings, 'READING_STORAGE', {}).get(monitoring, 'wide')
+
+
+def brise_model():
+    """Model new brise readings are stored in (and read from)."""
+    return BrisePackedReading if storage_mode('brise') == 'packed' else BriseSensorReading
+
+
+def channels(reading, fields):
+    """``{field: value}`` of a reading of either layout."""
+    if isinstance(reading, PackedChannelsMixin):
+        values = reading.channels()
+        return {name: values.get(name) for name in fields}
+    return {name: getattr(reading, name) for name in fields}
+
+
+def series(queryset, fields):
+    """Columnar ``(timestamps, {field: [values]})`` for a queryset of either layout.
+
+    Fetches only the needed columns (the blob for packed rows) and keeps the queryset's order.
+    """
+    timestamps = []
+    columns = {name: [] for name in fields}
+    targets = [columns[name].append for name in fields]
+    if issubclass(queryset.model, PackedChannelsMixin):
+        # channels come out of the blob, anything else (battery_level, ...) is a real column
+        names = set(channel_names(queryset.model._meta.get_field('schema').default))
+        packed = [name for name in fields if name in names]
+        plain = [name for name in fields if name not in names]
+        targets = [columns[name].append for name in packed + plain]
+        rows = queryset.values_list('timestamp', 'schema', 'mask', 'values', *plain).iterator(chunk_size=2000)
+        for ts, schema, mask, blob, *values in rows:
+            timestamps.append(ts)
+            for append, value in zip(targets, unpack_fields(schema, mask, blob, packed) + values):
+                append(value)
+    else:
+        for ts, *values in queryset.values_list('timestamp', *fields).iterator(chunk_size=2000):
+            timestamps.append(ts)
+            for append, value in zip(targets, values):
+                append(value)
+    return timestamps, columns
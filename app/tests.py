@@ -1,15 +1,35 @@
-from django.test import TestCase, Client, override_settings
+import io
+import logging
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.conf import settings as djsettings
-from .models import BriseSensorReading
+from .models import BriseSensorReading, SensorReading
 
 # Ensure test DB has aliases for 'brise' and 'pavimentos' pointing to default test DB
 _test_databases = dict(djsettings.DATABASES)
 _test_databases['brise'] = _test_databases['default']
 _test_databases['pavimentos'] = _test_databases['default']
+# Keep tests off the shared on-disk cache
+_test_caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+# Every test client posts from 127.0.0.1; rate limiting is covered by its own tests
+_test_settings = {'DATABASES': _test_databases, 'CACHES': _test_caches, 'RATELIMIT_ENABLED': False}
+# Records logged during the run (django.request warnings of the 4xx tests, job logs) go to a
+# buffer instead of the JSON handlers on stderr; tests that check a record use assertLogs
+_root_handlers = []
+
+
+def setUpModule():
+    root = logging.getLogger()
+    _root_handlers[:] = root.handlers
+    root.handlers = [logging.StreamHandler(io.StringIO())]
 
 
-@override_settings(DATABASES=_test_databases)
+def tearDownModule():
+    logging.getLogger().handlers = _root_handlers
+
+
+@override_settings(**_test_settings)
 class TestReceiveSensorData(TestCase):
     def setUp(self):
         self.client = Client()
@@ -42,3 +62,1169 @@ class TestReceiveSensorData(TestCase):
         self.assertEqual(r.device_id, 'test_esp')
         self.assertAlmostEqual(r.ds18b20_1, 24.1)
         self.assertAlmostEqual(r.dht11_1_hum, 55.1)
+
+
+def _brise_payload(**overrides):
+    payload = {"monitoring": "brise", "device_id": "test_esp", "battery": 75.0}
+    for i in range(1, 7):
+        payload[f"ds18b20_{i}"] = 24.0 + i / 10
+    payload.update({
+        "dht11_1_temp": 23.5, "dht11_1_hum": 55.1, "dht11_2_temp": 23.0, "dht11_2_hum": 54.8,
+        "uv_1": 0.12, "uv_2": 0.13, "wind_1": 1.2, "wind_2": 1.1,
+    })
+    payload.update(overrides)
+    return payload
+
+
+class TestSqliteProfile(TestCase):
+    def test_tuned_options_applied_to_sqlite(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        options = djsettings.DATABASES['default'].get('OPTIONS', {})
+        self.assertEqual(options.get('transaction_mode'), 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], djsettings.SQLITE_BUSY_TIMEOUT_MS)
+
+
+@override_settings(INGEST_SINGLE_WRITER=True, CACHES=_test_caches, RATELIMIT_ENABLED=False)
+class TestIngestWriter(TransactionTestCase):
+    def test_readings_are_saved_through_writer(self):
+        from concurrent.futures import ThreadPoolExecutor
+        url = reverse('receive_sensor_data')
+
+        def post(i):
+            return Client().post(url, data=_brise_payload(device_id=f'esp_{i}'), content_type='application/json')
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(post, range(8)))
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertTrue(all(r.json()['id'] for r in responses))
+        self.assertEqual(BriseSensorReading.objects.count(), 8)
+
+    def test_duplicate_in_batch_does_not_fail_the_others(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from . import dedup
+        dedup.reset()
+        url = reverse('receive_sensor_data')
+
+        def post(i):
+            payload = _brise_payload(device_id='esp_dup', seq=i % 4)
+            return Client().post(url, data=payload, content_type='application/json')
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(post, range(16)))
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertEqual(BriseSensorReading.objects.count(), 4)
+
+    def test_saved_readings_are_queued_for_forwarding(self):
+        from .models import OutboxEntry
+        url = reverse('receive_sensor_data')
+        sinks = {'file': {'class': 'app.forwarding.FileSink', 'path': '/dev/null'}}
+        with self.settings(FORWARDING_SINKS=sinks):
+            for seq in (1, 2, 2):
+                Client().post(url, data=_brise_payload(device_id='esp_fwd', seq=seq), content_type='application/json')
+        self.assertEqual(OutboxEntry.objects.filter(sink='file').count(), 2)  # not the duplicate
+
+    def test_writer_timeout_asks_the_device_to_resend(self):
+        from concurrent.futures import Future
+        from unittest import mock
+        from . import ingest_writer, metrics
+        metrics.reset()
+        writer = mock.Mock(**{'submit.return_value': Future()})  # never resolved
+        url = reverse('receive_sensor_data')
+        with mock.patch.object(ingest_writer, 'get_writer', return_value=writer), \
+                self.settings(INGEST_WRITER_TIMEOUT_SECONDS=0.01), self.assertLogs('app.api_views', 'WARNING'):
+            response = Client().post(url, data=_brise_payload(device_id='esp_slow', seq=7), content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(metrics.snapshot()['ingest.writer_timeouts'], 1)
+
+    def test_failed_enqueue_rolls_back_the_batch(self):
+        from unittest import mock
+        from . import forwarding
+        url = reverse('receive_sensor_data')
+        with mock.patch.object(forwarding, 'enqueue', side_effect=RuntimeError('outbox unavailable')), \
+                self.assertLogs('app', 'ERROR'):
+            response = Client().post(url, data=_brise_payload(device_id='esp_fwd', seq=1), content_type='application/json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(BriseSensorReading.objects.exists())
+
+
+@override_settings(**_test_settings)
+class TestBinaryPayload(TestCase):
+    def test_binary_frame_matches_json_reading(self):
+        from . import payloads
+        data = _brise_payload(device_id='bin_esp')
+        values = {k: v for k, v in data.items() if k in payloads.BRISE_FIELDS}
+        frame = payloads.encode(1, 'bin_esp', values, battery=75.0)
+        url = reverse('receive_sensor_data')
+
+        response = self.client.post(url, data=frame, content_type='application/x-ecoview-struct')
+        self.assertEqual(response.status_code, 200)
+        self.client.post(url, data=data, content_type='application/json')
+
+        binary, json_reading = BriseSensorReading.objects.order_by('id')
+        for field in payloads.BRISE_FIELDS + ('device_id', 'battery_level'):
+            self.assertAlmostEqual(getattr(binary, field), getattr(json_reading, field), places=4)
+
+    def test_sparse_brise_frame_matches_json_nulls(self):
+        from . import payloads
+        data = _brise_payload(device_id='bin_sparse', uv_2=None, wind_2=None)
+        values = {k: v for k, v in data.items() if k in payloads.BRISE_FIELDS}
+        url = reverse('receive_sensor_data')
+        response = self.client.post(url, data=payloads.encode(1, 'bin_sparse', values),
+                                    content_type='application/x-ecoview-struct')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post(url, data=data, content_type='application/json').status_code, 200)
+        for reading in BriseSensorReading.objects.filter(device_id='bin_sparse'):
+            self.assertIsNone(reading.uv_2)
+            self.assertIsNone(reading.wind_2)
+            self.assertAlmostEqual(reading.uv_1, 0.12, places=4)
+
+    def test_truncated_frame_is_rejected(self):
+        from . import payloads
+        frame = payloads.encode(2, 'pav', {'sensor_a': 1.0, 'sensor_b': 2.0})
+        response = self.client.post(reverse('receive_sensor_data'), data=frame[:-2], content_type='application/x-ecoview-struct')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(**_test_settings)
+class TestIdempotentIngest(TestCase):
+    def setUp(self):
+        from . import dedup
+        dedup.reset()
+        self.url = reverse('receive_sensor_data')
+
+    def test_retry_with_same_seq_is_not_stored_twice(self):
+        for _ in range(3):
+            response = self.client.post(self.url, data=_brise_payload(seq=7), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['duplicate'])
+        self.assertEqual(BriseSensorReading.objects.count(), 1)
+
+    def test_unique_constraint_catches_duplicates_from_other_workers(self):
+        from . import dedup
+        self.client.post(self.url, data=_brise_payload(seq=7), content_type='application/json')
+        dedup.reset()  # as seen by a worker that never handled this device
+        response = self.client.post(self.url, data=_brise_payload(seq=7), content_type='application/json')
+        self.assertTrue(response.json()['duplicate'])
+        self.assertEqual(BriseSensorReading.objects.count(), 1)
+
+    def test_seq_out_of_range_is_rejected(self):
+        for seq in (-1, 2 ** 63, 2 ** 64):
+            response = self.client.post(self.url, data=_brise_payload(seq=seq), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, data=_brise_payload(seq=2 ** 63 - 1), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_integrity_errors_are_not_duplicates(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from . import forwarding
+        with mock.patch.object(forwarding, 'enqueue', side_effect=IntegrityError('outbox')), \
+                self.assertLogs('app.api_views', 'ERROR'):
+            response = self.client.post(self.url, data=_brise_payload(seq=5), content_type='application/json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(BriseSensorReading.objects.exists())
+        response = self.client.post(self.url, data=_brise_payload(seq=5), content_type='application/json')
+        self.assertNotIn('duplicate', response.json())  # the retry is stored, not dropped
+        self.assertEqual(BriseSensorReading.objects.count(), 1)
+
+    def test_non_finite_values_are_rejected(self):
+        import json
+        for value in (float('nan'), float('inf'), float('-inf')):
+            response = self.client.post(self.url, data=json.dumps(_brise_payload(uv_1=value)),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(BriseSensorReading.objects.exists())
+
+    def test_binary_frame_carries_seq(self):
+        from . import payloads
+        frame = payloads.encode(2, 'pav', {'sensor_a': 1.0, 'sensor_b': 2.0}, seq=41)
+        self.assertEqual(payloads.decode(frame)['seq'], 41)
+
+    def test_seq_window(self):
+        from .dedup import SeqWindow, WINDOW_SIZE
+        window = SeqWindow()
+        for seq in (10, 12, 11):
+            self.assertFalse(window.seen(seq))
+            window.mark(seq)
+        self.assertTrue(window.seen(10))
+        self.assertFalse(window.seen(9))
+        window.mark(10 + WINDOW_SIZE * 2)
+        self.assertIsNone(window.seen(12))
+
+
+@override_settings(**_test_settings)
+class TestDeviceTimestamps(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from . import timestamps
+        cache.clear()
+        timestamps.skew.reset()
+        self.url = reverse('receive_sensor_data')
+
+    def test_sample_ts_formats(self):
+        from .timestamps import parse_device_ts
+        expected = parse_device_ts('2026-01-02T03:04:05Z')
+        self.assertEqual(parse_device_ts(int(expected.timestamp())), expected)
+        self.assertEqual(parse_device_ts(int(expected.timestamp()) * 1000), expected)
+        self.assertEqual(parse_device_ts('2026-01-02 03:04:05'), expected)
+
+    def test_device_clock_skew_is_corrected(self):
+        from django.utils import timezone
+        now = int(timezone.now().timestamp())
+        # device clock runs 100 s behind; the reading was taken 60 s ago by its clock
+        payload = _brise_payload(device_now=now - 100, sample_ts=now - 160)
+        self.client.post(self.url, data=payload, content_type='application/json')
+        # a later buffered reading without device_now reuses the learnt offset
+        self.client.post(self.url, data=_brise_payload(sample_ts=now - 400), content_type='application/json')
+        first, second = BriseSensorReading.objects.order_by('-timestamp')
+        self.assertAlmostEqual(first.timestamp.timestamp(), now - 60, delta=2)
+        self.assertAlmostEqual(second.timestamp.timestamp(), now - 300, delta=2)
+
+    def test_offset_is_shared_and_worker_memory_bounded(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .timestamps import ClockSkew
+        now = timezone.now()
+        worker_a, worker_b = ClockSkew(max_devices=2), ClockSkew(max_devices=2)
+        worker_a.observe('esp_skew', now - timedelta(seconds=100), now)
+        self.assertAlmostEqual(worker_b.offset('esp_skew'), 100)  # learnt by another worker
+        for device in ('d1', 'd2', 'd3'):
+            worker_a.observe(device, now, now)
+        self.assertEqual(list(worker_a._offsets), ['d2', 'd3'])
+
+    def test_backfill_does_not_replace_latest_value(self):
+        from django.utils import timezone
+        from . import latest
+        now = int(timezone.now().timestamp())
+        generic = {f'sensor{i}': float(i) for i in range(1, 15)}
+        self.client.post(self.url, data={'device_id': 'esp', 'sample_ts': now - 10, **generic, 'sensor1': 30.0}, content_type='application/json')
+        self.client.post(self.url, data={'device_id': 'esp', 'sample_ts': now - 3600, **generic, 'sensor1': 10.0}, content_type='application/json')
+        self.assertEqual(latest.get(SensorReading)['sensor1'], 30.0)
+
+    def test_latest_entries_expire_and_fall_back_to_the_db(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from django.utils import timezone
+        from . import latest
+        generic = {f'sensor{i}': float(i) for i in range(1, 15)}
+        self.client.post(self.url, data={'device_id': 'esp', **generic}, content_type='application/json')
+        backfill = {'device_id': 'esp', 'sample_ts': int(timezone.now().timestamp()) - 3600, **generic, 'sensor1': 10.0}
+        self.client.post(self.url, data=backfill, content_type='application/json')
+        ref = SensorReading.objects.values_list('device_ref', flat=True).distinct().get()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set, self.settings(LATEST_CACHE_TIMEOUT=60):
+            cache.clear()
+            self.assertEqual(latest.get(SensorReading, ref)['sensor1'], 1.0)
+        key, _, timeout = cache_set.call_args.args
+        self.assertEqual((key, timeout), (f'latest:app.sensorreading:{ref}', 60))
+        self.assertEqual(latest._key(SensorReading, 'esp 32/ü'), latest._key(SensorReading, 'esp 32/ü'))
+        self.assertRegex(latest._key(SensorReading, 'esp 32/ü'), r'^latest:app\.sensorreading:[0-9a-f]{32}$')
+        self.assertEqual(SensorReading.objects.count(), 2)
+
+    def test_too_old_sample_ts_is_rejected(self):
+        response = self.client.post(self.url, data=_brise_payload(sample_ts='2000-01-01T00:00:00Z'), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(**dict(_test_settings, RATELIMIT_ENABLED=True, RATELIMITS={'default': (60, 2), 'brise': (60, 3), 'rfid': (60, 2)}))
+class TestRateLimit(TestCase):
+    def setUp(self):
+        from . import metrics, ratelimit
+        ratelimit._local = ratelimit.LocalBackend()
+        metrics.reset()
+        self.url = reverse('receive_sensor_data')
+
+    def test_device_over_burst_gets_429_before_body_is_parsed(self):
+        statuses = [self.client.post(self.url, data='not json', content_type='application/json',
+                                     headers={'X-Device-Id': 'esp_loop', 'X-Monitoring': 'brise'}).status_code
+                    for _ in range(5)]
+        self.assertEqual(statuses, [400, 400, 400, 429, 429])
+        # other devices are not affected
+        response = self.client.post(self.url, data=_brise_payload(), content_type='application/json',
+                                    headers={'X-Device-Id': 'esp_ok'})
+        self.assertEqual(response.status_code, 200)
+
+        from . import metrics
+        self.assertEqual(metrics.snapshot()['ratelimit.throttled.brise'], 2)
+
+    def test_binary_frames_are_keyed_by_device(self):
+        from . import payloads
+        frames = [payloads.encode(2, f'pav_{i % 2}', {'sensor_a': 1.0, 'sensor_b': 2.0}) for i in range(6)]
+        statuses = [self.client.post(self.url, data=f, content_type='application/x-ecoview-struct').status_code for f in frames]
+        self.assertEqual(statuses.count(429), 2)
+
+    def test_devices_behind_one_address_get_their_own_buckets(self):
+        # X-Device-Id names the device, so a site NAT doesn't share one bucket
+        statuses = [self.client.post(self.url, data=_brise_payload(device_id=f'esp_nat_{i % 6}', seq=i),
+                                     content_type='application/json',
+                                     headers={'X-Device-Id': f'esp_nat_{i % 6}', 'X-Monitoring': 'brise'}).status_code
+                    for i in range(18)]
+        self.assertEqual(statuses, [200] * 18)
+
+    def test_rotating_device_ids_hit_the_ip_ceiling(self):
+        limits = {'default': (60, 2), 'brise': (60, 3), 'ip': (60, 5), 'rfid': (60, 2)}
+        with self.settings(RATELIMITS=limits):
+            rotated = [self.client.post(self.url, data=_brise_payload(device_id=f'esp_rot_{i}', seq=i),
+                                        content_type='application/json',
+                                        headers={'X-Device-Id': f'esp_rot_{i}'}).status_code for i in range(7)]
+        self.assertEqual(rotated, [200] * 5 + [429] * 2)
+
+        from . import metrics
+        self.assertEqual(metrics.snapshot()['ratelimit.throttled.ip'], 2)
+
+    def test_sample_ts_does_not_raise_the_budget(self):
+        import time
+        base = int(time.time()) - 3600
+        statuses = [self.client.post(self.url, data=_brise_payload(device_id='esp_buf', seq=i, sample_ts=base + i),
+                                     content_type='application/json',
+                                     headers={'X-Device-Id': 'esp_buf', 'X-Monitoring': 'brise'}).status_code
+                    for i in range(5)]
+        self.assertEqual(statuses, [200] * 3 + [429] * 2)
+
+    def test_local_backend_evicts_least_recently_used(self):
+        from .ratelimit import LocalBackend
+        backend = LocalBackend(max_keys=2)
+        self.assertEqual(backend.take('a', 1 / 60, 1), 0)
+        self.assertEqual(backend.take('b', 1 / 60, 1), 0)
+        self.assertGreater(backend.take('a', 1 / 60, 1), 0)
+        backend.take('c', 1 / 60, 1)
+        # 'b' was idle longest and made room; 'a' is still throttled
+        self.assertGreater(backend.take('a', 1 / 60, 1), 0)
+        self.assertEqual(backend.take('b', 1 / 60, 1), 0)
+
+    def test_shared_cache_backend(self):
+        with self.settings(RATELIMIT_BACKEND='cache'):
+            statuses = [self.client.post(reverse('verifica_cartao'), data={'uid': 'x'}, content_type='application/json').status_code
+                        for _ in range(3)]
+        self.assertEqual(statuses[-1], 429)
+
+
+@override_settings(**_test_settings)
+class TestPageCache(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        cache.clear()
+        self.client.force_login(User.objects.create_user('viewer', password='x'))
+        self.url = reverse('dashboard')
+
+    def _ingest(self, sensor1):
+        payload = {'device_id': 'esp', **{f'sensor{i}': float(i) for i in range(1, 15)}, 'sensor1': sensor1}
+        self.client.post(reverse('receive_sensor_data'), data=payload, content_type='application/json')
+
+    def test_repeated_loads_are_served_from_cache_until_ingest(self):
+        self._ingest(21.5)
+        first = self.client.get(self.url)
+        self.assertContains(first, '21,5')
+        with self.assertNumQueries(2):  # session + user for login_required only
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+        self._ingest(33.25)
+        self.assertContains(self.client.get(self.url), '33,25')
+
+    def test_error_render_is_not_cached(self):
+        from unittest import mock
+        self._ingest(21.5)
+        with mock.patch.object(SensorReading.objects, 'filter', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.client.get(self.url).status_code, 500)
+        self.assertContains(self.client.get(self.url), '21,5')
+
+    def test_conditional_and_compressed_responses(self):
+        import gzip
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': first['ETag']}).status_code, 304)
+        compressed = self.client.get(self.url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), first.content)
+
+    def test_pages_are_per_user(self):
+        from django.contrib.auth.models import User
+        self.assertContains(self.client.get(reverse('home')), 'viewer')
+        self.client.force_login(User.objects.create_user('other', password='x'))
+        self.assertContains(self.client.get(reverse('home')), 'other')
+
+
+@override_settings(**_test_settings)
+class TestDataVersions(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from . import dedup, devices
+        cache.clear()
+        dedup.reset()
+        devices.registry.reset()
+        self.client.force_login(User.objects.create_user('viewer', password='x'))
+
+    def _ingest(self, device_id, seq):
+        self.client.post(reverse('receive_sensor_data'), data=_brise_payload(device_id=device_id, seq=seq),
+                         content_type='application/json')
+
+    def test_ingest_bumps_monitoring_and_device(self):
+        from . import versions
+        whole, esp_1 = versions.subscribe('brise'), versions.subscribe('brise', 'esp_1')
+        self.assertTrue(whole.changed() and esp_1.changed())
+        self._ingest('esp_2', 1)
+        self.assertEqual((whole.changed(), esp_1.changed()), (True, False))
+        self._ingest('esp_1', 1)
+        self.assertEqual((whole.changed(), esp_1.changed()), (True, True))
+        self.assertFalse(whole.changed())
+        self.assertNotIn(' ', versions.key('data', 'brise', 'esp 1/x'))  # safe for memcached
+
+    def test_device_filtered_series_ignore_other_devices(self):
+        url = reverse('chart_series', args=['brise'])
+        self._ingest('esp_1', 1)
+        self.assertEqual(self.client.get(url, {'dispositivo': 'esp_1'}).json()['count'], 1)
+        self._ingest('esp_2', 1)
+        with self.assertNumQueries(2):  # session + user: esp_1's page is still current
+            self.assertEqual(self.client.get(url, {'dispositivo': 'esp_1'}).json()['count'], 1)
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+
+        version = self.client.get(reverse('data_version', args=['brise'])).json()['versao']
+        self._ingest('esp_1', 2)
+        self.assertNotEqual(self.client.get(reverse('data_version', args=['brise'])).json()['versao'], version)
+
+
+@override_settings(**dict(_test_settings, ROOT_URLCONF='config.urls_ingest', MIDDLEWARE=[
+    'django.middleware.security.SecurityMiddleware', 'django.middleware.common.CommonMiddleware']))
+class TestIngestEntryPoint(TestCase):
+    def test_device_endpoints_without_session_middleware(self):
+        payload = {'device_id': 'esp', **{f'sensor{i}': float(i) for i in range(1, 15)}}
+        response = self.client.post(reverse('receive_sensor_data'), data=payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('latest_sensor_data')).json()['sensor1'], 1.0)
+
+    def test_worker_counters_need_the_metrics_token(self):
+        from . import metrics
+        metrics.reset()
+        with self.settings(RATELIMIT_ENABLED=True):
+            self.client.post(reverse('receive_sensor_data'), data='{}', content_type='application/json',
+                             headers={'X-Device-Id': 'esp_m'})
+        url = reverse('ingest_metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer nope'}).status_code, 403)
+            data = self.client.get(url, headers={'Authorization': 'Bearer s3cret'}).json()
+        self.assertEqual(data['counters']['ratelimit.allowed.default'], 1)
+
+    def test_web_ui_is_not_routed(self):
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+@override_settings(**_test_settings)
+class TestCardImport(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from . import cards
+        cache.clear()
+        cards.index.reset()
+        self.cards = cards
+
+    def _import(self, text, **kwargs):
+        return self.cards.import_cards(text.encode('utf-8'), **kwargs)
+
+    def test_upserts_in_chunks_and_reports_invalid_rows(self):
+        from .models import CartaoRFID
+        CartaoRFID.objects.create(uid='AA01', nome_pessoa='Old', email='old@x.br', funcao='aluno', matricula='1')
+        result = self._import(
+            'uid;nome;nome_pessoa;email;funcao;matricula\n'
+            'AA01;;Ana;ana@x.br;aluno;10\n'
+            'AA02;;Bruno;not-an-email;aluno;11\n'
+            'AA03;;Caio;caio@x.br;aluno;12\n'
+            ';;Sem UID;s@x.br;aluno;13\n'
+            'AA03;;Caio Silva;caio@x.br;aluno;12\n',
+            chunk_size=2,
+        )
+        self.assertEqual((result.rows, result.imported, result.duplicates), (5, 2, 1))
+        self.assertEqual([line for line, _ in result.errors], [3, 5])
+        self.assertEqual(CartaoRFID.objects.get(uid='AA01').nome_pessoa, 'Ana')
+        self.assertEqual(CartaoRFID.objects.get(uid='AA03').nome_pessoa, 'Caio Silva')
+        self.assertEqual(CartaoRFID.objects.count(), 2)
+
+    def test_index_refreshes_incrementally(self):
+        from .models import CartaoRFID
+        self._import('uid,nome_pessoa,email,funcao,matricula\nBB01,Ana,ana@x.br,aluno,1\n')
+        card_id = CartaoRFID.objects.get(uid='BB01').pk
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.post(reverse('verifica_cartao'), data={'uid': 'BB01'}, content_type='application/json')
+        with CaptureQueriesContext(connection) as queries:  # index hit: the card table isn't read
+            response = self.client.post(reverse('verifica_cartao'), data={'uid': 'BB01'}, content_type='application/json')
+        self.assertTrue(response.json()['autorizado'])
+        self.assertFalse([q for q in queries.captured_queries if 'app_cartaorfid' in q['sql']])
+
+        self._import('uid,nome_pessoa,email,funcao,matricula\nBB02,Bia,bia@x.br,aluno,2\n')
+        self.assertIsNotNone(self.cards.index.lookup('BB02'))
+        self.assertEqual(self.cards.index.lookup(' BB01 '), card_id)
+        self.assertIsNone(self.cards.index.lookup('ZZ99'))
+
+    def test_index_catches_up_without_a_cache_bump(self):
+        from .models import CartaoRFID
+        worker = self.cards.UidIndex()
+        card = {'nome_pessoa': 'Ana', 'email': 'ana@x.br', 'funcao': 'aluno', 'matricula': '1'}
+        CartaoRFID.objects.create(uid='DD00', **card)
+        self.assertIsNotNone(worker.lookup('DD00'))
+        # on_commit never fires inside TestCase: these changes reach no worker through the cache
+        added = CartaoRFID.objects.create(uid='DD01', **card)
+        self.assertEqual(worker.lookup('DD01'), added.pk)  # DB fallback
+        added.delete()
+        with self.settings(CARD_INDEX_MAX_AGE_SECONDS=0):
+            self.assertIsNone(worker.lookup('DD01'))
+            self.assertEqual(len(worker), 1)
+
+    def test_upload_view(self):
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.force_login(User.objects.create_user('staff', password='x'))
+        upload = SimpleUploadedFile('cards.csv', b'uid,nome_pessoa,email,funcao,matricula\nCC01,Ana,ana@x.br,aluno,1\n')
+        response = self.client.post(reverse('importar_cartoes'), {'arquivo': upload})
+        self.assertContains(response, '1 cartões importados')
+
+
+@override_settings(**_test_settings)
+class TestAccessStats(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from . import cards
+        cache.clear()
+        cards.index.reset()
+
+    def _swipe(self, uid):
+        return self.client.post(reverse('verifica_cartao'), data={'uid': uid}, content_type='application/json')
+
+    def _snapshot(self):
+        from .models import AccessHourly, AccessUidSummary
+        return (list(AccessHourly.objects.values_list('hora', 'total', 'negados')),
+                list(AccessUidSummary.objects.order_by('uid').values_list(
+                    'uid', 'cartao_id', 'total', 'negados', 'ultimo_acesso', 'ultimo_autorizado',
+                    'rajada_inicio', 'rajada_negados', 'ultimo_negado', 'maior_rajada')))
+
+    def test_summaries_follow_swipes_and_match_a_rebuild(self):
+        from .models import CartaoRFID
+        from . import access_stats
+        CartaoRFID.objects.create(uid='OK1', nome_pessoa='Ana', email='ana@x.br', funcao='aluno', matricula='1')
+        for uid in ['OK1', 'BAD', 'BAD', 'OK1', 'BAD']:
+            self._swipe(uid)
+
+        data = access_stats.summary()
+        self.assertEqual((data['por_hora'][-1]['total'], data['por_hora'][-1]['negados']), (5, 3))
+        self.assertEqual(sum(day['total'] for day in data['por_dia']), 5)
+        self.assertEqual([(b['uid'], b['negados'], b['ativa']) for b in data['rajadas_negadas']], [('BAD', 3, True)])
+        self.assertEqual([(c['nome'], c['total']) for c in data['ultimos_acessos']], [('Ana', 2)])
+
+        incremental = self._snapshot()
+        access_stats.rebuild_hourly()
+        access_stats.rebuild_uid_summaries()
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_first_swipe_race_keeps_burst_state(self):
+        from datetime import timedelta
+        from unittest import mock
+        from django.utils import timezone
+        from .models import AccessLog, AccessUidSummary
+        from . import access_stats
+        now = timezone.now()
+        AccessUidSummary.objects.create(uid='RACE', total=1, negados=1, ultimo_acesso=now - timedelta(seconds=30),
+                                        ultimo_autorizado=False, rajada_inicio=now - timedelta(seconds=30),
+                                        rajada_negados=1, ultimo_negado=now - timedelta(seconds=30), maior_rajada=1)
+        log = AccessLog.objects.create(uid='RACE', autorizado=False)
+        # our lookup ran before the other worker's insert: the create conflicts, and is retried
+        theirs = AccessUidSummary.objects.get(uid='RACE')
+        with mock.patch.object(access_stats, '_locked_summary', side_effect=[None, theirs]):
+            access_stats.record(log)
+        summary = AccessUidSummary.objects.get(uid='RACE')
+        self.assertEqual((summary.total, summary.negados, summary.rajada_negados, summary.maior_rajada), (2, 2, 2, 2))
+        self.assertEqual(summary.ultimo_negado, log.timestamp)
+
+    def test_page_counts_the_log_until_summaries_cover_it(self):
+        from datetime import timedelta
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from .models import AccessLog
+        from . import access_stats
+        # restored without summaries
+        AccessLog.objects.bulk_create([AccessLog(uid='OLD', autorizado=True) for _ in range(40)])
+        AccessLog.objects.update(timestamp=timezone.now() - timedelta(days=3))
+        self._swipe('BAD')
+        self.assertIsNone(access_stats.total_logged())
+        self.client.force_login(User.objects.create_user('staff', password='x'))
+        self.assertContains(self.client.get(reverse('access_log_list')), 'Total de registros: 41')
+        access_stats.rebuild_hourly()
+        self.assertEqual(access_stats.total_logged(), 41)
+
+    def test_deleted_logs_leave_the_page_count(self):
+        from django.contrib.auth.models import User
+        from .models import AccessLog
+        from . import access_stats
+        for uid in ['KEEP', 'BAD', 'BAD']:
+            self._swipe(uid)
+        AccessLog.objects.filter(uid='BAD').delete()
+        self.assertEqual(access_stats.total_logged(), 1)
+        self.assertEqual(access_stats.summary()['por_hora'][-1]['negados'], 1)
+        self.client.force_login(User.objects.create_user('staff', password='x'))
+        response = self.client.get(reverse('access_log_list'))
+        self.assertContains(response, 'Total de registros: 1')
+        self.assertEqual([log.uid for log in response.context['page_obj']], ['KEEP'])
+
+    def test_catchup_leaves_the_current_hour_to_record(self):
+        from unittest import mock
+        from .models import AccessHourly
+        from . import access_stats, jobs
+        self._swipe('BAD')
+        AccessHourly.objects.update(total=7)  # stands in for increments racing the rebuild
+        with mock.patch.object(access_stats, 'record'):
+            jobs.access_summary_catchup()
+        self.assertEqual(AccessHourly.objects.get().total, 7)
+
+    def test_json_and_page(self):
+        from django.contrib.auth.models import User
+        self._swipe('BAD')
+        self.client.force_login(User.objects.create_user('staff', password='x'))
+        data = self.client.get(reverse('access_summary'), {'horas': 6, 'dias': 2}).json()
+        self.assertEqual((len(data['por_hora']), len(data['por_dia'])), (6, 2))
+        self.assertEqual(data['por_hora'][-1]['negados'], 1)
+        self.assertContains(self.client.get(reverse('access_log_list')), 'Total de registros: 1')
+
+
+@override_settings(**dict(_test_settings, READING_STORAGE={'brise': 'packed'}))
+class TestPackedStorage(TestCase):
+    def test_pack_roundtrip_keeps_only_reported_channels(self):
+        from . import packed
+        mask, blob = packed.pack(1, {'ds18b20_1': 21.5, 'dht11_1_hum': 55.25, 'wind_2': float('nan')})
+        self.assertEqual((bin(mask).count('1'), len(blob)), (2, 8))
+        values = packed.unpack(1, mask, blob)
+        self.assertEqual((values['ds18b20_1'], values['dht11_1_hum'], values['wind_2']), (21.5, 55.25, None))
+
+    def test_ingest_and_accessors(self):
+        from .models import BrisePackedReading
+        from . import storage
+        payload = _brise_payload(dht11_2_temp=None, dht11_2_hum=None, ds18b20_1=24.5)
+        response = self.client.post(reverse('receive_sensor_data'), data=payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BriseSensorReading.objects.exists())
+
+        reading = BrisePackedReading.objects.get()
+        self.assertEqual((reading.ds18b20_1, reading.dht11_2_temp), (24.5, None))
+        with self.assertRaises(AttributeError):
+            reading.no_such_channel
+        timestamps, columns = storage.series(BrisePackedReading.objects.order_by('timestamp'), ['ds18b20_1', 'dht11_2_hum'])
+        self.assertEqual((len(timestamps), columns), (1, {'ds18b20_1': [24.5], 'dht11_2_hum': [None]}))
+
+
+@override_settings(**_test_settings)
+class TestChartSeries(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from . import dedup, devices
+        cache.clear()
+        dedup.reset()
+        devices.registry.reset()
+        self.client.force_login(User.objects.create_user('viewer', password='x'))
+        for i in range(3):
+            self.client.post(reverse('receive_sensor_data'), content_type='application/json',
+                             data=_brise_payload(seq=i, ds18b20_1=21.5 + i, dht11_1_hum=None if i == 1 else 60.0))
+
+    def test_json_columns(self):
+        response = self.client.get(reverse('chart_series', args=['brise']), {'campos': 'ds18b20_1,dht11_1_hum'})
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['series'], {'ds18b20_1': [21.5, 22.5, 23.5], 'dht11_1_hum': [60.0, None, 60.0]})
+        self.assertTrue(all(isinstance(t, int) for t in data['t']))
+
+    def test_f32_encoding_and_validation(self):
+        import base64
+        import math
+        import struct
+        url = reverse('chart_series', args=['brise'])
+        data = self.client.get(url, {'campos': 'dht11_1_hum', 'formato': 'f32'}).json()
+        values = struct.unpack('<3f', base64.b64decode(data['series']['dht11_1_hum']))
+        self.assertTrue(math.isnan(values[1]))
+        self.assertEqual(len(base64.b64decode(data['t'])), 12)
+        self.assertEqual(self.client.get(url, {'campos': 'seq'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('chart_series', args=['nope'])).status_code, 404)
+
+    def test_dashboard_has_no_inline_values(self):
+        response = self.client.get(reverse('dashboard_project', args=['brise']))
+        self.assertContains(response, reverse('chart_series', args=['brise']))
+        self.assertNotContains(response, '21,5')
+
+
+@override_settings(**_test_settings)
+class TestScheduler(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from . import scheduler
+        self.scheduler = scheduler
+        self.calls = []
+        self.job = scheduler.Job('test_job', lambda: self.calls.append(1), timedelta(minutes=1), timedelta(minutes=5))
+        self.addCleanup(scheduler.registry.pop, 'test_job', None)
+        scheduler.registry['test_job'] = self.job
+        scheduler.sync_rows()
+
+    def test_lease_prevents_double_runs(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import ScheduledJob
+        self.assertTrue(self.scheduler.claim(self.job, 'a'))
+        self.assertFalse(self.scheduler.claim(self.job, 'b'))
+        self.assertTrue(self.scheduler.claim(self.job, 'b', now=timezone.now() + timedelta(minutes=6)))  # lease expired
+        self.assertTrue(self.scheduler.run(self.job, 'b'))
+        self.assertFalse(self.scheduler.claim(self.job, 'a'))  # not due again yet
+
+        row = ScheduledJob.objects.get(name='test_job')
+        self.assertEqual((row.runs, row.failures, row.lease_owner, row.last_ok), (1, 0, '', True))
+        self.assertGreater(row.next_run, timezone.now())
+
+    def test_failures_are_recorded(self):
+        from .models import ScheduledJob
+        failing = self.scheduler.Job('test_job', lambda: 1 / 0, self.job.every, self.job.lease)
+        self.scheduler.claim(failing, 'a')
+        with self.assertLogs('app.scheduler', 'ERROR'):
+            self.assertFalse(self.scheduler.run(failing, 'a'))
+        row = ScheduledJob.objects.get(name='test_job')
+        self.assertEqual((row.failures, row.last_ok), (1, False))
+        self.assertIn('ZeroDivisionError', row.last_error)
+
+    def test_stale_devices_job(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import jobs
+        from .devices import registry
+        registry.reset()
+        BriseSensorReading.objects.create(device_id='quiet', device_ref=registry.resolve('brise', 'quiet'),
+                                          timestamp=timezone.now() - timedelta(hours=2))
+        BriseSensorReading.objects.create(device_id='chatty', device_ref=registry.resolve('brise', 'chatty'))
+        with self.assertLogs('app.jobs', 'WARNING'):
+            self.assertEqual(jobs.detect_stale_devices()['brise'], 1)
+        self.assertEqual(list(jobs.stale_devices()['brise']), ['quiet'])
+
+    def test_command_runs_a_job(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('run_scheduler', run='test_job', stdout=StringIO())
+        out = StringIO()
+        call_command('run_scheduler', list=True, stdout=out)
+        self.assertEqual(self.calls, [1])
+        self.assertIn('access_summary_catchup', out.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS={'default': ['default_replica1']}, REPLICA_MAX_LAG_SECONDS=10)
+class TestReadReplicas(SimpleTestCase):
+    def setUp(self):
+        from unittest import mock
+        from django.db import connections
+        from . import dbrouters
+        self.dbrouters = dbrouters
+        patcher = mock.patch.dict(connections.databases, {'default_replica1': connections.databases['default']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(dbrouters.lag_monitor.lags.clear)
+        self.addCleanup(dbrouters.reset_stickiness)
+        dbrouters.reset_stickiness()
+
+    def test_reads_use_replica_until_the_request_writes(self):
+        from django.db import router
+        from .models import CartaoRFID
+        self.assertEqual(router.db_for_read(SensorReading), 'default_replica1')
+        self.assertEqual(router.db_for_read(CartaoRFID), 'default')
+        self.assertEqual(router.db_for_write(SensorReading), 'default')
+        self.assertEqual(router.db_for_read(SensorReading), 'default')
+        self.dbrouters.reset_stickiness()  # next request
+        self.assertEqual(router.db_for_read(SensorReading), 'default_replica1')
+        self.assertFalse(router.allow_migrate('default_replica1', 'app', model_name='sensorreading'))
+
+    def test_lagging_replica_is_skipped(self):
+        import time
+        from django.db import router
+        self.dbrouters.lag_monitor.lags['default_replica1'] = (time.monotonic(), 60.0)
+        self.assertEqual(router.db_for_read(SensorReading), 'default')
+
+    def test_sticky_cookie_after_a_write(self):
+        from django.db import router
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .middleware import STICKY_COOKIE, ReplicaStickinessMiddleware
+
+        def writing_view(request):
+            router.db_for_write(SensorReading)
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(writing_view)(RequestFactory().post('/'))
+        self.assertEqual(response.cookies[STICKY_COOKIE].value, 'default')
+
+        self.dbrouters.reset_stickiness()
+        request = RequestFactory().get('/', HTTP_COOKIE=f'{STICKY_COOKIE}=default')
+        reads = []
+        ReplicaStickinessMiddleware(lambda r: reads.append(router.db_for_read(SensorReading)) or HttpResponse())(request)
+        self.assertEqual(reads, ['default'])
+
+
+@override_settings(**_test_settings)
+class TestDeviceRegistry(TestCase):
+    def setUp(self):
+        from . import dedup, devices
+        dedup.reset()
+        devices.registry.reset()
+        self.registry = devices.registry
+
+    def test_ingest_registers_device_once(self):
+        from .models import Device
+        url = reverse('receive_sensor_data')
+        for seq in range(3):
+            self.client.post(url, data=_brise_payload(device_id='esp_reg', seq=seq), content_type='application/json')
+        device = Device.objects.get()
+        self.assertEqual((device.monitoring, device.device_id, device.intervalo_esperado), ('brise', 'esp_reg', 30))
+        self.assertEqual(set(BriseSensorReading.objects.values_list('device_ref', flat=True)), {device.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.resolve('brise', 'esp_reg'), device.pk)
+        self.assertNotEqual(self.registry.resolve('pavimentos', 'esp_reg'), device.pk)
+
+    def test_cache_is_bounded(self):
+        from .devices import DeviceRegistry
+        registry = DeviceRegistry(max_devices=2)
+        refs = [registry.resolve('brise', f'esp_{i}') for i in range(3)]
+        self.assertEqual(len(registry._ids), 2)
+        # the evicted device is found again, not registered twice
+        self.assertEqual(registry.resolve('brise', 'esp_0'), refs[0])
+
+    def test_invalid_device_id_is_rejected(self):
+        from .models import Device
+        url = reverse('receive_sensor_data')
+        for device_id in ('x' * 51, 12345, ['esp']):
+            response = self.client.post(url, data=_brise_payload(device_id=device_id), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Device.objects.exists())
+        self.assertFalse(BriseSensorReading.objects.exists())
+
+    def test_backfill_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Device
+        for i in range(5):
+            BriseSensorReading.objects.create(device_id=f'old_{i % 2}')
+        BriseSensorReading.objects.create(device_id=None)
+        call_command('backfill_device_refs', batch_size=2, stdout=StringIO())
+        refs = dict(Device.objects.values_list('device_id', 'pk'))
+        for device_id, ref in BriseSensorReading.objects.values_list('device_id', 'device_ref'):
+            self.assertEqual(ref, refs.get(device_id))
+
+    def test_seq_is_unique_per_device_ref(self):
+        from django.db import IntegrityError, transaction
+        ref = 2 ** 40  # beyond a 32-bit column
+        BriseSensorReading.objects.create(device_id='esp_a', device_ref=ref, seq=1)
+        BriseSensorReading.objects.create(device_id='esp_a', device_ref=ref + 1, seq=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BriseSensorReading.objects.create(device_id='esp_a_renamed', device_ref=ref, seq=1)
+        self.assertEqual(BriseSensorReading.objects.get(device_ref=ref).device_ref, ref)
+
+
+@override_settings(**dict(_test_settings, PAGE_CACHE_ENABLED=False))
+class TestReadPathBudgets(TestCase):
+    """Query budgets of app.read_budgets on a small seed; latency budgets are checked only at scale,
+    by scripts/bench_read_paths.py (wall-clock timings would make this test flaky)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from io import StringIO
+        from django.core.management import call_command
+        from . import devices
+        devices.registry.reset()
+        call_command('seed_data', readings=300, devices=3, days=1, cards=20, access_logs=300, stdout=StringIO())
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from . import devices
+        cache.clear()
+        devices.registry.reset()
+        self.client.force_login(User.objects.create_user('viewer', password='x'))
+
+    def test_pages_within_budget(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .read_budgets import READ_PATHS
+        for page in READ_PATHS:
+            with self.subTest(page.name), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(page.path)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(queries), page.max_queries, '\n'.join(q['sql'] for q in queries))
+
+    def test_chart_buckets_large_windows(self):
+        from .models import PavimentosSensorReading
+        url = reverse('chart_series', args=['pavimentos'])
+        raw = self.client.get(url, {'campos': 'sensor_a'}).json()
+        self.assertEqual(raw['bucket'], 0)
+        self.assertGreater(raw['count'], 290)  # the oldest few fall just outside the 24 h window
+        with self.settings(CHART_MAX_POINTS=10):
+            data = self.client.get(url, {'campos': 'sensor_a'}).json()
+        self.assertLessEqual(data['count'], 11)  # the window's edges may fall into partial buckets
+        self.assertEqual(data['bucket'], 8640)
+        self.assertEqual(data['t'], sorted(data['t']))
+        self.assertTrue(all(t % data['bucket'] == 0 for t in data['t']))
+        values = PavimentosSensorReading.objects.values_list('sensor_a', flat=True)
+        self.assertTrue(min(values) <= min(data['series']['sensor_a']) <= max(data['series']['sensor_a']) <= max(values))
+
+    def test_tail_paginator_matches_offsets(self):
+        from django.core.paginator import Paginator
+        from .pagination import TailPaginator
+        readings = SensorReading.objects.order_by('-timestamp', '-id')
+        plain, tail = Paginator(readings, 45, orphans=30), TailPaginator(readings, 45, orphans=30)
+        self.assertEqual(tail.num_pages, 6)  # the last page takes the 30 orphans
+        for number in tail.page_range:
+            self.assertEqual([r.pk for r in tail.page(number)], [r.pk for r in plain.page(number)])
+
+
+class _SlowLogHandler(logging.Handler):
+    """Log target standing in for a stalled disk (TestStructuredLogging)."""
+
+    def emit(self, record):
+        import time
+        time.sleep(0.05)
+
+
+@override_settings(**_test_settings)
+class TestStructuredLogging(TestCase):
+    def _record(self, msg='boom', exc=None, lineno=1):
+        import sys
+        exc_info = None
+        if exc is not None:
+            try:
+                raise exc
+            except Exception:
+                exc_info = sys.exc_info()
+        return logging.LogRecord('app.api_views', logging.ERROR, __file__, lineno, msg, (), exc_info)
+
+    def test_json_records_carry_request_context(self):
+        import json
+        from . import logs
+        logs.begin(request_id='abc', path='/api/receive/')
+        try:
+            logs.bind(device_id='esp_1')
+            record = self._record(exc=ValueError('bad'))
+            record.duration_ms = 12.5
+            entry = json.loads(logs.JsonFormatter().format(record))
+        finally:
+            logs.clear()
+        self.assertEqual((entry['request_id'], entry['device_id'], entry['duration_ms']), ('abc', 'esp_1', 12.5))
+        self.assertIn('elapsed_ms', entry)
+        self.assertIn('ValueError: bad', entry['exc'])
+        self.assertEqual(logs.context(), {})
+
+    def test_repeated_errors_are_sampled(self):
+        import time
+        from .logs import RepeatedErrorSampler
+        sampler = RepeatedErrorSampler(burst=2, window=0.2)
+        passed = [sampler.filter(self._record(exc=ValueError(str(i)))) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertTrue(sampler.filter(self._record(exc=KeyError('other'))))  # another error, counted apart
+        time.sleep(0.25)
+        record = self._record(exc=ValueError('again'))
+        self.assertTrue(sampler.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_slow_target_never_blocks_the_caller(self):
+        import time
+        from . import metrics
+        from .logs import QueuedHandler
+        metrics.reset()
+        handler = QueuedHandler([{'class': 'app.tests._SlowLogHandler'}], maxsize=3)
+        try:
+            start = time.perf_counter()
+            for i in range(20):
+                handler.handle(self._record(f'record {i}'))
+            self.assertLess(time.perf_counter() - start, 0.05)  # one write alone takes 0.05 s
+            self.assertGreater(metrics.snapshot()['logging.dropped'], 10)
+        finally:
+            handler.close()
+
+    def test_request_id_header(self):
+        url = reverse('receive_sensor_data')
+        response = self.client.get(url, HTTP_X_REQUEST_ID='nginx-req-42')
+        self.assertEqual(response['X-Request-ID'], 'nginx-req-42')
+        generated = self.client.get(url, HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+
+
+class _PickySink:
+    """Sink rejecting any batch with a point of device 'bad' (TestForwarding); records requests."""
+    requests = []
+
+    def __init__(self, name, batch_size=8):
+        self.name, self.batch_size = name, batch_size
+
+    def accepts(self, point):
+        return True
+
+    def send(self, points):
+        type(self).requests.append([p['device_id'] for p in points])
+        if any(p['device_id'] == 'bad' for p in points):
+            raise ValueError('bad point')
+
+
+class _SinkServer:
+    """Local stand-in for ThingSpeak/InfluxDB (TestForwarding): records every request and answers
+    the first ``failures`` with 503. HTTP/1.1, so clients can keep connections alive."""
+
+    def __init__(self, failures=0):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        server = self
+        self.requests = []
+        self.failures = failures
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                server.requests.append({'path': self.path, 'headers': dict(self.headers), 'body': body,
+                                        'client_port': self.client_address[1]})
+                status = 503 if server.failures else 200
+                server.failures = max(0, server.failures - 1)
+                self.send_response(status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@override_settings(**_test_settings)
+class TestForwarding(TestCase):
+    def setUp(self):
+        import tempfile
+        from . import dedup
+        dedup.reset()
+        self.server = _SinkServer()
+        self.addCleanup(self.server.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f'{tmp.name}/readings.jsonl'
+        self.sinks = {
+            'influx': {'class': 'app.forwarding.InfluxLineSink', 'token': 't0k',
+                       'url': f'{self.server.url}/api/v2/write?org=eco&bucket=ecoview&precision=s'},
+            'thingspeak': {'class': 'app.forwarding.ThingSpeakSink', 'url': self.server.url, 'channel_id': 7,
+                           'api_key': 'KEY', 'fields': {'field1': 'dht11_1_hum', 'field3': 'uv_1'}},
+            'file': {'class': 'app.forwarding.FileSink', 'path': self.path},
+        }
+
+    def _post(self, n, start=0, monitoring='brise'):
+        url = reverse('receive_sensor_data')
+        for i in range(start, start + n):
+            payload = _brise_payload(device_id='esp,fwd', seq=i) if monitoring == 'brise' else \
+                {'device_id': 'esp_default', 'seq': i, **{f'sensor{k}': float(k) for k in range(1, 15)}}
+            self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 200)
+
+    def test_nothing_is_queued_without_sinks(self):
+        from .models import OutboxEntry
+        self._post(2)
+        self.assertEqual(OutboxEntry.objects.count(), 0)
+
+    def test_readings_are_forwarded_in_batches(self):
+        import json
+        from django.db.models import Count
+        from . import forwarding
+        from .models import OutboxEntry
+        with self.settings(FORWARDING_SINKS=self.sinks):
+            self._post(3)
+            self._post(1, monitoring='default')
+            counts = dict(OutboxEntry.objects.values_list('sink').annotate(n=Count('pk')))
+            self.assertEqual(counts, {'influx': 4, 'thingspeak': 3, 'file': 4})
+            self.assertEqual(forwarding.flush(), {'influx': 4, 'thingspeak': 3, 'file': 4})
+            self.assertFalse(OutboxEntry.objects.exists())
+
+            influx, thingspeak = self.server.requests
+            self.assertEqual(influx['headers']['Authorization'], 'Token t0k')
+            lines = influx['body'].decode().splitlines()
+            self.assertEqual(len(lines), 4)
+            self.assertTrue(lines[0].startswith('ecoview,monitoring=brise,device_id=esp\\,fwd ds18b20_1=24.1,'))
+            self.assertEqual(thingspeak['path'], '/channels/7/bulk_update.json')
+            body = json.loads(thingspeak['body'])
+            self.assertEqual(body['write_api_key'], 'KEY')
+            self.assertEqual([set(u) for u in body['updates']], [{'created_at', 'field1', 'field3'}] * 3)
+            self.assertEqual(body['updates'][0]['field1'], 55.1)
+            with open(self.path) as f:
+                self.assertEqual(len(f.readlines()), 4)
+
+            self._post(2, start=3)
+            forwarding.flush()
+            again = [r for r in self.server.requests[2:] if r['path'].startswith('/api/v2')]
+            self.assertEqual(again[0]['client_port'], influx['client_port'])  # same keep-alive connection
+            self.assertEqual(forwarding.sinks()['influx'].http.opened, 1)
+
+    def test_reading_is_not_stored_without_its_outbox_rows(self):
+        from unittest import mock
+        from . import forwarding
+        with self.settings(FORWARDING_SINKS=self.sinks), \
+                mock.patch.object(forwarding.OutboxEntry.objects, 'bulk_create', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('app.api_views', 'ERROR'):
+            response = self.client.post(reverse('receive_sensor_data'), _brise_payload(device_id='esp_fwd', seq=1),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(BriseSensorReading.objects.exists())
+
+    def test_bad_entry_is_isolated_from_its_batch(self):
+        from . import forwarding
+        from .models import OutboxEntry
+        _PickySink.requests = []
+        points = [{'monitoring': 'brise', 'device_id': 'bad' if i == 5 else f'esp_{i}',
+                   'timestamp': '2026-01-01T00:00:00+00:00', 'fields': {'uv_1': 0.1}} for i in range(10)]
+        with self.settings(FORWARDING_SINKS={'picky': {'class': 'app.tests._PickySink'}}):
+            forwarding.enqueue(points)
+            with self.assertLogs('app.forwarding', 'WARNING'):
+                self.assertEqual(forwarding.flush(), {'picky': 9})  # the second batch is sent too
+        bad = OutboxEntry.objects.get()
+        self.assertEqual((bad.payload['device_id'], bad.attempts), ('bad', 1))
+        self.assertLessEqual(len(_PickySink.requests), 8)
+
+    def test_non_finite_values_are_not_forwarded(self):
+        from . import forwarding
+        reading = BriseSensorReading(device_id='esp', uv_1=float('nan'), uv_2=float('inf'), wind_1=1.5)
+        fields = forwarding.point(reading, 'brise')['fields']
+        self.assertEqual(fields, {'wind_1': 1.5})
+
+    def test_failed_batch_backs_off_then_parks(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import forwarding
+        from .models import OutboxEntry
+        self.server.failures = 3  # the batch and both of its halves
+        sinks = {'influx': self.sinks['influx']}
+        with self.settings(FORWARDING_SINKS=sinks, FORWARDING_RETRY_SECONDS=60, FORWARDING_MAX_ATTEMPTS=3):
+            self._post(2)
+            with self.assertLogs('app.forwarding', 'WARNING'):
+                self.assertEqual(forwarding.flush(), {'influx': 0})
+            entry = OutboxEntry.objects.first()
+            self.assertEqual(entry.attempts, 1)
+            self.assertIn('HTTP 503', entry.last_error)
+            self.assertGreater(entry.next_attempt, timezone.now() + timedelta(seconds=45))
+            self.assertEqual(forwarding.flush(), {'influx': 0})  # not due yet: nothing sent
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual(forwarding.flush(now=timezone.now() + timedelta(minutes=2)), {'influx': 2})
+
+            self.server.failures = 5
+            self._post(1, start=2)
+            later = timezone.now()
+            with self.assertLogs('app.forwarding', 'WARNING') as logged:
+                for _ in range(3):
+                    later += timedelta(hours=2)
+                    forwarding.flush(now=later)
+            self.assertIn('parked', logged.output[-1])
+            self.assertIsNone(OutboxEntry.objects.get().next_attempt)
+            self.assertEqual(forwarding.retry_parked(), 1)
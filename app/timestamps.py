@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .versions import key_part
+
+# Epoch values above this are milliseconds (1e12 ms is 2001-09-09)
+_EPOCH_MS_THRESHOLD = 10 ** 12
+# Weight of a new observation in the per-device clock offset estimate
+SKEW_SMOOTHING = 0.2
+# Devices whose offsets this worker remembers (least recently used dropped first), as in app.dedup
+MAX_DEVICES = 10000
+# An offset nobody refreshed for this long is forgotten (the device is gone or reflashed)
+SKEW_TIMEOUT = 30 * 24 * 3600
+
+
+class TimestampError(ValueError):
+    pass
+
+
+def parse_device_ts(value):
+    """Parse epoch seconds, epoch milliseconds or an ISO 8601 string into an aware datetime (UTC)."""
+    if isinstance(value, bool):
+        raise TimestampError('timestamp must be epoch seconds/milliseconds or ISO 8601')
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value >= _EPOCH_MS_THRESHOLD else value
+        try:
+            return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise TimestampError('timestamp out of range')
+    if isinstance(value, str):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise TimestampError('timestamp must be epoch seconds/milliseconds or ISO 8601')
+        if timezone.is_naive(parsed):
+            # devices without a timezone send UTC
+            parsed = parsed.replace(tzinfo=dt_timezone.utc)
+        return parsed
+    raise TimestampError('timestamp must be epoch seconds/milliseconds or ISO 8601')
+
+
+class ClockSkew:
+    """Per-device estimate of ``server clock - device clock``.
+
+    Updated whenever a payload carries ``device_now`` (the device clock when the POST was
+    sent) and applied to every ``sample_ts`` of that device, including buffered readings
+    flushed later without ``device_now``. The estimate lives in the Django cache, so a
+    buffered reading landing on another worker gets the same correction; each worker keeps
+    the last ``MAX_DEVICES`` it saw as a fallback for when the cache lost it.
+    """
+
+    def __init__(self, max_devices=MAX_DEVICES):
+        self.max_devices = max_devices
+        self._offsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(device_key):
+        return f'skew:{key_part(device_key)}'
+
+    def _remember(self, device_key, offset):
+        with self._lock:
+            self._offsets[device_key] = offset
+            self._offsets.move_to_end(device_key)
+            while len(self._offsets) > self.max_devices:
+                self._offsets.popitem(last=False)
+
+    def observe(self, device_key, device_now, server_now):
+        offset = (server_now - device_now).total_seconds()
+        previous = self.offset(device_key, default=None)
+        if previous is not None:
+            offset = previous + SKEW_SMOOTHING * (offset - previous)
+        cache.set(self._key(device_key), offset, SKEW_TIMEOUT)
+        self._remember(device_key, offset)
+        return offset
+
+    def offset(self, device_key, default=0.0):
+        shared = cache.get(self._key(device_key))
+        if shared is not None:
+            self._remember(device_key, shared)
+            return shared
+        with self._lock:
+            return self._offsets.get(device_key, default)
+
+    def reset(self):
+        with self._lock:
+            self._offsets.clear()
+
+
+skew = ClockSkew()
+
+
+def resolve_timestamp(device_key, sample_ts=None, device_now=None, now=None):
+    """Return the timestamp to store for a reading.
+
+    Without ``sample_ts`` this is the server time. Otherwise the device time is corrected by
+    the device's clock offset, capped at the server time (clocks ahead of us are not trusted)
+    and rejected when older than ``INGEST_MAX_BACKFILL_DAYS``.
+    """
+    now = now or timezone.now()
+    if device_now is not None:
+        skew.observe(device_key, parse_device_ts(device_now), now)
+    if sample_ts is None:
+        return now
+    ts = parse_device_ts(sample_ts) + timedelta(seconds=skew.offset(device_key))
+    if ts > now:
+        return now
+    max_age = timedelta(days=getattr(settings, 'INGEST_MAX_BACKFILL_DAYS', 30))
+    if now - ts > max_age:
+        raise TimestampError(f'timestamp is older than {max_age.days} days')
+    return ts
@@ -8,6 +8,8 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('table/', views.data_table, name='data_table'),
     path('api/latest/', views.latest_sensor_data, name='latest_sensor_data'),
+    path('api/metrics/', views.worker_metrics, name='worker_metrics'),
+    path('api/ingest_metrics/', views.ingest_metrics, name='ingest_metrics'),
     path('dashboards/', views.select_dashboard, name='select_dashboard'),
     path('dashboard/<str:project>/', views.dashboard_project, name='dashboard_project'),
     path('tables/', views.select_table, name='select_table'),
@@ -17,5 +19,9 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('api/verifica_cartao/', views.verifica_cartao, name='verifica_cartao'),
     path('acessos/', views.access_log_list, name='access_log_list'),
+    path('api/series/<str:monitoring>/', views.chart_series, name='chart_series'),
+    path('api/versao/<str:monitoring>/', views.data_version, name='data_version'),
+    path('api/acessos/resumo/', views.access_summary, name='access_summary'),
     path('cartoes/cadastrar/', views.cadastrar_cartao, name='cadastrar_cartao'),
+    path('cartoes/importar/', views.importar_cartoes, name='importar_cartoes'),
 ]
\ No newline at end of file
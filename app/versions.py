@@ -0,0 +1,98 @@
+"""Data versions: monotonically increasing counters in the Django cache, shared by all workers.
+
+A scope is a tuple such as ``('data', 'brise')`` or ``('data', 'brise', 'esp_3')``; every
+ingest bumps the device's and the monitoring's data version, so anything derived from
+readings (rendered pages, chart series, in-process memos) can tell it is stale with one
+cache read instead of guessing a TTL. Other subsystems use their own scopes (``('cards',)``).
+
+Counters start from the clock, so an evicted counter never goes back to a value a reader
+has already seen: a missing key only ever looks like a change.
+"""
+import hashlib
+import re
+import time
+
+from django.core.cache import cache
+
+_SAFE = re.compile(r'^[\w.-]{1,64}$')
+
+
+def key_part(value):
+    """``value`` as a cache key component; device ids come from the payload, so anything that
+    isn't short and plain is hashed (keys stay valid for every backend, memcached included)."""
+    value = str(value)
+    return value if _SAFE.match(value) else hashlib.md5(value.encode()).hexdigest()
+
+
+def key(*scope):
+    return 'version:' + ':'.join(key_part(part) for part in scope)
+
+
+def current(*scope):
+    """Current version of ``scope``."""
+    k = key(*scope)
+    value = cache.get(k)
+    if value is None:
+        value = time.time_ns()
+        if not cache.add(k, value, None):
+            value = cache.get(k, value)
+    return value
+
+
+def current_many(scopes):
+    """Versions of several scopes (one cache round-trip when they all exist), in order."""
+    keys = [key(*scope) for scope in scopes]
+    found = cache.get_many(keys)
+    return tuple(found[k] if k in found else current(*scope) for k, scope in zip(keys, scopes))
+
+
+def bump(*scope):
+    """Mark ``scope`` as changed; returns its new version."""
+    try:
+        return cache.incr(key(*scope))
+    except ValueError:
+        return current(*scope)
+
+
+def data_scope(monitoring, device_id=None):
+    """Scope of ``monitoring`` data, or of one device's data only when ``device_id`` is given."""
+    return ('data', monitoring) if device_id is None else ('data', monitoring, device_id)
+
+
+def data_version(monitoring, device_id=None):
+    return current(*data_scope(monitoring, device_id))
+
+
+def data_changed(monitoring, device_id=None):
+    """Called after a reading of ``monitoring`` (from ``device_id``) is stored."""
+    if device_id is not None:
+        bump('data', monitoring, device_id)
+    return bump('data', monitoring)
+
+
+class Subscription:
+    """Staleness check against one or more scopes.
+
+    ``changed()`` is True on the first call and after any of the scopes was bumped since the
+    previous call; ``token`` is the versions last seen (usable in cache keys / ETags)::
+
+        charts = versions.subscribe('brise', 'esp_3')
+        if charts.changed():
+            rebuild()
+    """
+
+    def __init__(self, *scopes):
+        self.scopes = scopes
+        self.token = None
+
+    def changed(self):
+        token = current_many(self.scopes)
+        if token == self.token:
+            return False
+        self.token = token
+        return True
+
+
+def subscribe(monitoring, device_id=None):
+    """Subscription to ``monitoring`` data (of one device only when ``device_id`` is given)."""
+    return Subscription(data_scope(monitoring, device_id))
@@ -1,31 +1,33 @@
-import json
-import traceback
 from datetime import timedelta
 import logging
-import sys
+import os
 
-from django import forms
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
 from django.core.validators import validate_email
 from django.db.models import Avg, Max, Min
-from django.db.utils import ConnectionDoesNotExist
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
 from django.views.decorators.http import require_GET
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
-from django.views.decorators.csrf import csrf_exempt
 
 from config import settings
-from django.conf import settings as django_settings
-from .models import *
+from .forms import CartaoImportForm, CartaoRFIDForm, LoginForm, RegisterForm
+from .models import AccessLog, SensorReading
+from . import access_stats, cards, charts, devices, metrics, versions
+from .pagecache import PROJECT_MONITORING, cached_page
+from .pagination import TailPaginator
+# Device endpoints live in api_views (no forms/auth/templates) so the ingest entry point stays
+# slim; re-exported here for app.urls and existing imports.
+from .api_views import ingest_metrics, latest_sensor_data, receive_sensor_data, verifica_cartao  # noqa: F401
 
 
+@method_decorator(cached_page(), name='get')
 class HomeView(LoginRequiredMixin, TemplateView):
     template_name = 'home.html'
     login_url = 'login'
@@ -49,136 +51,14 @@ class HomeView(LoginRequiredMixin, TemplateView):
         return render(request, self.template_name, context)
 
 
-@csrf_exempt
-def receive_sensor_data(request):
-    """
-    API endpoint to receive sensor data from ESP32 devices.
-    Payload must include a 'monitoring' field indicating target (e.g. 'brise' or 'pavimentos').
-
-    For 'brise' monitoring it accepts named keys (ds18b20_1..6, dht11_1_temp/hum, uv_1..2, wind_1..2)
-    or the generic sensor1..sensor14 mapping. The function will store readings in the appropriate DB via router.
-    """
-    if request.method != 'POST':
-        return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed'}, status=405)
-
-    try:
-        try:
-            data = json.loads(request.body.decode('utf-8'))
-        except json.JSONDecodeError:
-            return JsonResponse({'status': 'error', 'message': 'Invalid JSON format'}, status=400)
-
-        monitoring = data.get('monitoring', 'default').lower()
-        device_id = data.get('device_id')
-        if not device_id:
-            return JsonResponse({'status': 'error', 'message': 'Missing required field: device_id'}, status=400)
-
-        battery_level = data.get('battery')
-        if battery_level is not None:
-            try:
-                battery_level = float(battery_level)
-            except (ValueError, TypeError):
-                return JsonResponse({'status': 'error', 'message': 'Battery must be a number between 0 and 100'}, status=400)
-            if not 0 <= battery_level <= 100:
-                return JsonResponse({'status': 'error', 'message': 'Battery level must be between 0 and 100'}, status=400)
-
-        # Route to specific model based on monitoring
-        if monitoring == 'brise':
-            # expected named keys mapping for brise
-            expected = ['ds18b20_1','ds18b20_2','ds18b20_3','ds18b20_4','ds18b20_5','ds18b20_6',
-                        'dht11_1_temp','dht11_1_hum','dht11_2_temp','dht11_2_hum',
-                        'uv_1','uv_2','wind_1','wind_2']
-            # accept either named or generic sensor1..sensor14
-            if all(k in data for k in [f'sensor{i}' for i in range(1,15)]):
-                # generic -> map sensor1..sensor14 to brise fields
-                try:
-                    vals = [float(data[f'sensor{i}']) for i in range(1,15)]
-                except (ValueError, TypeError):
-                    return JsonResponse({'status':'error','message':'All sensor values must be numbers'}, status=400)
-                brise_kwargs = {
-                    'ds18b20_1': vals[0], 'ds18b20_2': vals[1], 'ds18b20_3': vals[2], 'ds18b20_4': vals[3], 'ds18b20_5': vals[4], 'ds18b20_6': vals[5],
-                    'dht11_1_temp': vals[6], 'dht11_1_hum': vals[8], 'dht11_2_temp': vals[7], 'dht11_2_hum': vals[9],
-                    'uv_1': vals[10], 'uv_2': vals[11], 'wind_1': vals[12], 'wind_2': vals[13]
-                }
-            else:
-                # named
-                missing = [k for k in expected if k not in data]
-                if missing:
-                    return JsonResponse({'status':'error','message':f'Missing fields for brise: {", ".join(missing)}'}, status=400)
-                try:
-                    brise_kwargs = {k: float(data[k]) for k in expected}
-                except (ValueError, TypeError) as e:
-                    return JsonResponse({'status':'error','message':'Invalid numeric value in payload'}, status=400)
-
-            brise_kwargs.update({'device_id': device_id, 'battery_level': battery_level})
-            reading = BriseSensorReading(**brise_kwargs)
-            # Determine which DB alias to use; fall back to default if not configured
-            target_db = 'brise' if ('brise' in getattr(django_settings, 'DATABASES', {}) or 'brise' in getattr(settings, 'DATABASES', {})) else 'default'
-            try:
-                reading.save(using=target_db)
-            except ConnectionDoesNotExist:
-                # fallback to default if the target alias isn't available at runtime
-                reading.save(using='default')
-            return JsonResponse({'status':'success','message':'Brise data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
-
-        elif monitoring == 'pavimentos':
-            # simple example for pavimentos: expect sensor_a and sensor_b or sensor1/2
-            if 'sensor_a' in data and 'sensor_b' in data:
-                try:
-                    a = float(data['sensor_a'])
-                    b = float(data['sensor_b'])
-                except (ValueError, TypeError):
-                    return JsonResponse({'status':'error','message':'Invalid numeric value for pavimentos'}, status=400)
-                reading = PavimentosSensorReading(sensor_a=a, sensor_b=b, device_id=device_id, battery_level=battery_level)
-                target_db = 'pavimentos' if ('pavimentos' in getattr(django_settings, 'DATABASES', {}) or 'pavimentos' in getattr(settings, 'DATABASES', {})) else 'default'
-                try:
-                    reading.save(using=target_db)
-                except ConnectionDoesNotExist:
-                    reading.save(using='default')
-                return JsonResponse({'status':'success','message':'Pavimentos data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
-            elif all(k in data for k in ['sensor1','sensor2']):
-                try:
-                    a = float(data['sensor1'])
-                    b = float(data['sensor2'])
-                except (ValueError, TypeError):
-                    return JsonResponse({'status':'error','message':'Invalid numeric value for pavimentos'}, status=400)
-                reading = PavimentosSensorReading(sensor_a=a, sensor_b=b, device_id=device_id, battery_level=battery_level)
-                target_db = 'pavimentos' if ('pavimentos' in getattr(django_settings, 'DATABASES', {}) or 'pavimentos' in getattr(settings, 'DATABASES', {})) else 'default'
-                try:
-                    reading.save(using=target_db)
-                except ConnectionDoesNotExist:
-                    reading.save(using='default')
-                return JsonResponse({'status':'success','message':'Pavimentos data saved','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
-            else:
-                return JsonResponse({'status':'error','message':'Missing fields for pavimentos'}, status=400)
-
-        else:
-            # fallback: store in legacy SensorReading if sensor1..sensor14 are provided
-            generic_keys = [f'sensor{i}' for i in range(1, 15)]
-            if not all(k in data for k in generic_keys):
-                return JsonResponse({'status':'error','message':'Missing generic sensor fields for default storage'}, status=400)
-            try:
-                sensor_vals = {f'sensor{i}': float(data[f'sensor{i}']) for i in range(1,15)}
-            except (ValueError, TypeError):
-                return JsonResponse({'status':'error','message':'All sensor values must be numbers'}, status=400)
-            reading = SensorReading(timestamp=timezone.now(), device_id=device_id, battery_level=battery_level, **sensor_vals)
-            target_db = 'default'
-            try:
-                reading.save(using=target_db)
-            except ConnectionDoesNotExist:
-                reading.save(using='default')
-            return JsonResponse({'status':'success','message':'Data saved to default sensorreading','id': reading.id, 'timestamp': reading.timestamp.isoformat()})
-
-    except Exception as e:
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error processing sensor data: {str(e)}", exc_info=True)
-        return JsonResponse({'status': 'error', 'message': 'Internal server error'}, status=500)
-
-
 def custom_error_view(request, exception=None):
     """
     Custom error view that shows detailed technical information for debugging,
     while maintaining a user-friendly interface.
     """
+    import sys
+    import traceback
+
     # Get exception information
     exc_type, exc_value, exc_traceback = sys.exc_info()
     error_traceback = traceback.format_exception(exc_type, exc_value, exc_traceback)
@@ -207,21 +87,23 @@ def custom_error_view(request, exception=None):
     context['status_code'] = status_code
 
     # Log the error
+    # the traceback goes in the record's 'exc' field (app.logs), formatted once and written off-thread
     logger = logging.getLogger(__name__)
-    logger.error(f"Error {status_code} at {request.path}\nType: {context['error_type']}\nMessage: {context['error_message']}\nTraceback:\n{''.join(error_traceback)}")
+    logger.error('Error %s at %s: %s: %s', status_code, request.path, context['error_type'], context['error_message'],
+                 exc_info=(exc_type, exc_value, exc_traceback) if exc_type else None)
 
     return render(request, 'error.html', context, status=status_code)
 
 
+@login_required(login_url='login')
 @require_GET
-def latest_sensor_data(request):
-    latest = SensorReading.objects.order_by('-timestamp').first()
-    if not latest:
-        return JsonResponse({'error': 'No data available'}, status=404)
-    return JsonResponse({'sensor1': latest.sensor1, 'sensor2': latest.sensor2, 'timestamp': latest.timestamp.strftime('%H:%M'), 'battery': latest.battery_level})
+def worker_metrics(request):
+    """Counters of the worker that served the request (rate limiting, etc.)."""
+    return JsonResponse({'pid': os.getpid(), 'counters': metrics.snapshot()})
 
 
 @login_required(login_url='login')
+@cached_page('default')
 def dashboard(request):
     """
     Dashboard view showing charts and summary of last 24 hours
@@ -234,12 +116,12 @@ def dashboard(request):
         # Safely get the last reading (may be None)
         last_reading = readings.last()
 
-        # Compute aggregates once
-        agg = readings.aggregate(
+        # Compute aggregates once (all None without readings, no separate exists() query)
+        agg = readings.order_by().aggregate(
             temp_avg=Avg('sensor1'), temp_max=Max('sensor1'), temp_min=Min('sensor1'),
             hum_avg=Avg('sensor7'), hum_max=Max('sensor7'), hum_min=Min('sensor7'),
             batt_avg=Avg('battery_level'), batt_min=Min('battery_level')
-        ) if readings.exists() else {}
+        )
 
         # Build summary using safe access
         summary = {
@@ -263,7 +145,9 @@ def dashboard(request):
         }
 
         context = {
-            'readings': readings,
+            'last_reading': last_reading,
+            'chart_monitoring': 'default',
+            'chart_fields': ','.join(charts.DEFAULT_FIELDS['default']),
             'summary': summary,
             'sensor_names': {1: "Temperatura Externa 1", 2: "Temperatura Externa 2", 3: "Temperatura Solo 1", 4: "Temperatura Solo 2", 5: "Temperatura Ar 1", 6: "Temperatura Ar 2", 7: "Umidade Ar 1", 8: "Umidade Ar 2", 9: "Umidade Solo", 10: "Radiação UV 1", 11: "Radiação UV 2", 12: "Velocidade Vento 1", 13: "Velocidade Vento 2"},
             'units': {1: "°C", 2: "°C", 3: "°C", 4: "°C", 5: "°C", 6: "°C", 7: "%", 8: "%", 9: "%", 10: "UV", 11: "UV", 12: "m/s", 13: "m/s"}
@@ -273,24 +157,33 @@ def dashboard(request):
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Error in dashboard view: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {'error': str(e)})
+        # a 500, so the page cache and browsers don't keep the error page
+        return render(request, 'error.html', {'error': str(e)}, status=500)
 
 
 # Protected selection pages (replace lambdas in urls)
 @login_required(login_url='login')
+@cached_page()
 def select_dashboard(request):
     return render(request, 'select_dashboard.html')
 
 
 @login_required(login_url='login')
+@cached_page()
 def select_table(request):
     return render(request, 'select_table.html')
 
 
 @login_required(login_url='login')
+@cached_page(lambda project: PROJECT_MONITORING.get(project, project))
 def dashboard_project(request, project):
     # Exemplo simples, ajuste conforme sua lógica
-    return render(request, 'dashboard.html', {'project': project})
+    monitoring = PROJECT_MONITORING.get(project, project)
+    return render(request, 'dashboard.html', {
+        'project': project,
+        'chart_monitoring': monitoring,
+        'chart_fields': ','.join(charts.DEFAULT_FIELDS.get(monitoring, ())),
+    })
 
 
 @login_required(login_url='login')
@@ -305,8 +198,8 @@ def data_table(request):
     View showing paginated table with all sensor readings
     """
     try:
-        all_readings = SensorReading.objects.all().order_by('-timestamp')
-        paginator = Paginator(all_readings, 50)
+        all_readings = SensorReading.objects.all().order_by('-timestamp', '-id')
+        paginator = TailPaginator(all_readings, 50)
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
 
@@ -320,23 +213,77 @@ def data_table(request):
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Error in data_table view: {str(e)}", exc_info=True)
-        return render(request, 'error.html', {'error': str(e)})
+        return render(request, 'error.html', {'error': str(e)}, status=500)
 
 
 @login_required(login_url='login')
 def access_log_list(request):
-    logs = AccessLog.objects.select_related('cartao').order_by('-timestamp')
-    paginator = Paginator(logs, 30)
+    logs = AccessLog.objects.select_related('cartao').order_by('-timestamp', '-id')
+    paginator = TailPaginator(logs, 30)
+    # COUNT(*) over the whole log is a full scan; the hourly summary has the same number
+    total = access_stats.total_logged()
+    paginator.count = logs.count() if total is None else total
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    return render(request, 'access_log_list.html', {'page_obj': page_obj})
+    return render(request, 'access_log_list.html', {'page_obj': page_obj, 'summary': access_stats.summary()})
+
+
+def _int_param(request, name, default, maximum):
+    try:
+        return min(max(int(request.GET.get(name, default)), 1), maximum)
+    except ValueError:
+        return default
+
+
+@login_required(login_url='login')
+@require_GET
+def access_summary(request):
+    """Access analytics as JSON: ?horas= (hourly buckets), ?dias= (daily totals), ?limite= (rows per list)."""
+    return JsonResponse(access_stats.summary(
+        hours=_int_param(request, 'horas', 24, 24 * 31),
+        days=_int_param(request, 'dias', 14, 366),
+        limit=_int_param(request, 'limite', 20, 500),
+    ))
 
 
-class CartaoRFIDForm(forms.ModelForm):
-    class Meta:
-        model = CartaoRFID
-        fields = ['uid', 'nome', 'nome_pessoa', 'email', 'funcao', 'matricula']
-        labels = {'uid': 'UID do Cartão', 'nome': 'Nome do Cartão (opcional)', 'nome_pessoa': 'Nome da Pessoa', 'email': 'E-mail', 'funcao': 'Função', 'matricula': 'Matrícula'}
+@login_required(login_url='login')
+@require_GET
+@cached_page(lambda monitoring: monitoring, device_param='dispositivo')
+def chart_series(request, monitoring):
+    """Columnar chart data of one monitoring: ?campos=a,b (fields), ?horas= (window),
+    ?dispositivo= (device_id), ?formato=json|f32 (see app.charts). Windows with more than
+    CHART_MAX_POINTS readings come back as averages per ``bucket`` seconds."""
+    model = charts.model_for(monitoring)
+    if model is None:
+        return JsonResponse({'error': f'Unknown monitoring {monitoring!r}'}, status=404)
+    allowed = charts.chartable_fields(model)
+    fields = [f for f in request.GET.get('campos', '').split(',') if f] or list(charts.DEFAULT_FIELDS[monitoring])
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        return JsonResponse({'error': f'Unknown fields: {", ".join(unknown)}', 'fields': allowed}, status=400)
+    encoding = request.GET.get('formato', 'json')
+    if encoding not in charts.ENCODINGS:
+        return JsonResponse({'error': f'formato must be one of {", ".join(charts.ENCODINGS)}'}, status=400)
+
+    device_ref = None
+    if request.GET.get('dispositivo'):
+        device_ref = devices.registry.lookup(monitoring, request.GET['dispositivo'])
+        if device_ref is None:  # never reported
+            return JsonResponse(charts.encode([], {name: [] for name in fields}, encoding))
+    since = timezone.now() - timedelta(hours=_int_param(request, 'horas', 24, 24 * 31))
+    timestamps, columns, bucket = charts.bounded_series(model, fields, since, device_ref=device_ref)
+    return JsonResponse(charts.encode(timestamps, columns, encoding, bucket=bucket))
+
+
+@login_required(login_url='login')
+@require_GET
+def data_version(request, monitoring):
+    """Current data version of a monitoring (?dispositivo= for one device): pages poll this
+    and refetch their data only when it changed."""
+    device_id = request.GET.get('dispositivo') or None
+    # a string: versions start from time.time_ns(), beyond the integers JS numbers hold exactly
+    return JsonResponse({'monitoring': monitoring, 'dispositivo': device_id,
+                         'versao': str(versions.data_version(monitoring, device_id))})
 
 
 @login_required(login_url='login')
@@ -350,10 +297,16 @@ def cadastrar_cartao(request):
     return render(request, 'cadastrar_cartao.html', {'form': form, 'message': message})
 
 
-#====== LOGIN FORM ======#
-class LoginForm(forms.Form):
-    username = forms.CharField()
-    password = forms.CharField(widget=forms.PasswordInput)
+@login_required(login_url='login')
+def importar_cartoes(request):
+    form = CartaoImportForm(request.POST or None, request.FILES or None)
+    result = error = None
+    if request.method == 'POST' and form.is_valid():
+        try:
+            result = cards.import_cards(form.cleaned_data['arquivo'].file)
+        except (ValidationError, UnicodeDecodeError) as e:
+            error = e.messages[0] if isinstance(e, ValidationError) else 'O arquivo deve estar em UTF-8'
+    return render(request, 'importar_cartoes.html', {'form': form, 'result': result, 'error': error})
 
 
 #====== LOGIN ======#
@@ -383,46 +336,6 @@ def logout_view(request):
     logout(request)
     return redirect('login')
 
-@csrf_exempt  # Para facilitar testes com ESP, ideal usar autenticação depois
-def verifica_cartao(request):
-    if request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            uid = data.get("uid")
-            cartao = CartaoRFID.objects.filter(uid=uid).first()
-            autorizado = cartao is not None
-            # Registra o acesso
-            AccessLog.objects.create(uid=uid, cartao=cartao, autorizado=autorizado)
-            return JsonResponse({"autorizado": autorizado})
-        except Exception as e:
-            return JsonResponse({"erro": str(e)}, status=400)
-    return JsonResponse({"erro": "Método não permitido"}, status=405)
-
-
-def dashboard_project(request, project):
-    # Exemplo simples, ajuste conforme sua lógica
-    return render(request, 'dashboard.html', {'project': project})
-
-
-def data_table_project(request, project):
-    # Exemplo simples, ajuste conforme sua lógica
-    return render(request, 'data_table.html', {'project': project})
-
-
-class RegisterForm(forms.Form):
-    username = forms.CharField(label='Usuário', max_length=150)
-    password = forms.CharField(label='Senha', widget=forms.PasswordInput)
-    first_name = forms.CharField(label='Primeiro Nome', max_length=30)
-    last_name = forms.CharField(label='Sobrenome', max_length=30)
-    email = forms.EmailField(label='E-mail')
-    group = forms.ChoiceField(label='Grupo', choices=[])
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Preenche os grupos disponíveis para seleção
-        self.fields['group'].choices = [(g.id, g.name) for g in Group.objects.all()]
-
-
 def register_view(request):
     form = RegisterForm(request.POST or None)
     message = None
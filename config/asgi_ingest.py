@@ -0,0 +1,13 @@
+"""
+ASGI config for the device-API workers (/api/receive/, /api/verifica_cartao/, /api/latest/).
+
+Same as ``config.asgi`` but with ``config.settings_ingest``.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings_ingest')
+
+application = get_asgi_application()
@@ -1,6 +1,8 @@
 from pathlib import Path
+import json
 import os
 from urllib.parse import urlparse
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,7 +31,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first: everything logged while serving the request carries its request id
+    'app.middleware.RequestContextMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # before sessions/auth: their reads must see this client's recent writes
+    'app.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,9 +66,11 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database configuration: supports DATABASE_URL (postgres) or individual PG_* env vars, falls back to sqlite for local development
 DATABASES = {}
-# Helper to parse a postgres URL
+# Helper to parse a postgres URL (or sqlite:////absolute/path, e.g. for replica file copies)
 def _parse_db_url(url):
     p = urlparse(url)
+    if p.scheme == 'sqlite':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': p.path}
     return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': p.path.lstrip('/'),
@@ -89,7 +97,7 @@ else:
     else:
         DATABASES['default'] = {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
         }
 
 # --- Additional monitoring-specific databases ---
@@ -123,6 +131,134 @@ else:
             'PORT': os.getenv('POSTGRES_PORT_PAVIMENTOS', '5432'),
         }
 
+# --- Read replicas (optional) ---
+# Comma-separated URLs per database: DATABASE_REPLICA_URLS (default), DATABASE_REPLICA_URLS_BRISE,
+# DATABASE_REPLICA_URLS_PAVIMENTOS. They become aliases '<alias>_replica<n>'; MonitoringRouter sends
+# reads there while their lag is under REPLICA_MAX_LAG_SECONDS (checked every REPLICA_LAG_CHECK_SECONDS).
+DATABASE_REPLICAS = {}
+for _alias, _suffix in (('default', ''), ('brise', '_BRISE'), ('pavimentos', '_PAVIMENTOS')):
+    _urls = [u.strip() for u in os.getenv(f'DATABASE_REPLICA_URLS{_suffix}', '').split(',') if u.strip()]
+    if _urls and _alias not in DATABASES:
+        raise ImproperlyConfigured(f'DATABASE_REPLICA_URLS{_suffix} is set but the {_alias!r} database is not configured')
+    for _n, _url in enumerate(_urls, 1):
+        DATABASES[f'{_alias}_replica{_n}'] = dict(_parse_db_url(_url), TEST={'MIRROR': _alias})
+        DATABASE_REPLICAS.setdefault(_alias, []).append(f'{_alias}_replica{_n}')
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '10'))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', '5'))
+
+# --- SQLite performance profile (local / field deployments) ---
+# Applied on every new connection: WAL lets readers run alongside the writer, synchronous=NORMAL
+# only fsyncs at checkpoints, busy_timeout waits for the lock instead of failing with
+# 'database is locked', and BEGIN IMMEDIATE takes the write lock up front so concurrent
+# gunicorn workers queue on it instead of deadlocking on a lock upgrade.
+SQLITE_TUNED = os.getenv('SQLITE_TUNED', 'True').lower() in ('1', 'true', 'yes')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+    f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+    'PRAGMA temp_store=MEMORY',
+]
+if SQLITE_TUNED:
+    for _db in DATABASES.values():
+        if _db['ENGINE'] == 'django.db.backends.sqlite3':
+            _db.setdefault('OPTIONS', {}).update({
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ';'.join(SQLITE_PRAGMAS),
+            })
+
+# Optional single-writer funnel for ingest: readings from all request threads of a worker are
+# handed to one writer thread that commits them in batches (one transaction per batch).
+INGEST_SINGLE_WRITER = os.getenv('INGEST_SINGLE_WRITER', 'False').lower() in ('1', 'true', 'yes')
+INGEST_WRITER_BATCH_SIZE = int(os.getenv('INGEST_WRITER_BATCH_SIZE', '200'))
+INGEST_WRITER_MAX_WAIT_MS = int(os.getenv('INGEST_WRITER_MAX_WAIT_MS', '0'))
+# A request waits this long for the writer's commit, then answers 503 (the reading may still commit)
+INGEST_WRITER_TIMEOUT_SECONDS = float(os.getenv('INGEST_WRITER_TIMEOUT_SECONDS', '30'))
+
+# Cache for the latest-value state, data versions (page/chart staleness), rate-limit buckets and
+# card index versions. Several gunicorn workers (web + ingest) need a shared one:
+# DJANGO_CACHE_URL=memcached://127.0.0.1:11211 (pymemcache) or redis://host:6379/0 (redis-py).
+# Without it the default is still shared by every process of the user running the app: a
+# file-based cache outside the source tree (~/.cache/ecoview), slower than memcached and with a
+# non-atomic incr, but invalidation reaches all workers. DJANGO_CACHE_BACKEND/LOCATION set any
+# other backend; a per-process one (LocMemCache) is reported by the app.W001 deploy check.
+CACHE_URL = os.getenv('DJANGO_CACHE_URL', '')
+_cache_url = urlparse(CACHE_URL)
+if _cache_url.scheme == 'memcached':
+    _cache = {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': _cache_url.netloc}
+elif _cache_url.scheme in ('redis', 'rediss'):
+    _cache = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}
+elif CACHE_URL:
+    raise ImproperlyConfigured(f'DJANGO_CACHE_URL: unsupported scheme {_cache_url.scheme!r} (memcached, redis)')
+else:
+    _cache = {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION',
+                              str(Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache')) / 'ecoview')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '5000'))},
+    }
+CACHES = {'default': _cache}
+
+# Rendered pages (home, selection pages, dashboards) are cached per user until new readings arrive
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '300'))
+# RFID card index (app.cards): each worker re-syncs at least this often, even without a cache bump
+CARD_INDEX_MAX_AGE_SECONDS = float(os.getenv('CARD_INDEX_MAX_AGE_SECONDS', '5'))
+# Latest value per model/device (app.latest), refreshed by every reading; a miss reads the newest row
+LATEST_CACHE_TIMEOUT = int(os.getenv('LATEST_CACHE_TIMEOUT', '86400'))
+# Chart API: windows with more readings than this are averaged into time buckets
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', '3000'))
+
+# Storage layout per monitoring: 'wide' (one column per channel) or 'packed' (float32 blob + presence
+# bitmask, see app.packed). Only brise has a packed model.
+READING_STORAGE = {
+    'brise': os.getenv('BRISE_STORAGE', 'wide'),
+}
+
+# Device timestamps: readings older than this are rejected instead of backfilled
+INGEST_MAX_BACKFILL_DAYS = int(os.getenv('INGEST_MAX_BACKFILL_DAYS', '30'))
+
+# Admission control for the device endpoints (/api/receive/, /api/verifica_cartao/): token bucket per
+# device (or client IP). 'local' keeps buckets per gunicorn worker, 'cache' shares them through CACHES.
+RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'local')
+# nginx (proxy_params) passes the device address in X-Real-IP
+RATELIMIT_CLIENT_IP_HEADER = 'HTTP_X_REAL_IP'
+RATELIMITS = {
+    # scope: (requests per minute, burst) - firmware posts every 30 s
+    'brise': (12, 6),
+    'pavimentos': (12, 6),
+    'default': (12, 6),
+    # every ingest request per client IP, on top of the device's bucket: sized for a site behind one NAT address
+    'ip': (600, 200),
+    'rfid': (60, 20),
+}
+
+# Access analytics: denied RFID swipes less than this apart count as one burst
+ACCESS_BURST_GAP_SECONDS = int(os.getenv('ACCESS_BURST_GAP_SECONDS', '300'))
+
+# Scheduler jobs (app.jobs): a device is reported stale after this long without a reading
+STALE_DEVICE_MINUTES = int(os.getenv('STALE_DEVICE_MINUTES', '30'))
+# Reading interval recorded for devices registered automatically on their first reading
+DEVICE_DEFAULT_INTERVAL_SECONDS = int(os.getenv('DEVICE_DEFAULT_INTERVAL_SECONDS', '30'))
+
+# Forwarding of stored readings to external sinks (app.forwarding): JSON object of
+# sink name -> {"class": ..., options}, see DEPLOY.md. Empty: nothing is queued.
+FORWARDING_SINKS = json.loads(os.getenv('FORWARDING_SINKS', '{}'))
+FORWARDING_INTERVAL_SECONDS = int(os.getenv('FORWARDING_INTERVAL_SECONDS', '15'))
+# A failed batch is retried after this, doubling per attempt up to the maximum; parked after MAX_ATTEMPTS
+FORWARDING_RETRY_SECONDS = int(os.getenv('FORWARDING_RETRY_SECONDS', '30'))
+FORWARDING_MAX_BACKOFF_SECONDS = int(os.getenv('FORWARDING_MAX_BACKOFF_SECONDS', '3600'))
+FORWARDING_MAX_ATTEMPTS = int(os.getenv('FORWARDING_MAX_ATTEMPTS', '50'))
+
+# Bearer token for /api/ingest_metrics/ (per-worker counters of the session-less ingest workers); empty = off
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Register DB router to route sensor models to specific databases
 DATABASE_ROUTERS = ['app.dbrouters.MonitoringRouter']
 
@@ -146,7 +282,8 @@ MEDIA_ROOT = os.getenv('DJANGO_MEDIA_ROOT', str(BASE_DIR / 'media'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Simple logging configuration: console (for gunicorn/nginx) and rotating file in BASE_DIR/logs
+# Logging: JSON lines to the console (for gunicorn/journald) and a rotating file in LOG_DIR, written by a
+# listener thread so a slow log disk never blocks requests (app.logs)
 
 LOG_DIR = os.getenv('DJANGO_LOG_DIR', str(BASE_DIR / 'logs'))
 # try to ensure the log directory exists; if not possible, continue (permission errors will raise at runtime)
@@ -155,29 +292,49 @@ try:
 except Exception:
     pass
 
+# records waiting for the listener; beyond this they are dropped (and counted) instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# the same warning/error (call site + exception type) is logged at most LOG_ERROR_BURST times per window
+LOG_ERROR_BURST = int(os.getenv('LOG_ERROR_BURST', '5'))
+LOG_ERROR_WINDOW_SECONDS = float(os.getenv('LOG_ERROR_WINDOW_SECONDS', '60'))
+LOG_SLOW_REQUEST_MS = float(os.getenv('LOG_SLOW_REQUEST_MS', '1000'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'standard': {
-            'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+        'json': {
+            '()': 'app.logs.JsonFormatter',
         },
     },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'standard',
+    'filters': {
+        'sample_repeated_errors': {
+            '()': 'app.logs.RepeatedErrorSampler',
+            'burst': LOG_ERROR_BURST,
+            'window': LOG_ERROR_WINDOW_SECONDS,
         },
-        'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': str(Path(LOG_DIR) / 'django.log'),
-            'maxBytes': 10 * 1024 * 1024,  # 10MB
-            'backupCount': 5,
-            'formatter': 'standard',
+    },
+    'handlers': {
+        'queue': {
+            # '()' rather than 'class': Python 3.12+ dictConfig special-cases QueueHandler classes
+            '()': 'app.logs.QueuedHandler',
+            'formatter': 'json',
+            'filters': ['sample_repeated_errors'],
+            'maxsize': LOG_QUEUE_SIZE,
+            'targets': [
+                {'class': 'logging.StreamHandler'},
+                {
+                    'class': 'logging.handlers.RotatingFileHandler',
+                    'filename': str(Path(LOG_DIR) / 'django.log'),
+                    'maxBytes': 10 * 1024 * 1024,  # 10MB
+                    'backupCount': 5,
+                    'encoding': 'utf-8',
+                },
+            ],
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
 }
@@ -0,0 +1,23 @@
+"""
+Settings for the device-API entry point (/api/receive/, /api/verifica_cartao/, /api/latest/).
+
+Same databases, caches and ingest options as ``config.settings``, but without admin, auth,
+sessions, messages, static files or templates, so worker boot does not import them. Select it
+with DJANGO_SETTINGS_MODULE=config.settings_ingest.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'app',
+]
+
+# Device endpoints are csrf_exempt and unauthenticated: no session/auth/messages middleware
+MIDDLEWARE = [
+    'app.middleware.RequestContextMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls_ingest'
+
+TEMPLATES = []
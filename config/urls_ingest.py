@@ -0,0 +1,14 @@
+from django.urls import path
+
+from app import api_views
+
+# Device endpoints only; names match app.urls so reverse() works in both modes
+urlpatterns = [
+    path('api/receive/', api_views.receive_sensor_data, name='receive_sensor_data'),
+    path('api/latest/', api_views.latest_sensor_data, name='latest_sensor_data'),
+    path('api/verifica_cartao/', api_views.verifica_cartao, name='verifica_cartao'),
+    path('api/ingest_metrics/', api_views.ingest_metrics, name='ingest_metrics'),
+]
+
+handler404 = 'app.api_views.json_not_found'
+handler500 = 'app.api_views.json_server_error'
@@ -0,0 +1,14 @@
+"""
+WSGI config for the device-API workers (/api/receive/, /api/verifica_cartao/, /api/latest/).
+
+Same as ``config.wsgi`` but with ``config.settings_ingest``: a three-middleware chain and a
+URLconf holding only the device endpoints. See deploy/gunicorn-ingest.service.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings_ingest')
+
+application = get_wsgi_application()
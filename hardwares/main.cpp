@@ -8,7 +8,8 @@
  * Descrição:
  *   Código para ESP32 que realiza a leitura de sensores ambientais (temperatura
  *   do solo, umidade do ar, radiação UV e velocidade do vento) e envia os dados
- *   para um servidor Django via HTTP POST e para o ThingSpeak via HTTP GET.
+ *   para um servidor Django via HTTP POST. O servidor repassa as leituras ao
+ *   ThingSpeak (e a outros destinos) em lotes: ver FORWARDING_SINKS no DEPLOY.md.
  * ============================================================================
  * Funcionalidades:
  *   - Conexão Wi-Fi automática
@@ -17,7 +18,7 @@
  *       [6-8]  Umidade do ar (DHT11)
  *       [9-10] Radiação UV (GYML8511)
  *       [11-12] Velocidade do vento (Anemômetro)
- *   - Envio periódico dos dados ao servidor Django e ao ThingSpeak
+ *   - Envio periódico dos dados ao servidor Django
  *   - Diagnóstico detalhado via Serial (MAC, IP, status de sensores, erros)
  * ============================================================================
  * Hardware:
@@ -51,16 +52,14 @@ const char* serverReceiveUrl = "http://10.5.1.100:8000/api/receive/"; // POST pa
 const char* serverLatestUrl = "http://10.5.1.100:8000/api/latest/";   // GET último registro (opcional)
 const char* serverVerificaCartaoUrl = "http://10.5.1.100:8000/api/verifica_cartao/"; // POST para verificar UID RFID
 
+// 1 = envia o quadro binário compacto (Content-Type: application/x-ecoview-struct, ver app/payloads.py)
+// 0 = envia JSON nomeado
+#define USE_BINARY_PAYLOAD 0
+#define BINARY_SCHEMA_BRISE 1
+
 const unsigned long postingInterval = 30000;  // Intervalo de 5 minutos para envio de dados
 unsigned long lastSendTime = 0;                // Armazena o último tempo de envio
 
-////======== CONFIGURAÇÕES THINGSPEAK ===========/////
-
-const char* thingspeakApiKey1 = "GL4W6L1MFFO57Y57"; // Chave API do canal DS18B20
-const char* thingspeakApiKey2 = "CCQ5GHPNY7D9PEQB"; // Chave API do canal dos demais sensores
-const char* thingspeakUrl = "http://api.thingspeak.com/update";
-void sendToThingSpeakChannels(float* sensorValues);
-
 ////======== DEFINIÇÃO DE PINOS E OBJETOS DOS SENSORES ===========/////
 #//~ DHT-11
 #define DHTTYPE DHT11
@@ -89,10 +88,10 @@ volatile unsigned long anemoPulses2 = 0;
 
 ////======== FUNÇÕES AUXILIARES ===========/////
 
-void enviarThingSpeakCanais(float* valoresSensores);
 void conectarWiFi();
 void ler_sensores(float* valores);
 void enviarDadosServidor(float* valoresSensores);
+void enviarDadosServidorBinario(float* valoresSensores);
 void imprimirInfoDispositivo();
 void IRAM_ATTR anemometroISR1() { anemoPulses1++; }
 void IRAM_ATTR anemometroISR2() { anemoPulses2++; }
@@ -194,78 +193,16 @@ void loop() {
   if (millis() - lastSendTime > postingInterval) {
     float valoresSensores[13];
     ler_sensores(valoresSensores);
+#if USE_BINARY_PAYLOAD
+    enviarDadosServidorBinario(valoresSensores);
+#else
     enviarDadosServidor(valoresSensores);
-    enviarThingSpeakCanais(valoresSensores);
+#endif
     lastSendTime = millis();
   }
   delay(1000);
 }
 
-////======== ENVIO PARA THINGSPEAK ===========/////
-
-/**
- * @brief Envia até 8 campos para cada canal do ThingSpeak.
- * @param valoresSensores Vetor com os valores dos sensores.
- */
-
-void enviarThingSpeakCanais(float* valoresSensores){
-  if (WiFi.status() != WL_CONNECTED) {
-    Serial.println("WiFi não conectado, não foi possível enviar ao ThingSpeak.");
-    return;
-  }
-
-  // Helper: converte NaN para 0.00 e formata com 2 casas
-  auto safe = [](float v)->String { if (isnan(v)) return String(0.0, 2); return String(v, 2); };
-
-  // Canal 1: mapear conforme painel ThingSpeak (anexo):
-  // Field1 = DHT1 (valoresSensores[6])
-  // Field2 = DHT2 (valoresSensores[7])
-  // Field3 = UV1   (valoresSensores[9])
-  // Field4 = UV2   (valoresSensores[10])
-  // Field5 = ANEMO1 (valoresSensores[11])
-  // Field6 = ANEMO2 (valoresSensores[12])
-  // Field7/8 permanecem 0
-  String url1 = String(thingspeakUrl) + "?api_key=" + thingspeakApiKey1;
-  url1 += "&field1=" + safe(valoresSensores[6]);
-  url1 += "&field2=" + safe(valoresSensores[7]);
-  url1 += "&field3=" + safe(valoresSensores[9]);
-  url1 += "&field4=" + safe(valoresSensores[10]);
-  url1 += "&field5=" + safe(valoresSensores[11]);
-  url1 += "&field6=" + safe(valoresSensores[12]);
-  url1 += "&field7=0&field8=0";
-
-  HTTPClient http1;
-  http1.begin(url1);
-  int httpCode1 = http1.GET();
-  if (httpCode1 > 0) {
-    Serial.printf("[ThingSpeak Canal 1] Dados enviados! Código: %d\n", httpCode1);
-  } else {
-    Serial.printf("[ThingSpeak Canal 1] Falha ao enviar! Código: %d\n", httpCode1);
-  }
-  http1.end();
-
-  // Canal 2: enviar apenas primeiros 6 campos (Field1..Field6)
-  // Mapear como: Field1 = valores[8], Field2 = valores[9], Field3 = valores[10]
-  // Field4 = valores[11], Field5 = valores[12], Field6 = 0 (nenhum dado adicional)
-  String url2 = String(thingspeakUrl) + "?api_key=" + thingspeakApiKey2;
-  url2 += "&field1=" + safe(valoresSensores[8]);
-  url2 += "&field2=" + safe(valoresSensores[9]);
-  url2 += "&field3=" + safe(valoresSensores[10]);
-  url2 += "&field4=" + safe(valoresSensores[11]);
-  url2 += "&field5=" + safe(valoresSensores[12]);
-  url2 += "&field6=0";
-
-  HTTPClient http2;
-  http2.begin(url2);
-  int httpCode2 = http2.GET();
-  if (httpCode2 > 0) {
-    Serial.printf("[ThingSpeak Canal 2] Dados enviados! Código: %d\n", httpCode2);
-  } else {
-    Serial.printf("[ThingSpeak Canal 2] Falha ao enviar! Código: %d\n", httpCode2);
-  }
-  http2.end();
-}
-
 ////======== CONEXÃO WI-FI ===========/////
 
 /**
@@ -447,6 +384,9 @@ void enviarDadosServidor(float* valoresSensores) {
   HTTPClient http;
   http.begin(serverReceiveUrl);
   http.addHeader("Content-Type", "application/json");
+  // Identificam o dispositivo para o limite de taxa do servidor sem decodificar o corpo
+  http.addHeader("X-Device-Id", WiFi.macAddress());
+  http.addHeader("X-Monitoring", "brise");
 
   // Monta JSON nomeado esperado pelo Django (monitoring = "brise")
   StaticJsonDocument<512> doc;
@@ -551,4 +491,57 @@ void enviarDadosServidor(float* valoresSensores) {
    }
    http.end();
 }
+
+////======== ENVIO BINÁRIO COMPACTO ===========/////
+
+/**
+ * @brief Envia os dados no formato binário posicional (schema 1 = brise).
+ *
+ * Quadro little-endian: u8 versão, u8 tamanho do device_id, device_id,
+ * f32 bateria, 14 x f32 na ordem ds18b20_1..6, dht11_1_temp, dht11_1_hum,
+ * dht11_2_temp, dht11_2_hum, uv_1, uv_2, wind_1, wind_2.
+ * @param valoresSensores Vetor com os valores dos sensores.
+ */
+
+void enviarDadosServidorBinario(float* valoresSensores) {
+  if (WiFi.status() != WL_CONNECTED) {
+    Serial.println("WiFi desconectado!");
+    conectarWiFi();
+    return;
+  }
+
+  String mac = WiFi.macAddress();
+  float canais[15];
+  canais[0] = simulateBatteryLevel();
+  for (int i = 0; i < 6; i++) canais[1 + i] = valoresSensores[i];
+  canais[7]  = dht1.readTemperature();
+  canais[8]  = dht1.readHumidity();
+  canais[9]  = dht2.readTemperature();
+  canais[10] = dht2.readHumidity();
+  canais[11] = valoresSensores[9];
+  canais[12] = valoresSensores[10];
+  canais[13] = valoresSensores[11];
+  canais[14] = valoresSensores[12];
+  // Mesmo comportamento do JSON: leitura inválida (NaN) vai como 0.0
+  for (int i = 1; i < 15; i++) if (isnan(canais[i])) canais[i] = 0.0f;
+
+  uint8_t quadro[2 + 32 + sizeof(canais)];
+  size_t idLen = min((size_t)mac.length(), (size_t)32);
+  quadro[0] = BINARY_SCHEMA_BRISE;
+  quadro[1] = (uint8_t)idLen;
+  memcpy(quadro + 2, mac.c_str(), idLen);
+  memcpy(quadro + 2 + idLen, canais, sizeof(canais));  // ESP32 é little-endian
+
+  HTTPClient http;
+  http.begin(serverReceiveUrl);
+  http.addHeader("Content-Type", "application/x-ecoview-struct");
+  int httpCode = http.POST(quadro, 2 + idLen + sizeof(canais));
+  if (httpCode == HTTP_CODE_OK) {
+    Serial.println("Dados (binário) enviados com sucesso ao servidor!");
+  } else {
+    Serial.printf("Erro ao enviar dados (binário). Código: %d\n", httpCode);
+    if (httpCode > 0) Serial.println("Resposta do servidor: " + http.getString());
+  }
+  http.end();
+}
 ////======== END CODE ===========/////
\ No newline at end of file
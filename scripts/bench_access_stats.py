@@ -0,0 +1,103 @@
+"""Compare access analytics from the summary tables with aggregates over the raw AccessLog.
+
+Fills a fresh temporary SQLite database with N access log rows spread over 30 days (20k UIDs,
+5% denied), rebuilds the summaries, then times both ways of answering the
+access page, plus the per-swipe cost of keeping the summaries.
+
+    python scripts/bench_access_stats.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def _timed(label, fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<44} {best * 1000:>10.1f} ms')
+
+
+def worker(rows):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from datetime import timedelta
+    from django.db import connection
+    from django.db.models import Count, Max, Q
+    from django.db.models.functions import TruncDay, TruncHour
+    from django.test import RequestFactory
+    from django.utils import timezone
+    from app import access_stats, api_views
+    from app.models import AccessLog
+
+    now = timezone.now()
+    rng = random.Random(1)
+    step = timedelta(days=30) / rows
+    start = time.perf_counter()
+    first = (now - timedelta(days=30)).replace(tzinfo=None)  # stored as naive UTC, like Django does
+    connection.ensure_connection()
+    with connection.connection:  # raw sqlite3: executemany without per-row Django overhead
+        connection.connection.executemany(
+            'INSERT INTO app_accesslog (uid, cartao_id, autorizado, timestamp) VALUES (?, NULL, ?, ?)',
+            ((f'{rng.randrange(20000):08X}', rng.random() > 0.05, (first + step * i).strftime('%Y-%m-%d %H:%M:%S.%f'))
+             for i in range(rows)))
+    print(f'{rows} rows generated in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    access_stats.rebuild_hourly()
+    access_stats.rebuild_uid_summaries()
+    print(f'{"summaries rebuilt from the log":<44} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+    _timed('summary() from summary tables', access_stats.summary)
+    _timed('total_logged() (paginator count)', access_stats.total_logged)
+
+    def raw():
+        day = now - timedelta(hours=24)
+        list(AccessLog.objects.filter(timestamp__gte=day).annotate(h=TruncHour('timestamp')).values('h')
+             .annotate(n=Count('id'), d=Count('id', filter=Q(autorizado=False))).order_by())
+        list(AccessLog.objects.filter(timestamp__gte=now - timedelta(days=14)).annotate(d=TruncDay('timestamp'))
+             .values('d').annotate(n=Count('id')).order_by())
+        list(AccessLog.objects.values('uid').annotate(last=Max('timestamp')).order_by('-last')[:20])
+
+    _timed('same answers from AccessLog aggregates', raw, repeat=2)
+    _timed('AccessLog COUNT(*)', lambda: AccessLog.objects.count(), repeat=2)
+
+    rf = RequestFactory()
+    swipes = 500
+    start = time.perf_counter()
+    for i in range(swipes):
+        api_views.verifica_cartao(rf.post('/api/verifica_cartao/', {'uid': f'{i % 300:08X}'}, content_type='application/json'))
+    print(f'{"verifica_cartao with summaries (per swipe)":<44} {(time.perf_counter() - start) / swipes * 1000:>10.2f} ms')
+    start = time.perf_counter()
+    for i in range(swipes):
+        AccessLog.objects.create(uid=f'{i % 300:08X}', autorizado=False)
+    print(f'{"AccessLog insert alone (per swipe)":<44} {(time.perf_counter() - start) / swipes * 1000:>10.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', '--rows', str(args.rows)], cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measure bulk RFID card import throughput and UID index rebuild/refresh cost.
+
+Generates a CSV of N cards, imports it into a fresh temporary database (all inserts), imports
+it again (all updates), then times a full index build, incremental refreshes after small
+re-imports, and lookups through the index vs a query.
+
+    python scripts/bench_card_import.py --cards 50000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def write_csv(path, count, start=0, suffix=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('uid;nome;nome_pessoa;email;funcao;matricula\n')
+        for i in range(start, start + count):
+            f.write(f'{i:08X};;Aluno {i}{suffix};aluno{i}@example.edu.br;aluno;{2026000000 + i}\n')
+
+
+def worker(csv_path, delta_path, count, chunk_size):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from app import cards
+    from app.models import CartaoRFID
+
+    for label in ('insert', 'update'):
+        with open(csv_path, 'rb') as f:
+            result = cards.import_cards(f, chunk_size=chunk_size)
+        print(f'import ({label:<6}) {result.imported:>7} cards {result.seconds:>7.2f}s {result.rate:>9.0f} cards/s')
+
+    index = cards.UidIndex()
+    start = time.perf_counter()
+    index.refresh()
+    print(f'index full build   {len(index):>7} uids  {(time.perf_counter() - start) * 1000:>7.1f} ms')
+
+    # the first refresh after a bulk import also re-reads its last SYNC_OVERLAP of rows
+    for label, suffix in (('first', ' (editado)'), ('steady', ' (editado 2)')):
+        time.sleep(cards.SYNC_OVERLAP.total_seconds() + 0.5)
+        write_csv(delta_path, 100, start=count // 2, suffix=suffix)
+        with open(delta_path, 'rb') as f:
+            cards.import_cards(f)
+        start = time.perf_counter()
+        index.refresh()
+        print(f'index refresh {label:<6} {"100 changed":>11} {(time.perf_counter() - start) * 1000:>7.1f} ms')
+
+    uids = [f'{i:08X}' for i in range(0, count, 7)]
+    start = time.perf_counter()
+    for uid in uids:
+        index.lookup(uid)
+    print(f'lookup (index)     {(time.perf_counter() - start) / len(uids) * 1e6:>20.1f} us')
+    start = time.perf_counter()
+    for uid in uids:
+        CartaoRFID.objects.filter(uid=uid).values_list('id', flat=True).first()
+    print(f'lookup (query)     {(time.perf_counter() - start) / len(uids) * 1e6:>20.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=50000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--worker', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(*args.worker, args.cards, args.chunk_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, delta_path = Path(tmp) / 'cards.csv', Path(tmp) / 'delta.csv'
+        write_csv(csv_path, args.cards)
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'))
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', str(csv_path), str(delta_path),
+                        '--cards', str(args.cards), '--chunk-size', str(args.chunk_size)], cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Per-device reads before and after the device registry (integer ``device_ref``).
+
+Fills a fresh temporary SQLite database with N brise readings from D devices as stored
+before the registry (``device_id`` text only, ``device_ref`` NULL), times per-device
+queries on ``device_id``, runs ``backfill_device_refs``, then times the same queries on
+``device_ref`` and reports the size of the indexes each one uses.
+
+    python scripts/bench_device_registry.py --rows 500000 --devices 50
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def _timed(label, fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<48} {best * 1000:>9.2f} ms')
+    return result
+
+
+def worker(rows, device_count):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from datetime import timedelta
+    from io import StringIO
+    from django.core.management import call_command
+    from django.db import connection
+    from django.utils import timezone
+    from app.devices import registry
+    from app.models import BriseSensorReading
+
+    names = [f'brise-campus-norte-node-{i:02d}' for i in range(device_count)]
+    rng = random.Random(1)
+    now = timezone.now()
+    first = (now - timedelta(seconds=30 * rows // device_count)).replace(tzinfo=None)
+    columns = ['ds18b20_1', 'ds18b20_2', 'ds18b20_3', 'ds18b20_4', 'ds18b20_5', 'ds18b20_6', 'dht11_1_temp',
+               'dht11_1_hum', 'dht11_2_temp', 'dht11_2_hum', 'uv_1', 'uv_2', 'wind_1', 'wind_2']
+    connection.ensure_connection()
+    with connection.connection:  # raw sqlite3: the pre-registry state, without per-row Django overhead
+        connection.connection.executemany(
+            f'INSERT INTO app_brisesensorreading (timestamp, device_id, battery_level, seq, {", ".join(columns)}) '
+            f'VALUES (?, ?, 80.0, ?, {", ".join("?" * len(columns))})',
+            (((first + timedelta(seconds=30 * (i // device_count))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+              names[i % device_count], i // device_count, *(round(rng.uniform(15, 35), 2) for _ in columns))
+             for i in range(rows)))
+    connection.cursor().execute('ANALYZE')
+
+    def index_size(name):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT sum(pgsize) FROM dbstat WHERE name = %s', [name])
+            return (cursor.fetchone()[0] or 0) / 1e6
+
+    def plan(queryset):
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return '; '.join(row[-1] for row in cursor.fetchall())
+
+    device = names[device_count // 2]
+    since = now - timedelta(hours=24)
+    readings = BriseSensorReading.objects.order_by()
+    print(f'{rows} readings, {device_count} devices; 24h of one device = '
+          f'{readings.filter(device_id=device, timestamp__gte=since).count()} rows')
+
+    print('\nbefore (device_id text)')
+    day = readings.filter(device_id=device, timestamp__gte=since).order_by('timestamp')
+    _timed('24h series of one device', lambda: list(day.values_list('timestamp', 'ds18b20_1')))
+    _timed('latest reading of one device', lambda: readings.filter(device_id=device).order_by('-timestamp').first())
+    print(f'{"  plan:":<10}{plan(day)}')
+
+    start = time.perf_counter()
+    call_command('backfill_device_refs', stdout=StringIO())
+    print(f'\nbackfill_device_refs {time.perf_counter() - start:.1f}s')
+    connection.cursor().execute('ANALYZE')
+
+    print('\nafter (device_ref integer)')
+    ref = registry.lookup('brise', device)
+    day = readings.filter(device_ref=ref, timestamp__gte=since).order_by('timestamp')
+    _timed('24h series of one device', lambda: list(day.values_list('timestamp', 'ds18b20_1')))
+    _timed('latest reading of one device', lambda: readings.filter(device_ref=ref).order_by('-timestamp').first())
+    print(f'{"  plan:":<10}{plan(day)}')
+    print(f'{"brise_dev_ts_idx (device_ref, timestamp) size":<48} {index_size("brise_dev_ts_idx"):>9.1f} MB')
+    print(f'{"brise_ref_seq_uniq (device_ref, seq) size":<48} {index_size("brise_ref_seq_uniq"):>9.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--devices', type=int, default=50)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.rows, args.devices)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', '--rows', str(args.rows), '--devices', str(args.devices)],
+                       cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
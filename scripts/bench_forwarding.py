@@ -0,0 +1,131 @@
+"""Cost of forwarding readings to external sinks (app.forwarding) against a local stand-in server.
+
+Posts N readings through the ingest view (Django test client, fresh temporary SQLite
+database), first without sinks and then with an InfluxDB, a ThingSpeak channel and a file
+sink configured, and prints the request latency of both: what queuing the readings in the
+outbox adds to ingest. It then delivers the outbox in batches (the sinks' defaults) and one
+reading per request, as the firmware did when it called ThingSpeak itself. The stand-in
+server answers each request after ``--server-ms``, standing in for the round trip to a
+hosted service.
+
+    python scripts/bench_forwarding.py --readings 2000 --server-ms 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def stand_in_server(delay):
+    """HTTP/1.1 server answering every POST with 200 after ``delay`` seconds; counts requests and connections."""
+    counts = {'requests': 0, 'connections': set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            counts['requests'] += 1
+            counts['connections'].add(self.client_address)
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, counts
+
+
+def worker(args, tmp):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.test import Client
+    from app import forwarding, storage
+    from app.models import OutboxEntry
+
+    httpd, counts = stand_in_server(args.server_ms / 1000)
+    url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    sinks = {
+        'influx': {'class': 'app.forwarding.InfluxLineSink', 'url': f'{url}/api/v2/write?org=eco&bucket=b&precision=s'},
+        'thingspeak': {'class': 'app.forwarding.ThingSpeakSink', 'url': url, 'channel_id': 1, 'api_key': 'bench',
+                       'fields': {'field1': 'dht11_1_hum', 'field2': 'dht11_2_hum', 'field3': 'uv_1',
+                                  'field4': 'uv_2', 'field5': 'wind_1', 'field6': 'wind_2'}},
+        'file': {'class': 'app.forwarding.FileSink', 'path': str(Path(tmp) / 'readings.jsonl')},
+    }
+    client = Client(HTTP_HOST='localhost')
+    fields = {f'ds18b20_{i}': 24.0 + i / 10 for i in range(1, 7)}
+    fields.update(dht11_1_temp=23.5, dht11_1_hum=55.1, dht11_2_temp=23.0, dht11_2_hum=54.8,
+                  uv_1=0.12, uv_2=0.13, wind_1=1.2, wind_2=1.1)
+
+    def ingest(label, seq_base):
+        timings = []
+        for i in range(args.readings):
+            payload = {'monitoring': 'brise', 'device_id': f'bench-{i % 10}', 'seq': seq_base + i, **fields}
+            start = time.perf_counter()
+            client.post('/api/receive/', payload, content_type='application/json')
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f'{label:<24} {statistics.median(timings):>8.2f} {timings[int(0.95 * len(timings))]:>8.2f} '
+              f'{timings[int(0.99 * len(timings))]:>8.2f}')
+
+    print(f'{args.readings} brise readings; stand-in sink server answers after {args.server_ms:g} ms\n')
+    print(f'{"ingest":<24} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    ingest('no sinks', 0)
+    settings.FORWARDING_SINKS = sinks
+    ingest('3 sinks (outbox)', 10 ** 6)
+    backlog = OutboxEntry.objects.count()
+
+    def deliver(label, batch_size=None):
+        config = {name: dict(sink, batch_size=batch_size) if batch_size else sink for name, sink in sinks.items()}
+        settings.FORWARDING_SINKS = config
+        counts['requests'], counts['connections'] = 0, set()
+        start = time.perf_counter()
+        delivered = sum(forwarding.flush().values())
+        elapsed = time.perf_counter() - start
+        print(f'{label:<24} {delivered:>9} {counts["requests"]:>9} {len(counts["connections"]):>6} '
+              f'{elapsed:>8.2f} {delivered / elapsed:>10.0f}')
+
+    print(f'\n{"delivery":<24} {"readings":>9} {"requests":>9} {"conns":>6} {"s":>8} {"readings/s":>10}')
+    deliver('batched')
+    # the same backlog again, delivered a reading at a time
+    readings = storage.brise_model().objects.order_by('-pk')[:args.readings]
+    forwarding.enqueue([forwarding.point(reading, 'brise') for reading in readings])
+    deliver('one reading per request', batch_size=1)
+    print(f'\n(outbox after ingest: {backlog} entries for {args.readings} readings)')
+    httpd.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=2000)
+    parser.add_argument('--server-ms', type=float, default=20, help='Stand-in sink latency per request.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args, args.worker)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', tmp, '--readings', str(args.readings),
+                        '--server-ms', str(args.server_ms)], cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
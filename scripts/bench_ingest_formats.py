@@ -0,0 +1,41 @@
+"""Compare parse cost and wire size of the JSON and binary ingest formats.
+
+    python scripts/bench_ingest_formats.py --iterations 200000
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import payloads  # noqa: E402  (no Django setup needed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    device_id = 'AA:BB:CC:DD:EE:FF'  # firmware sends WiFi.macAddress()
+    values = {name: 20.0 + i * 1.37 for i, name in enumerate(payloads.BRISE_FIELDS)}
+    json_body = json.dumps({'monitoring': 'brise', 'device_id': device_id, 'battery': 80, **values}).encode()
+    frame = payloads.encode(1, device_id, values, battery=80)
+
+    def parse_json():
+        data = json.loads(json_body.decode('utf-8'))
+        return {k: float(data[k]) for k in payloads.BRISE_FIELDS}
+
+    def parse_binary():
+        data = payloads.decode(frame)
+        return {k: float(data[k]) for k in payloads.BRISE_FIELDS}
+
+    print(f"{'format':<8} {'bytes':>6} {'us/parse':>9}")
+    for name, body, fn in (('json', json_body, parse_json), ('binary', frame, parse_binary)):
+        seconds = timeit.timeit(fn, number=args.iterations)
+        print(f"{name:<8} {len(body):>6} {seconds / args.iterations * 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Measure per-request overhead of the full web stack vs the ingest-only entry point.
+
+Each mode runs in its own process (settings can't be switched in-process) against an
+in-memory SQLite database, so disk commits don't drown the difference. Requests go through
+the WSGI application, i.e. the whole middleware chain and URL resolution; the view called
+directly, interleaved with them, gives the baseline to subtract.
+
+    python scripts/bench_ingest_stack.py --requests 3000
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+MODES = {
+    'full': 'config.wsgi',
+    'ingest': 'config.wsgi_ingest',
+}
+SETTINGS = {
+    'full': 'config.settings',
+    'ingest': 'config.settings_ingest',
+}
+
+
+def _environ(method, path, body=b''):
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': '127.0.0.1',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def worker(mode, requests):
+    """Runs inside a child process; prints a JSON line with microseconds per request."""
+    import importlib
+
+    application = importlib.import_module(MODES[mode]).application
+    from django.core.management import call_command
+    from django.test import RequestFactory
+    from app import api_views
+
+    # generic sensor1..14 reading: stored in SensorReading, which /api/latest/ serves
+    body = json.dumps({'device_id': 'bench', 'battery': 80, **{f'sensor{i}': 21.5 for i in range(1, 15)}}).encode()
+    statuses = []
+
+    def start_response(status, headers):
+        statuses.append(status)
+
+    cases = {
+        'receive': (lambda: application(_environ('POST', '/api/receive/', body), start_response),
+                    lambda rf: api_views.receive_sensor_data(rf.post('/api/receive/', body, content_type='application/json'))),
+        'latest': (lambda: application(_environ('GET', '/api/latest/'), start_response),
+                   lambda rf: api_views.latest_sensor_data(rf.get('/api/latest/'))),
+    }
+    call_command('migrate', verbosity=0)
+    rf = RequestFactory()
+    report = {}
+    for name, (through_stack, direct) in cases.items():
+        for _ in range(50):  # warm-up: connections, caches, first-request imports
+            through_stack()
+        stack = view = 0.0
+        for _ in range(requests):
+            start = time.perf_counter()
+            through_stack()
+            middle = time.perf_counter()
+            direct(rf)
+            view += time.perf_counter() - middle
+            stack += middle - start
+        report[name] = {'stack_us': stack / requests * 1e6, 'view_us': view / requests * 1e6}
+    report['errors'] = sum(not status.startswith('200') for status in statuses)
+    print(json.dumps(report))
+
+
+def bench(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=':memory:', DJANGO_LOG_DIR=tmp,
+                   DJANGO_SETTINGS_MODULE=SETTINGS[mode], DJANGO_DEBUG='False',
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        cmd = [sys.executable, __file__, '--worker', mode, '--requests', str(args.requests)]
+        out = subprocess.run(cmd, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    report = json.loads(out.strip().splitlines()[-1])
+    for name in ('receive', 'latest'):
+        row = report[name]
+        print(f"{mode:<8} {name:<8} {row['stack_us']:>9.1f} {row['view_us']:>9.1f} "
+              f"{row['stack_us'] - row['view_us']:>9.1f}")
+    if report['errors']:
+        print(f"{mode:<8} {report['errors']} non-200 responses")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=3000, help='requests per endpoint')
+    parser.add_argument('--mode', choices=sorted(MODES), action='append')
+    parser.add_argument('--worker', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.requests)
+    print(f"{'mode':<8} {'endpoint':<8} {'stack us':>9} {'view us':>9} {'overhead':>9}")
+    for mode in args.mode or list(MODES):
+        bench(mode, args)
+
+
+if __name__ == '__main__':
+    main()
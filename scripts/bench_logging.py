@@ -0,0 +1,130 @@
+"""Ingest latency with a slow log disk: synchronous file logging vs the queued pipeline (app.logs).
+
+Posts N readings through the ingest view (Django test client, fresh temporary SQLite
+database); every Kth one fails after parsing, so it logs a traceback as a broken device
+would. The log file's ``flush()`` sleeps ``--disk-ms`` to stand in for a stalled disk,
+SD card or network mount. Each mode prints request latency percentiles, how much reached
+the log file, records dropped (queue full) or suppressed (sampling), and how long the
+listener took to drain its queue after the last request.
+
+    python scripts/bench_logging.py --requests 2000 --error-every 20 --disk-ms 50
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+class SlowDiskFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler whose every flush (one per record) takes ``disk_ms`` longer."""
+
+    def __init__(self, filename, disk_ms=0.0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.disk_ms = disk_ms
+
+    def flush(self):
+        super().flush()
+        if self.disk_ms:
+            time.sleep(self.disk_ms / 1000)
+
+
+def worker(args, tmp):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from unittest import mock
+    from django.test import Client
+    from app import api_views, logs, metrics
+
+    client = Client(HTTP_HOST='localhost')
+    calls = {'n': 0}
+    real_data_changed = api_views.versions.data_changed
+
+    def flaky_data_changed(*a, **kw):
+        calls['n'] += 1
+        if calls['n'] % args.error_every == 0:
+            raise RuntimeError('cache backend unavailable')
+        return real_data_changed(*a, **kw)
+
+    logging.getLogger('django').handlers = []  # Django's DEBUG-only console copy of request errors
+
+    def run(label, handler, seq_base):
+        root = logging.getLogger()
+        root.handlers = [handler]
+        metrics.reset()
+        timings = []
+        with mock.patch.object(api_views.versions, 'data_changed', flaky_data_changed):
+            for i in range(args.requests):
+                payload = {'device_id': f'bench-{i % 20}', 'seq': seq_base + i,
+                           **{f'sensor{n}': 20.0 + n for n in range(1, 15)}}
+                start = time.perf_counter()
+                client.post('/api/receive/', payload, content_type='application/json')
+                timings.append((time.perf_counter() - start) * 1000)
+        drain = time.perf_counter()
+        handler.close()
+        drain = time.perf_counter() - drain
+        timings.sort()
+        pct = lambda p: timings[min(len(timings) - 1, int(p * len(timings)))]  # noqa: E731
+        path = Path(tmp) / f'{label}.log'
+        written = path.stat().st_size / 1024 if path.exists() else 0
+        counters = metrics.snapshot()
+        print(f'{label:<20} {statistics.median(timings):>8.2f} {pct(0.95):>8.2f} {pct(0.99):>8.2f} {timings[-1]:>8.1f} '
+              f'{written:>7.1f} {counters.get("logging.dropped", 0):>7} {counters.get("logging.suppressed", 0):>10} '
+              f'{drain:>7.2f}')
+
+    def file_target(label, disk_ms):
+        return {'class': '__main__.SlowDiskFileHandler', 'filename': str(Path(tmp) / f'{label}.log'),
+                'disk_ms': disk_ms, 'maxBytes': 10 * 1024 * 1024, 'backupCount': 5}
+
+    def sync(label, disk_ms):
+        handler = SlowDiskFileHandler(str(Path(tmp) / f'{label}.log'), disk_ms, maxBytes=10 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+        return handler
+
+    def queued(label, disk_ms, sample):
+        handler = logs.QueuedHandler([file_target(label, disk_ms)], maxsize=args.queue_size)
+        handler.setFormatter(logs.JsonFormatter())
+        if sample:
+            handler.addFilter(logs.RepeatedErrorSampler(burst=5, window=60))
+        return handler
+
+    print(f'{args.requests} ingest requests, 1 in {args.error_every} failing with a traceback, '
+          f'log disk +{args.disk_ms:g} ms per write\n')
+    print(f'{"mode":<20} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} {"KiB":>7} {"dropped":>7} '
+          f'{"suppressed":>10} {"drain s":>7}')
+    run('sync-fast-disk', sync('sync-fast-disk', 0), 0)
+    run('sync', sync('sync', args.disk_ms), 10 ** 6)
+    run('queued', queued('queued', args.disk_ms, sample=False), 2 * 10 ** 6)
+    run('queued+sampling', queued('queued+sampling', args.disk_ms, sample=True), 3 * 10 ** 6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--error-every', type=int, default=20, help='Every Kth request fails (and logs).')
+    parser.add_argument('--disk-ms', type=float, default=50, help='Added to every log write.')
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args, args.worker)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', tmp, '--requests', str(args.requests),
+                        '--error-every', str(args.error_every), '--disk-ms', str(args.disk_ms),
+                        '--queue-size', str(args.queue_size)], cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
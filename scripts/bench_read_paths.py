@@ -0,0 +1,119 @@
+"""Query counts and latency of the read paths (app.read_budgets) on a large seeded dataset.
+
+Migrates a fresh temporary SQLite database, fills it with ``seed_data``, then requests
+every page in app.read_budgets.READ_PATHS as a logged-in user with the page cache off.
+Prints a table, writes a JSON report (compare two runs with ``--compare old.json``) and
+exits 1 if a page exceeds its query or latency budget.
+
+    python scripts/bench_read_paths.py --readings 1000000 --access-logs 1000000 --report read_paths.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def worker(args):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from app.read_budgets import READ_PATHS
+
+    client = Client(HTTP_HOST='localhost')
+    user, _ = User.objects.get_or_create(username='bench')
+    client.force_login(user)
+    report = {'seed': {'readings': args.readings, 'access_logs': args.access_logs, 'devices': args.devices},
+              'python': platform.python_version(), 'database': connection.vendor, 'pages': {}}
+    failures = []
+    print(f'{"page":<24} {"status":>6} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9} {"KiB":>7}')
+    for page in READ_PATHS:
+        client.get(page.path)  # warm up: imports, templates, registry lookups
+        timings = []
+        for _ in range(args.repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(page.path)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))]
+        result = {'status': response.status_code, 'queries': len(queries), 'p50_ms': round(statistics.median(timings), 2),
+                  'p95_ms': round(p95, 2), 'bytes': len(response.content),
+                  'max_queries': page.max_queries, 'max_ms': page.max_ms}
+        report['pages'][page.name] = result
+        print(f'{page.name:<24} {result["status"]:>6} {result["queries"]:>8} {result["p50_ms"]:>9.1f} '
+              f'{result["p95_ms"]:>9.1f} {result["bytes"] / 1024:>7.1f}')
+        if result['status'] != 200 or result['queries'] > page.max_queries or p95 > page.max_ms:
+            failures.append(page.name)
+            if args.verbose:
+                print('\n'.join(f'    {q["time"]}s {q["sql"][:200]}' for q in queries.captured_queries))
+    report['over_budget'] = failures
+    return report
+
+
+def compare(report, old_path):
+    old = json.loads(Path(old_path).read_text())['pages']
+    print(f'\n{"page":<24} {"queries":>13} {"p95 ms":>19}')
+    for name, now in report['pages'].items():
+        before = old.get(name)
+        if before:
+            print(f'{name:<24} {before["queries"]:>5} -> {now["queries"]:<5} '
+                  f'{before["p95_ms"]:>8.1f} -> {now["p95_ms"]:<8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=1000000, help='Readings per monitoring.')
+    parser.add_argument('--devices', type=int, default=20, help='Devices per monitoring.')
+    parser.add_argument('--access-logs', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--report', help='Write the JSON report here.')
+    parser.add_argument('--compare', help='A previous JSON report to compare against.')
+    parser.add_argument('--verbose', action='store_true', help='Print the queries of pages over budget.')
+    parser.add_argument('--database', help='Keep the seeded SQLite database here; an existing one is reused as is.')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        report = worker(args)
+        Path(args.report).write_text(json.dumps(report, indent=2))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Path(args.database).resolve() if args.database else Path(tmp) / 'bench.sqlite3'
+        env = dict(os.environ, SQLITE_PATH=str(database), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False',
+                   PAGE_CACHE_ENABLED='False')
+        if not database.exists():
+            subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+            subprocess.run([sys.executable, 'manage.py', 'seed_data', '--readings', str(args.readings),
+                            '--devices', str(args.devices), '--access-logs', str(args.access_logs)],
+                           cwd=BASE_DIR, env=env, check=True)
+        report_path = Path(tmp) / 'report.json'
+        command = [sys.executable, __file__, '--worker', '--readings', str(args.readings), '--devices', str(args.devices),
+                   '--access-logs', str(args.access_logs), '--repeat', str(args.repeat), '--report', str(report_path)]
+        if args.verbose:
+            command.append('--verbose')
+        subprocess.run(command, cwd=BASE_DIR, env=env, check=True)
+        report = json.loads(report_path.read_text())
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+    if report['over_budget']:
+        print(f'\nover budget: {", ".join(report["over_budget"])}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
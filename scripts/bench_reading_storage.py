@@ -0,0 +1,106 @@
+"""Compare the wide-column and packed (float32 blob + mask) layouts of brise readings.
+
+Fills a fresh temporary SQLite database with the same N readings in both tables (10 nodes,
+one reading per minute each, with a realistic share of unplugged sensors: dht11_2 and the
+UV pair missing on some nodes), then reports table + index size, insert rate and the time
+to read a chart's worth of columns back through ``app.storage.series``.
+
+    python scripts/bench_reading_storage.py --rows 500000
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+DEVICES = 10
+
+
+def _timed(label, fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<44} {best * 1000:>10.1f} ms')
+    return result
+
+
+def _reading(rng, device):
+    values = {f'ds18b20_{i}': round(rng.uniform(18, 35), 2) for i in range(1, 7)}
+    values.update(dht11_1_temp=round(rng.uniform(18, 35), 1), dht11_1_hum=round(rng.uniform(30, 90), 1),
+                  wind_1=round(rng.uniform(0, 8), 2), wind_2=round(rng.uniform(0, 8), 2))
+    if device % 2:
+        values.update(dht11_2_temp=round(rng.uniform(18, 35), 1), dht11_2_hum=round(rng.uniform(30, 90), 1))
+    if device % 3 == 0:
+        values.update(uv_1=round(rng.uniform(0, 1), 3), uv_2=round(rng.uniform(0, 1), 3))
+    return values
+
+
+def worker(rows):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from datetime import timedelta
+    from django.db import connection
+    from django.utils import timezone
+    from app import storage
+    from app.models import BrisePackedReading, BriseSensorReading
+
+    rng = random.Random(1)
+    first = timezone.now() - timedelta(minutes=rows // DEVICES)
+    samples = [(first + timedelta(minutes=i // DEVICES), i % DEVICES, i, _reading(rng, i % DEVICES)) for i in range(rows)]
+
+    def insert(build, model):
+        start = time.perf_counter()
+        for offset in range(0, rows, 5000):
+            model.objects.bulk_create([build(*sample) for sample in samples[offset:offset + 5000]])
+        elapsed = time.perf_counter() - start
+        print(f'{model.__name__ + " inserts":<44} {rows / elapsed:>10.0f} rows/s')
+
+    insert(lambda ts, dev, seq, values: BriseSensorReading(
+        timestamp=ts, device_id=f'esp_{dev}', battery_level=80.0, seq=seq, **values), BriseSensorReading)
+    insert(lambda ts, dev, seq, values: BrisePackedReading.from_channels(
+        1, values, timestamp=ts, device_id=f'esp_{dev}', battery_level=80.0, seq=seq), BrisePackedReading)
+
+    with connection.cursor() as cursor:
+        for model in (BriseSensorReading, BrisePackedReading):
+            table = model._meta.db_table
+            cursor.execute(
+                'SELECT sum(pgsize) FROM dbstat WHERE name = %s OR name IN '
+                '(SELECT name FROM sqlite_master WHERE type = %s AND tbl_name = %s)', [table, 'index', table])
+            size = cursor.fetchone()[0]
+            print(f'{table + " (table + indexes)":<44} {size / 1e6:>10.1f} MB  ({size / rows:.0f} B/row)')
+
+    fields = ['ds18b20_1', 'ds18b20_2', 'dht11_1_temp', 'dht11_1_hum', 'wind_1']
+    since = samples[-1][0] - timedelta(days=1)
+    for model in (BriseSensorReading, BrisePackedReading):
+        queryset = model.objects.filter(timestamp__gte=since).order_by('timestamp')
+        timestamps, _ = _timed(f'{model.__name__} 24h series, {len(fields)} fields', lambda: storage.series(queryset, fields))
+        queryset = model.objects.filter(timestamp__gte=since, device_id='esp_3').order_by('timestamp')
+        _timed(f'{model.__name__} 24h series, one device', lambda: storage.series(queryset, fields))
+    print(f'(24h window = {len(timestamps)} rows)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp,
+                   DJANGO_CACHE_LOCATION=str(Path(tmp) / 'cache'), RATELIMIT_ENABLED='False')
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        subprocess.run([sys.executable, __file__, '--worker', '--rows', str(args.rows)], cwd=BASE_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Measure ingest throughput on the SQLite fallback with and without the tuned profile.
+
+Emulates gunicorn: N worker processes x M request threads posting brise readings
+through ``receive_sensor_data`` against a fresh temporary database file.
+
+    python scripts/bench_sqlite_ingest.py --workers 3 --threads 4 --requests 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+MODES = {
+    'baseline': {'SQLITE_TUNED': 'False', 'INGEST_SINGLE_WRITER': 'False'},
+    'tuned': {'SQLITE_TUNED': 'True', 'INGEST_SINGLE_WRITER': 'False'},
+    'tuned+writer': {'SQLITE_TUNED': 'True', 'INGEST_SINGLE_WRITER': 'True'},
+}
+
+
+def worker(threads, requests):
+    """Runs inside a child process; prints a JSON line with ok/error counts."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from django.test import RequestFactory
+    from app.views import receive_sensor_data
+
+    rf = RequestFactory()
+    payload = {'monitoring': 'brise', 'device_id': f'bench_{os.getpid()}', 'battery': 80}
+    for key in ['ds18b20_1', 'ds18b20_2', 'ds18b20_3', 'ds18b20_4', 'ds18b20_5', 'ds18b20_6',
+                'dht11_1_temp', 'dht11_1_hum', 'dht11_2_temp', 'dht11_2_hum', 'uv_1', 'uv_2', 'wind_1', 'wind_2']:
+        payload[key] = 21.5
+    body = json.dumps(payload)
+
+    def run(_):
+        ok = err = 0
+        for _ in range(requests):
+            resp = receive_sensor_data(rf.post('/api/receive/', body, content_type='application/json'))
+            if resp.status_code == 200:
+                ok += 1
+            else:
+                err += 1
+        return ok, err
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, range(threads)))
+    print(json.dumps({'ok': sum(r[0] for r in results), 'errors': sum(r[1] for r in results)}))
+
+
+def bench(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLITE_PATH=str(Path(tmp) / 'bench.sqlite3'), DJANGO_LOG_DIR=tmp, **MODES[mode])
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=BASE_DIR, env=env, check=True)
+        cmd = [sys.executable, __file__, '--worker', '--threads', str(args.threads), '--requests', str(args.requests)]
+        start = time.perf_counter()
+        procs = [subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for _ in range(args.workers)]
+        outputs = [p.communicate()[0] for p in procs]
+        elapsed = time.perf_counter() - start
+    ok = errors = 0
+    for out in outputs:
+        line = out.strip().splitlines()[-1] if out.strip() else '{"ok": 0, "errors": 0}'
+        counts = json.loads(line)
+        ok += counts['ok']
+        errors += counts['errors']
+    print(f"{mode:<14} {ok:>7} ok {errors:>6} errors {elapsed:>8.2f}s {ok / elapsed:>9.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=300, help='requests per thread')
+    parser.add_argument('--mode', choices=sorted(MODES), action='append')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.threads, args.requests)
+    for mode in args.mode or list(MODES):
+        bench(mode, args)
+
+
+if __name__ == '__main__':
+    main()
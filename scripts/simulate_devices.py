@@ -0,0 +1,300 @@
+"""Emulate a fleet of ESP32 nodes against a running server and report capacity numbers.
+
+Each simulated device posts a reading every ``--interval`` seconds (+/- ``--jitter``), with a
+monotonic ``seq``, ``sample_ts``/``device_now`` and retries with exponential backoff (honouring
+Retry-After), like the firmware. The fleet is a mix of brise, pavimentos and generic
+(sensor1..14) nodes, optionally sending the binary frame, plus RFID readers swiping a pool of
+cards. Only the standard library is used (asyncio streams), so it runs anywhere the server does.
+
+    python manage.py runserver 8000 --noreload   # or gunicorn
+    python scripts/simulate_devices.py --devices 200 --interval 5 --duration 60
+    python scripts/simulate_devices.py --devices 100,200,400,800 --interval 5 --duration 30 --p99-budget 500
+
+Several comma-separated ``--devices`` values run as successive stages, stopping at the first
+whose p99 exceeds ``--p99-budget``. DB growth is measured locally (same settings as the server)
+unless ``--no-db`` is given. Disable rate limiting on the server (RATELIMIT_ENABLED=False) when
+using intervals shorter than the firmware's 30 s.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app import payloads  # noqa: E402  (no Django setup needed)
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []  # ms, successful attempts only (sorted once the stage ends)
+        self.statuses = Counter()
+        self.kinds = Counter()
+        self.failures = Counter()  # requests given up after all retries, by last error
+        self.retries = 0
+        self.duplicates = 0
+
+    def record(self, kind, status, latency_ms, body):
+        self.statuses[status] += 1
+        if status == 200:
+            self.kinds[kind] += 1
+            self.latencies.append(latency_ms)
+            if b'"duplicate": true' in body:
+                self.duplicates += 1
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        return self.latencies[min(len(self.latencies) - 1, int(len(self.latencies) * p / 100))]
+
+    def histogram(self):
+        counts = Counter(bisect.bisect_left(BUCKETS_MS, value) for value in self.latencies)
+        return [(BUCKETS_MS[i], counts.get(i, 0)) for i in range(len(BUCKETS_MS))]
+
+
+async def http_request(host, port, method, path, body=b'', headers=None, timeout=10.0):
+    """One HTTP/1.1 request on a fresh connection (as the firmware's HTTPClient does)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close',
+                 f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response_headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                response_headers[name.strip().lower()] = value.strip()
+        length = response_headers.get('content-length')
+        if length is not None:
+            data = await asyncio.wait_for(reader.readexactly(int(length)), timeout)
+        else:
+            data = await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1]), response_headers, data
+    finally:
+        writer.close()
+
+
+class Device:
+    def __init__(self, index, kind, rng, binary=False):
+        self.kind = kind
+        self.rng = rng
+        self.binary = binary
+        self.device_id = f'SIM:{kind[:3].upper()}:{index:05d}'
+        # seq keeps increasing across runs/stages (same device ids), like a boot counter would
+        self.seq = int(time.time() * 10) & 0x7FFFFFFF
+        self.battery = rng.uniform(40, 100)
+        self.clock_skew = rng.uniform(-30, 30)  # seconds the device clock is off
+
+    def _values(self):
+        rng = self.rng
+        if self.kind == 'brise':
+            values = {f'ds18b20_{i}': round(rng.gauss(26, 3), 2) for i in range(1, 7)}
+            values.update({'dht11_1_temp': round(rng.gauss(27, 3), 1), 'dht11_1_hum': round(rng.uniform(40, 90), 1),
+                           'dht11_2_temp': round(rng.gauss(27, 3), 1), 'dht11_2_hum': round(rng.uniform(40, 90), 1),
+                           'uv_1': round(rng.uniform(0, 11), 2), 'uv_2': round(rng.uniform(0, 11), 2),
+                           'wind_1': round(rng.expovariate(1 / 2), 2), 'wind_2': round(rng.expovariate(1 / 2), 2)})
+            return values
+        if self.kind == 'pavimentos':
+            return {'sensor_a': round(rng.gauss(35, 6), 2), 'sensor_b': round(rng.gauss(35, 6), 2)}
+        return {f'sensor{i}': round(rng.gauss(25, 5), 2) for i in range(1, 15)}
+
+    def next_request(self):
+        """(path, body, headers) of the next reading; a retry reuses it (same seq)."""
+        self.seq += 1
+        self.battery = max(5.0, self.battery - self.rng.uniform(0, 0.01))
+        device_now = time.time() - self.clock_skew
+        values = self._values()
+        headers = {'X-Device-Id': self.device_id, 'X-Monitoring': self.kind}
+        if self.binary:
+            version = {'brise': 1, 'pavimentos': 2}.get(self.kind, 3)
+            body = payloads.encode(version, self.device_id, values, battery=round(self.battery),
+                                   seq=self.seq, sample_ts=int(device_now), device_now=int(device_now))
+            headers['Content-Type'] = 'application/x-ecoview-struct'
+        else:
+            data = {'monitoring': self.kind, 'device_id': self.device_id, 'battery': round(self.battery, 1),
+                    'seq': self.seq, 'sample_ts': int(device_now * 1000), 'device_now': int(device_now * 1000), **values}
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        return '/api/receive/', body, headers
+
+
+async def send_with_retries(target, stats, kind, path, body, headers, retries, timeout):
+    host, port = target
+    delay = 0.5
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            status, response_headers, data = await http_request(host, port, 'POST', path, body, headers, timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            status, response_headers, data, error = None, {}, b'', type(exc).__name__
+        else:
+            error = f'HTTP {status}'
+            stats.record(kind, status, (time.perf_counter() - start) * 1000, data)
+            if status not in RETRY_STATUSES:
+                if status != 200:
+                    stats.failures[error] += 1
+                return
+        if status is None:
+            stats.statuses[error] += 1
+        if attempt == retries:
+            stats.failures[error] += 1
+            return
+        stats.retries += 1
+        wait = delay * (1 + random.random())
+        if response_headers.get('retry-after', '').isdigit():
+            wait = max(wait, float(response_headers['retry-after']))
+        await asyncio.sleep(wait)
+        delay = min(delay * 2, 30)
+
+
+async def _sleep(seconds, deadline):
+    await asyncio.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+
+
+async def run_device(device, target, stats, args, deadline):
+    # nodes boot at random times: spread the first posts over one interval
+    await _sleep(random.uniform(0, args.interval), deadline)
+    while time.monotonic() < deadline:
+        path, body, headers = device.next_request()
+        await send_with_retries(target, stats, device.kind, path, body, headers, args.retries, args.timeout)
+        await _sleep(args.interval * random.uniform(1 - args.jitter, 1 + args.jitter), deadline)
+
+
+async def run_reader(index, target, stats, args, deadline, cards):
+    rng = random.Random(index)
+    await _sleep(rng.uniform(0, args.swipe_interval), deadline)
+    while time.monotonic() < deadline:
+        # mostly registered cards, some unknown ones (denied), occasionally a burst of retries
+        uid = rng.choice(cards) if cards and rng.random() < 0.9 else f'{rng.randrange(1 << 32):08X}'
+        for _ in range(rng.choice([1, 1, 1, 1, 3])):
+            body = json.dumps({'uid': uid}).encode()
+            await send_with_retries(target, stats, 'rfid', '/api/verifica_cartao/', body,
+                                    {'Content-Type': 'application/json'}, args.retries, args.timeout)
+        await _sleep(rng.expovariate(1 / args.swipe_interval), deadline)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('brise', 'pavimentos', 'default'):
+            raise argparse.ArgumentTypeError(f'unknown device kind {kind!r}')
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def db_counts():
+    """Row counts of the ingest tables and the SQLite file sizes, via the local Django settings."""
+    import django
+    from django.conf import settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    if not settings.configured or not django.apps.apps.ready:
+        django.setup()
+    from django.db import connections
+    from app.models import AccessLog, BriseSensorReading, PavimentosSensorReading, SensorReading
+    counts = {model.__name__: model.objects.count()
+              for model in (BriseSensorReading, PavimentosSensorReading, SensorReading, AccessLog)}
+    size = 0
+    for alias in connections:
+        db = connections[alias].settings_dict
+        if db['ENGINE'].endswith('sqlite3') and str(db['NAME']) != ':memory:':
+            for suffix in ('', '-wal'):
+                path = Path(f"{db['NAME']}{suffix}")
+                if path.exists():
+                    size += path.stat().st_size
+    for alias in connections:
+        connections[alias].close()
+    return counts, size
+
+
+async def run_stage(devices, args, target):
+    rng = random.Random(args.seed)
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+    fleet = [Device(i, rng.choices(kinds, weights)[0], random.Random(args.seed * 100003 + i),
+                    binary=rng.random() < args.binary) for i in range(devices)]
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    cards = [f'{i:08X}' for i in range(args.cards)]
+    tasks = [run_device(device, target, stats, args, deadline) for device in fleet]
+    tasks += [run_reader(i, target, stats, args, deadline, cards) for i in range(args.rfid_readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    stats.latencies.sort()
+    return stats, elapsed
+
+
+def report(devices, stats, elapsed, growth, args):
+    ok = sum(stats.kinds.values())
+    attempts = sum(stats.statuses.values())
+    errors = attempts - stats.statuses[200]
+    print(f'\n== {devices} devices, {args.rfid_readers} RFID readers, {elapsed:.1f}s ==')
+    print(f'throughput   {ok / elapsed:8.1f} ok/s ({", ".join(f"{k} {v}" for k, v in sorted(stats.kinds.items()))})')
+    print(f'attempts     {attempts:8d}   errors {errors} ({errors / attempts * 100 if attempts else 0:.2f}%), '
+          f'retries {stats.retries}, gave up {sum(stats.failures.values())}, duplicates acked {stats.duplicates}')
+    print(f'statuses     {dict(sorted(stats.statuses.items(), key=str))}')
+    if stats.failures:
+        print(f'gave up on   {dict(stats.failures)}')
+    print(f'latency ms   p50 {stats.percentile(50):.1f}  p90 {stats.percentile(90):.1f}  '
+          f'p99 {stats.percentile(99):.1f}  max {stats.latencies[-1] if stats.latencies else 0:.1f}')
+    peak = max((count for _, count in stats.histogram()), default=0) or 1
+    for bound, count in stats.histogram():
+        label = f'<= {bound:g}' if bound != float('inf') else f'>  {BUCKETS_MS[-2]:g}'
+        print(f'  {label:>9} ms {count:8d} {"#" * round(40 * count / peak)}')
+    if growth:
+        (before, size_before), (after, size_after) = growth
+        rows = {name: after[name] - before[name] for name in after}
+        print(f'db growth    {rows}, {(size_after - size_before) / 1024:.0f} KiB on disk '
+              f'({(size_after - size_before) / max(1, sum(rows.values())):.0f} B/row)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--devices', default='50', help='devices, or comma-separated stages (e.g. 100,200,400)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('brise=2,pavimentos=1,default=1'))
+    parser.add_argument('--binary', type=float, default=0.0, help='fraction of devices sending the binary frame')
+    parser.add_argument('--interval', type=float, default=30.0, help='seconds between readings per device')
+    parser.add_argument('--jitter', type=float, default=0.2, help='+/- fraction of the interval')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds per stage')
+    parser.add_argument('--rfid-readers', type=int, default=2)
+    parser.add_argument('--swipe-interval', type=float, default=5.0, help='mean seconds between swipes per reader')
+    parser.add_argument('--cards', type=int, default=200, help='UIDs 00000000.. swiped as "registered" cards')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--p99-budget', type=float, help='stop the stages once p99 (ms) exceeds this')
+    parser.add_argument('--no-db', action='store_true', help="don't measure DB growth")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    target = (url.hostname or '127.0.0.1', url.port or 80)
+    for devices in [int(n) for n in args.devices.split(',')]:
+        before = None if args.no_db else db_counts()
+        stats, elapsed = asyncio.run(run_stage(devices, args, target))
+        growth = None if args.no_db else (before, db_counts())
+        report(devices, stats, elapsed, growth, args)
+        if args.p99_budget and stats.percentile(99) > args.p99_budget:
+            print(f'\np99 over {args.p99_budget:g} ms at {devices} devices; stopping')
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -17,3 +17,25 @@ function updateDashboard() {
 }
 setInterval(updateDashboard, 5000);
 window.onload = updateDashboard;
+
+// Dados dos gráficos: /api/series/<monitoramento>/ devolve séries colunares (ver app/charts.py).
+// Com formato=f32 os arrays vêm em base64 (Uint32 para os timestamps, Float32 para os valores, NaN = sem leitura).
+function decodeBase64(text, ArrayType) {
+    const bytes = Uint8Array.from(atob(text), c => c.charCodeAt(0));
+    return new ArrayType(bytes.buffer);
+}
+
+function loadSeries(url) {
+    return fetch(url, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => {
+            if (data.encoding !== 'f32') {
+                return data;
+            }
+            const series = {};
+            for (const [name, values] of Object.entries(data.series)) {
+                series[name] = decodeBase64(values, Float32Array);
+            }
+            return {encoding: 'f32', count: data.count, t: decodeBase64(data.t, Uint32Array), series: series};
+        });
+}